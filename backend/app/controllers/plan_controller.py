@@ -1,6 +1,29 @@
-from fastapi import APIRouter
-from app.models.plan_schemas import PlanRequest, PlanResponse, RepairRequest, RepairResponse
-from app.services.planner_service import generate_plan, repair_plan
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.models.plan_schemas import (
+    PlanRequest,
+    PlanBatchRequest,
+    PlanResponse,
+    RepairRequest,
+    RepairResponse,
+    PlanSessionRequest,
+    PlanDeltaRequest,
+    PlanSessionResponse,
+)
+from app.services.planner_service import (
+    generate_plan,
+    repair_plan,
+    get_catalog_version,
+    plan_version,
+    open_plan_session,
+    apply_plan_deltas,
+    get_plan_session,
+    close_plan_session,
+)
+from app.services.plan_cache_service import get_plan_cache
+from app.services.plan_batch_service import generate_plans_ndjson, MAX_BATCH_SIZE
 
 router = APIRouter()
 
@@ -8,6 +31,47 @@ router = APIRouter()
 def plan_generate(req: PlanRequest):
     return generate_plan(req)
 
+@router.post("/generate/batch")
+async def plan_generate_batch(req: PlanBatchRequest):
+    """
+    Generate plans for a whole cohort. Streams NDJSON lines in completion order:
+    one {"type": "result" | "error", "index": ...} per request, then a summary line.
+    """
+    if len(req.requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {MAX_BATCH_SIZE} requests)")
+    return StreamingResponse(generate_plans_ndjson(req.requests), media_type="application/x-ndjson")
+
 @router.post("/repair", response_model=RepairResponse)
 def plan_repair(req: RepairRequest):
     return repair_plan(req)
+
+@router.get("/cache/stats")
+def plan_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the generate_plan result cache."""
+    return {**get_plan_cache().stats(), "catalog_version": get_catalog_version(), "plan_version": plan_version()}
+
+@router.post("/session", response_model=PlanSessionResponse)
+def plan_session_open(req: PlanSessionRequest):
+    """Start an interactive editing session; later edits are sent as deltas."""
+    return open_plan_session(req)
+
+@router.post("/session/{session_id}/deltas", response_model=PlanSessionResponse)
+def plan_session_deltas(session_id: str, req: PlanDeltaRequest):
+    """Apply drag-and-drop deltas and return the incremental validation result."""
+    resp = apply_plan_deltas(session_id, req)
+    if resp is None:
+        raise HTTPException(status_code=404, detail=f"Plan session not found: {session_id}")
+    return resp
+
+@router.get("/session/{session_id}")
+def plan_session_get(session_id: str) -> Dict[str, Any]:
+    plan = get_plan_session(session_id)
+    if plan is None:
+        raise HTTPException(status_code=404, detail=f"Plan session not found: {session_id}")
+    return {"session_id": session_id, "current_plan": plan}
+
+@router.delete("/session/{session_id}")
+def plan_session_close(session_id: str) -> Dict[str, Any]:
+    if not close_plan_session(session_id):
+        raise HTTPException(status_code=404, detail=f"Plan session not found: {session_id}")
+    return {"session_id": session_id, "closed": True}
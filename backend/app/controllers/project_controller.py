@@ -3,6 +3,8 @@ from pydantic import BaseModel
 from typing import Optional
 import traceback
 
+from app.controllers.recommend_controller import llm_unavailable
+from app.services.gemini_client import CircuitOpenError, LLMTimeout
 from app.services.gemini_service import recommend_3_projects
 
 router = APIRouter()
@@ -12,14 +14,16 @@ class ProjectRecommendRequest(BaseModel):
     career_description: Optional[str] = ""
 
 @router.post("/recommend")
-def recommend_projects(req: ProjectRecommendRequest):
+async def recommend_projects(req: ProjectRecommendRequest):
     """
     Generate 3 project recommendations based on the selected career path.
     Uses Gemini AI to create personalized project suggestions.
     """
     try:
-        result = recommend_3_projects(req.career_title, req.career_description or "")
+        result = await recommend_3_projects(req.career_title, req.career_description or "")
         return result
+    except (CircuitOpenError, LLMTimeout) as e:
+        raise llm_unavailable(e)
     except Exception as e:
         error_msg = f"Error generating project recommendations: {str(e)}"
         traceback.print_exc()
@@ -1,11 +1,23 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import asyncio
+import json
+import logging
+import os
 import traceback
 
+from app.services.gemini_client import CircuitOpenError, LLMError, LLMTimeout, get_gemini_client
 from app.services.gemini_service import recommend_3_careers
+from app.services.llm_cache_service import get_llm_cache
+from app.services.local_recommender_service import get_local_recommender
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# mode=auto answers locally if Gemini hasn't answered by then (the call still fills the cache)
+LLM_FALLBACK_SECONDS = float(os.getenv("RECOMMEND_LLM_FALLBACK_SECONDS", "8"))
 
 class EnrichedCourse(BaseModel):
     title: str
@@ -14,6 +26,7 @@ class EnrichedCourse(BaseModel):
     matched: bool = False
     course_url: Optional[str] = None
     catalog_description: Optional[str] = None
+    catalog_code: Optional[str] = None
     strength: float
     uniqueness: float
     importance: float
@@ -21,13 +34,84 @@ class EnrichedCourse(BaseModel):
 class RecommendRequest(BaseModel):
     courses: List[EnrichedCourse]
 
+def llm_unavailable(e: Exception) -> HTTPException:
+    """503 + Retry-After while the Gemini circuit is open, 504 when a call misses its deadline."""
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))})
+    return HTTPException(status_code=504, detail=str(e))
+
+def _local(courses: List[Dict[str, Any]], fallback_reason: Optional[str] = None) -> Dict[str, Any]:
+    result = get_local_recommender().recommend(courses)
+    result["source"] = "local"
+    if fallback_reason:
+        result["fallback_reason"] = fallback_reason
+    return result
+
+# unexpected LLM error types already logged by mode=auto (each is logged once, not per request)
+_logged_fallback_errors: set = set()
+
+def _log_fallback_once(e: Exception) -> None:
+    if type(e) not in _logged_fallback_errors:
+        _logged_fallback_errors.add(type(e))
+        logger.warning("Gemini failed, answering locally: %s", e, exc_info=e)
+
+async def _llm(courses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    result = await recommend_3_careers(courses)
+    result["source"] = "llm"
+    return result
+
+def _fallback_reason(e: Exception) -> str:
+    if isinstance(e, asyncio.TimeoutError):
+        return f"Gemini did not answer within {LLM_FALLBACK_SECONDS:g}s"
+    return str(e) if isinstance(e, LLMError) else f"Gemini failed: {type(e).__name__}"
+
+async def _careers_ndjson(courses: List[Dict[str, Any]]):
+    # local answer first, the LLM answer (or its error) when it arrives
+    yield json.dumps(_local(courses)) + "\n"
+    try:
+        yield json.dumps(await _llm(courses)) + "\n"
+    except Exception as e:
+        status = llm_unavailable(e).status_code if isinstance(e, (CircuitOpenError, LLMTimeout)) else 500
+        yield json.dumps({"source": "llm", "error": str(e), "status": status}) + "\n"
+
 @router.post("/careers")
-def recommend(req: RecommendRequest):
+async def recommend(
+    req: RecommendRequest,
+    mode: str = Query(
+        "auto",
+        pattern="^(auto|llm|local|stream)$",
+        description="auto: Gemini, local answer if it is slow or unavailable; llm: Gemini only; "
+        "local: offline recommender only; stream: NDJSON, local answer then Gemini's",
+    ),
+):
+    # Convert pydantic models to dicts
+    courses = [c.model_dump() for c in req.courses]
+    if mode == "local":
+        return _local(courses)
+    if mode == "stream":
+        return StreamingResponse(_careers_ndjson(courses), media_type="application/x-ndjson")
+    if mode == "auto":
+        try:
+            return await asyncio.wait_for(_llm(courses), LLM_FALLBACK_SECONDS)
+        except Exception as e:
+            if not isinstance(e, (asyncio.TimeoutError, LLMError)):
+                _log_fallback_once(e)
+            return _local(courses, _fallback_reason(e))
     try:
-        # Convert pydantic models to dicts
-        courses = [c.model_dump() for c in req.courses]
-        return recommend_3_careers(courses)
+        return await _llm(courses)
+    except (CircuitOpenError, LLMTimeout) as e:
+        raise llm_unavailable(e)
     except Exception as e:
         error_msg = f"Error generating recommendations: {str(e)}"
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=error_msg)
+
+@router.get("/cache/stats")
+def recommend_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/coalescing counters for the Gemini response cache (careers and projects)."""
+    return get_llm_cache().stats()
+
+@router.get("/llm/stats")
+def recommend_llm_stats() -> Dict[str, Any]:
+    """Gemini client concurrency, retry, timeout and circuit breaker counters."""
+    return get_gemini_client().stats()
@@ -2,49 +2,88 @@ import os
 import uuid
 import json
 import re
-from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.transcript_service import parse_transcript_pdf
+import asyncio
+import contextlib
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from anyio import from_thread
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from app.services.transcript_parse_pool import get_parse_pool, ParsePoolSaturated, ParseTimeout
+from app.services.transcript_job_service import get_job_queue, JobQueueFull
+from app.services.transcript_job_store import get_job_store
+from app.services.transcript_dedup_service import get_transcript_index
+from app.services.transcript_batch_service import parse_transcripts_ndjson
+from app.services.transcript_result_service import (
+    UPLOAD_DIR, get_records, is_outdated, load_result, save_result, sha256_file, upload_path,
+)
 from app.models.transcript_schemas import TranscriptParseResponse
-from typing import Dict, Any
+from app.utils.tracing import get_histograms
+from typing import Dict, Any, List, Optional
 
 router = APIRouter()
 
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "uploads")
-RESULTS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "transcript_results")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(RESULTS_DIR, exist_ok=True)
-
-def _save_result(transcript_id: str, result: TranscriptParseResponse):
-    """Save parse result to JSON file."""
-    result_file = os.path.join(RESULTS_DIR, f"{transcript_id}.json")
-    result_dict = {
-        "transcript_id": transcript_id,
-        "filename": result.filename,
-        "extracted_text_chars": result.extracted_text_chars,
-        "university_name": result.university_name,
-        "program_name": result.program_name,
-        "total_credits_attempted": result.total_credits_attempted,
-        "total_credits_earned": result.total_credits_earned,
-        "study_year": result.study_year,
-        "courses": [
-            {
-                "course_code": course.course_code,
-                "course_title": course.course_title,
-                "credits": course.credits,
-                "grade": course.grade,
-                "term": course.term,
-                "confidence": course.confidence,
-                "flags": course.flags
-            }
-            for course in result.courses
-        ],
-        "warnings": result.warnings
-    }
-    with open(result_file, 'w', encoding='utf-8') as f:
-        json.dump(result_dict, f, indent=2, ensure_ascii=False)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(float(os.getenv("TRANSCRIPT_MAX_UPLOAD_MB", "20")) * 1024 * 1024)
+# Allowance for multipart boundaries/headers when comparing Content-Length to MAX_UPLOAD_BYTES
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_TOO_LARGE_DETAIL = f"Transcript PDF exceeds the {MAX_UPLOAD_BYTES / (1024 * 1024):g} MB upload limit"
+# Whole request for /transcripts/parse/batch (each PDF in it is still held to MAX_UPLOAD_BYTES)
+MAX_BATCH_UPLOAD_BYTES = int(float(os.getenv("TRANSCRIPT_BATCH_MAX_MB", "500")) * 1024 * 1024)
+BATCH_TOO_LARGE_DETAIL = f"Transcript batch exceeds the {MAX_BATCH_UPLOAD_BYTES / (1024 * 1024):g} MB upload limit"
+
+def _save_indexed_result(transcript_id: str, sha256: str, result: TranscriptParseResponse):
+    """Save the result and remember which upload content it came from."""
+    result_dict = save_result(transcript_id, result, source_sha256=sha256)
+    get_transcript_index().put(sha256, transcript_id, result.filename)
     return result_dict
 
+def _find_duplicate(sha256: str) -> Optional[Dict[str, Any]]:
+    """Stored result for identical content parsed by the current parser, if any."""
+    index = get_transcript_index()
+    transcript_id = index.lookup(sha256)
+    if transcript_id is None:
+        return None
+    try:
+        return _load_result(transcript_id)
+    except HTTPException:
+        # result was removed since it was indexed
+        index.discard(sha256)
+        return None
+
+def _reuse_duplicate(sha256: str) -> Optional[Dict[str, Any]]:
+    """_find_duplicate for a new upload: a hit counts as uploading that transcript again."""
+    duplicate = _find_duplicate(sha256)
+    if duplicate is not None:
+        get_records().touch(duplicate["transcript_id"])
+    return duplicate
+
+async def _stream_upload(file: UploadFile, transcript_id: str):
+    """
+    Copy the upload to a temp file in UPLOAD_DIR chunk by chunk, hashing as it goes.
+    Raises 413 as soon as MAX_UPLOAD_BYTES is exceeded. Returns (temp_path, sha256);
+    the caller renames the temp file into place or deletes it.
+    """
+    part_path = os.path.join(UPLOAD_DIR, f".{transcript_id}.part")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(part_path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=UPLOAD_TOO_LARGE_DETAIL)
+                hasher.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(part_path)
+        raise
+    return part_path, hasher.hexdigest()
+
 def _validate_transcript_id(transcript_id: str) -> bool:
     """Validate that transcript_id is a valid UUID format to prevent path traversal."""
     # UUID format: 8-4-4-4-12 hex digits
@@ -52,7 +91,7 @@ def _validate_transcript_id(transcript_id: str) -> bool:
     return bool(uuid_pattern.match(transcript_id))
 
 def _load_result(transcript_id: str) -> Dict[str, Any]:
-    """Load parse result from JSON file."""
+    """Load a stored parse result (any storage format)."""
     # Validate UUID format to prevent path traversal attacks
     if not _validate_transcript_id(transcript_id):
         raise HTTPException(
@@ -60,115 +99,287 @@ def _load_result(transcript_id: str) -> Dict[str, Any]:
             detail=f"Invalid transcript ID format. Expected UUID format."
         )
     
-    # Use Path for safer path handling (prevents directory traversal)
-    result_file = Path(RESULTS_DIR) / f"{transcript_id}.json"
-    
-    # Additional safety: ensure the resolved path is within RESULTS_DIR
-    try:
-        result_file = result_file.resolve()
-        results_dir_resolved = Path(RESULTS_DIR).resolve()
-        if not str(result_file).startswith(str(results_dir_resolved)):
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid transcript ID - path traversal detected"
-            )
-    except (OSError, ValueError) as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid transcript ID: {str(e)}"
-        )
-    
-    if not result_file.exists():
+    result = load_result(transcript_id)
+    if result is None:
         raise HTTPException(status_code=404, detail=f"Transcript result not found for ID: {transcript_id}")
-    
-    with open(result_file, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return result
+
+# transcript_id -> job_id of the last background re-parse queued for it (oldest first)
+_reparse_jobs: "OrderedDict[str, str]" = OrderedDict()
+_reparse_jobs_lock = threading.Lock()
+MAX_REPARSE_JOBS = 1000
+# A failed re-parse is not queued again for this long (a broken PDF would otherwise be re-parsed on every read)
+REPARSE_RETRY_SECONDS = float(os.getenv("TRANSCRIPT_REPARSE_RETRY_SECONDS", "3600"))
+
+def _can_requeue(job) -> bool:
+    """True when no re-parse is running or backing off for the transcript."""
+    if job is None or job.status == "done":
+        return True
+    return job.status == "failed" and time.time() - job.updated_at >= REPARSE_RETRY_SECONDS
+
+def _remember_reparse(transcript_id: str, job_id: str) -> None:
+    """Track a re-parse job; finished ones are dropped once the map is full. Caller holds the lock."""
+    _reparse_jobs[transcript_id] = job_id
+    _reparse_jobs.move_to_end(transcript_id)
+    if len(_reparse_jobs) <= MAX_REPARSE_JOBS:
+        return
+    store = get_job_store()
+    for tid, jid in list(_reparse_jobs.items()):
+        if _can_requeue(store.get(jid)):
+            del _reparse_jobs[tid]
+    while len(_reparse_jobs) > MAX_REPARSE_JOBS:
+        _reparse_jobs.popitem(last=False)
+
+def _save_reparsed_result(transcript_id: str, sha256: Optional[str], result: TranscriptParseResponse):
+    """Replace an outdated stored result; the upload time (and so /latest) is unchanged."""
+    result_dict = save_result(transcript_id, result, source_sha256=sha256, is_upload=False)
+    if sha256:
+        get_transcript_index().put(sha256, transcript_id, result.filename)
+    return result_dict
+
+def _with_lazy_reparse(result_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the stored result as-is. If an older parser version produced it and
+    the source PDF is still on disk, queue a background re-parse (at most one
+    per transcript) and add its "reparse_job_id"; the next read gets the fresh result.
+    A failed re-parse is retried after REPARSE_RETRY_SECONDS, not on the next read.
+    Runs on a threadpool worker (sync handlers); only the enqueue hops to the event loop.
+    """
+    if not is_outdated(result_dict):
+        return result_dict
+    transcript_id = result_dict["transcript_id"]
+    pdf_path = upload_path(transcript_id)
+    if not os.path.exists(pdf_path):
+        return result_dict
+
+    with _reparse_jobs_lock:
+        job_id = _reparse_jobs.get(transcript_id)
+        job = get_job_store().get(job_id) if job_id else None
+        if _can_requeue(job):
+            sha256 = result_dict.get("source_sha256") or sha256_file(pdf_path)
+            try:
+                # the job queue lives on the event loop
+                job = from_thread.run_sync(
+                    get_job_queue().enqueue,
+                    pdf_path, result_dict.get("filename") or f"{transcript_id}.pdf", transcript_id,
+                    partial(_save_reparsed_result, transcript_id, sha256),
+                )
+            except JobQueueFull:
+                # serve the stale result; a later read will try again
+                _reparse_jobs.pop(transcript_id, None)
+                return result_dict
+            _remember_reparse(transcript_id, job.job_id)
+    return {**result_dict, "reparse_job_id": job.job_id}
 
 @router.post("/parse")
-async def parse_transcript(file: UploadFile = File(...)) -> Dict[str, Any]:
+async def parse_transcript(
+    file: UploadFile = File(...),
+    async_: bool = Query(False, alias="async", description="Queue the parse and return a job ID (202) instead of waiting"),
+    timings: bool = Query(False, description="Include per-stage and per-page parse timings (ms)"),
+) -> Dict[str, Any]:
     """
     Parse a transcript PDF and return the result with transcript_id.
     
+    With ?async=true the upload is queued and the response is 202 with a job_id;
+    follow it via GET /transcripts/jobs/{job_id} or the SSE stream at
+    GET /transcripts/jobs/{job_id}/events. The result is then available at
+    GET /transcripts/{transcript_id}.
+    
+    Uploads are deduplicated by SHA-256: a PDF identical to one already parsed
+    by the current parser version returns the stored result immediately (same
+    transcript_id, "cache_hit": true) in both modes.
+    
+    With ?timings=true a freshly parsed result also carries "timings": milliseconds
+    per stage (text_extraction, row_parsing, metadata, totals, enrichment, save)
+    and per page. Aggregates for all parses are at GET /transcripts/timings.
+    
     Returns:
-        JSON with transcript_id and all parsed transcript data
+        JSON with transcript_id, all parsed transcript data and cache_hit
     """
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Please upload a PDF transcript file")
 
     # Generate unique transcript ID
     transcript_id = str(uuid.uuid4())
-    save_path = os.path.join(UPLOAD_DIR, f"{transcript_id}.pdf")
+    save_path = upload_path(transcript_id)
+
+    part_path, sha256 = await _stream_upload(file, transcript_id)
 
-    contents = await file.read()
-    with open(save_path, "wb") as f:
-        f.write(contents)
+    duplicate = await asyncio.to_thread(_reuse_duplicate, sha256)
+    if duplicate is not None:
+        os.remove(part_path)
+        return {**duplicate, "cache_hit": True}
+    # only complete uploads ever appear under their final name
+    os.replace(part_path, save_path)
+
+    if async_:
+        try:
+            job = get_job_queue().enqueue(save_path, file.filename, transcript_id, partial(_save_indexed_result, transcript_id, sha256))
+        except JobQueueFull:
+            os.remove(save_path)
+            raise HTTPException(
+                status_code=503,
+                detail="Too many transcripts queued. Please retry shortly.",
+                headers={"Retry-After": "5"},
+            )
+        return JSONResponse(status_code=202, content={
+            "job_id": job.job_id,
+            "transcript_id": transcript_id,
+            "status": job.status,
+            "status_url": f"/transcripts/jobs/{job.job_id}",
+            "events_url": f"/transcripts/jobs/{job.job_id}/events",
+        })
 
-    # Parse the transcript
-    result = parse_transcript_pdf(save_path, file.filename)
+    # Parse the transcript in the worker pool so the event loop stays free
+    try:
+        result = await get_parse_pool().parse(save_path, file.filename)
+    except ParsePoolSaturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Transcript parser is busy. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ParseTimeout as e:
+        # no result will be stored for it: don't keep the upload either
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(save_path)
+        raise HTTPException(status_code=504, detail=str(e))
     
-    # Save result to JSON file
-    result_dict = _save_result(transcript_id, result)
+    # Save the result (encode, compress, write, index) off the event loop
+    result_dict = await asyncio.to_thread(_save_indexed_result, transcript_id, sha256, result)
     
-    return result_dict
+    if timings:
+        return {**result_dict, "cache_hit": False, "timings": result.timings}
+    return {**result_dict, "cache_hit": False}
+
+@router.post("/parse/batch")
+async def parse_transcript_batch(files: List[UploadFile] = File(...)):
+    """
+    Parse many transcripts in one request: any mix of PDFs and ZIP archives of PDFs.
+    Streams NDJSON lines in completion order: one {"type": "result" | "error",
+    "index": ..., "filename": ...} per PDF (archive members are named
+    "archive.zip/member.pdf"), then a summary with counts and throughput.
+    Identical PDFs are parsed once; content parsed before is a cache hit.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="Upload at least one PDF or ZIP file")
+    for file in files:
+        if not (file.filename or "").lower().endswith((".pdf", ".zip")):
+            raise HTTPException(status_code=400, detail=f"Not a PDF or ZIP file: {file.filename}")
+    return StreamingResponse(
+        parse_transcripts_ndjson(files, MAX_UPLOAD_BYTES, _reuse_duplicate, _save_indexed_result),
+        media_type="application/x-ndjson",
+    )
 
 @router.get("/")
-def list_transcripts():
+def list_transcripts(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    university: Optional[str] = Query(None, description="Exact university_name to filter on"),
+    program: Optional[str] = Query(None, description="Exact program_name to filter on"),
+):
     """
-    List all parsed transcripts.
+    List parsed transcripts, newest first.
     
     Returns:
-        List of transcript IDs and metadata
+        One page of transcript IDs and metadata, plus the total matching count
     """
-    results = []
-    if os.path.exists(RESULTS_DIR):
-        for file in Path(RESULTS_DIR).glob("*.json"):
-            transcript_id = file.stem
-            try:
-                data = _load_result(transcript_id)
-                results.append({
-                    "transcript_id": transcript_id,
-                    "filename": data.get("filename"),
-                    "university_name": data.get("university_name"),
-                    "program_name": data.get("program_name"),
-                    "total_credits_attempted": data.get("total_credits_attempted"),
-                    "total_credits_earned": data.get("total_credits_earned"),
-                    "study_year": data.get("study_year"),
-                    "course_count": len(data.get("courses", []))
-                })
-            except Exception:
-                continue
-    
+    results, total = get_records().list(limit=limit, offset=offset, university=university, program=program)
     return {
         "transcripts": results,
-        "count": len(results)
+        "count": len(results),
+        "total": total,
+        "limit": limit,
+        "offset": offset,
     }
 
+@router.get("/pool/stats")
+def parse_pool_stats() -> Dict[str, Any]:
+    """Queue depth and counters for the transcript parse worker pool."""
+    return get_parse_pool().stats()
+
+@router.get("/timings")
+def parse_timing_histograms(format: str = Query("json", pattern="^(json|prometheus)$")):
+    """
+    Latency histograms (ms) of every parse in this API process: total, each
+    stage, and page extraction per strategy ("page.raw", "page.layout", ...).
+    ?format=prometheus returns the Prometheus text format instead of JSON.
+    """
+    histograms = get_histograms()
+    if format == "prometheus":
+        return PlainTextResponse(histograms.prometheus(), media_type="text/plain; version=0.0.4")
+    return histograms.snapshot()
+
+def _get_job_or_404(job_id: str):
+    job = get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Transcript job not found: {job_id}")
+    return job
+
+@router.get("/jobs/{job_id}")
+def get_transcript_job(job_id: str) -> Dict[str, Any]:
+    """Status, current stage and stage history of an async parse job."""
+    return _get_job_or_404(job_id).to_dict()
+
+@router.get("/jobs/{job_id}/events")
+async def stream_transcript_job(job_id: str):
+    """
+    Server-sent events for an async parse job: one "progress" event per stage,
+    then a final "done" or "failed" event carrying the whole job.
+    """
+    # the job store may be SQLite: read it on a thread, not the event loop
+    await asyncio.to_thread(_get_job_or_404, job_id)
+    store = get_job_store()
+
+    async def events():
+        sent = 0
+        while True:
+            job = await asyncio.to_thread(store.get, job_id)
+            if job is None:
+                return
+            for event in job.events[sent:]:
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+            sent = len(job.events)
+            if job.is_final():
+                yield f"event: {job.status}\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+            await asyncio.sleep(0.2)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @router.get("/latest", response_model=Dict[str, Any])
 def get_latest_transcript():
     """
-    Get the most recently parsed transcript (convenience endpoint).
+    Get the most recently uploaded transcript (convenience endpoint).
+    A re-upload of an already parsed PDF counts as the latest upload.
+    Results from an older parser version are re-parsed in the background
+    (see get_transcript).
     
     Returns:
         JSON with all parsed transcript data for the latest transcript
     """
-    if not os.path.exists(RESULTS_DIR):
-        raise HTTPException(status_code=404, detail="No transcripts found")
-    
-    json_files = list(Path(RESULTS_DIR).glob("*.json"))
-    if not json_files:
-        raise HTTPException(status_code=404, detail="No transcripts found")
-    
-    # Get the most recently modified file
-    latest_file = max(json_files, key=lambda f: f.stat().st_mtime)
-    transcript_id = latest_file.stem
-    
-    return _load_result(transcript_id)
+    records = get_records()
+    while True:
+        transcript_id = records.latest_id()
+        if transcript_id is None:
+            raise HTTPException(status_code=404, detail="No transcripts found")
+        try:
+            return _with_lazy_reparse(_load_result(transcript_id))
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+            # result file was removed out from under the index
+            records.delete(transcript_id)
 
 @router.get("/{transcript_id}", response_model=Dict[str, Any])
 def get_transcript(transcript_id: str):
     """
     Get parsed transcript JSON by transcript ID.
     
+    A result stored by an older parser version is returned immediately, with a
+    "reparse_job_id" for the background re-parse of the original PDF it triggers
+    (followed like any async parse job).
+    
     Args:
         transcript_id: The UUID returned from POST /transcripts/parse
         
@@ -176,11 +387,11 @@ def get_transcript(transcript_id: str):
         JSON with all parsed transcript data
     """
     # Prevent reserved words from being used as IDs
-    reserved_words = {"parse", "latest"}
+    reserved_words = {"parse", "latest", "pool", "jobs", "timings"}
     if transcript_id.lower() in reserved_words:
         raise HTTPException(
             status_code=400,
             detail=f"'{transcript_id}' is a reserved endpoint. Use /transcripts/ to list all transcripts or /transcripts/latest to get the most recent transcript."
         )
     
-    return _load_result(transcript_id)
+    return _with_lazy_reparse(_load_result(transcript_id))
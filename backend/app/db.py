@@ -8,7 +8,7 @@ from pathlib import Path
 from contextlib import contextmanager
 from typing import Generator
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
@@ -17,11 +17,29 @@ _backend_dir = Path(__file__).resolve().parent.parent
 load_dotenv(_backend_dir / ".env")
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Transcript result index (app/services/transcript_record_store.py). Defaults to a
+# local SQLite file so it works without DATABASE_URL; set it to DATABASE_URL to
+# keep the table in the main database instead.
+TRANSCRIPT_DATABASE_URL = os.getenv("TRANSCRIPT_DATABASE_URL") or f"sqlite:///{_backend_dir / 'transcripts.db'}"
 engine = None
 SessionLocal = None
 
+
+def create_app_engine(url: str):
+    """Engine with per-backend defaults (SQLite: shared across threads, WAL journal)."""
+    if url.startswith("sqlite"):
+        sqlite_engine = create_engine(url, connect_args={"check_same_thread": False})
+
+        @event.listens_for(sqlite_engine, "connect")
+        def _enable_wal(dbapi_connection, _record):
+            dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+        return sqlite_engine
+    return create_engine(url, pool_pre_ping=True)
+
+
 if DATABASE_URL:
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+    engine = create_app_engine(DATABASE_URL)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
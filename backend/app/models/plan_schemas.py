@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -36,3 +36,37 @@ class RepairRequest(BaseModel):
 class RepairResponse(BaseModel):
     updated_plan: List[Semester] = Field(default_factory=list)
     notes: List[str] = Field(default_factory=list)
+
+
+class PlanDelta(BaseModel):
+    """One drag-and-drop edit. Terms are semester indexes into the session plan."""
+    op: Literal["move", "add", "remove", "swap"] = "move"
+    course: str
+    to_term: Optional[int] = None       # move/add: target semester
+    from_term: Optional[int] = None     # move/remove: source semester (first occurrence if omitted)
+    position: Optional[int] = None      # move/add: index within the target semester (appended if omitted)
+    swap_in: Optional[str] = None       # swap: replacement course
+
+
+class PlanSessionRequest(BaseModel):
+    current_plan: List[Semester] = Field(default_factory=list)
+    locked_courses: List[str] = Field(default_factory=list)
+    completed_courses: List[str] = Field(default_factory=list)
+    max_courses_per_term: int = 5
+
+
+class PlanDeltaRequest(BaseModel):
+    deltas: List[PlanDelta] = Field(default_factory=list)
+
+
+class PlanSessionResponse(BaseModel):
+    session_id: str
+    version: int = 0
+    valid: bool = True
+    issues: List[str] = Field(default_factory=list)
+    term_counts: List[int] = Field(default_factory=list)
+    notes: List[str] = Field(default_factory=list)
+
+
+class PlanBatchRequest(BaseModel):
+    requests: List[PlanRequest] = Field(default_factory=list)
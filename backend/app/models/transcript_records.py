@@ -0,0 +1,38 @@
+"""
+SQLAlchemy table indexing stored transcript results.
+
+The parsed result itself stays in transcript_results/ (a sharded .trs container
+or .json file, see transcript_storage.py); this table holds the summary fields
+used for listing, filtering and "latest", so those no longer read every result.
+"""
+from sqlalchemy import Column, Float, Integer, String
+
+from app.db import Base
+
+
+class TranscriptRecord(Base):
+    __tablename__ = "transcript_records"
+
+    transcript_id = Column(String(36), primary_key=True)
+    filename = Column(String(512))
+    university_name = Column(String(255), index=True)
+    program_name = Column(String(255), index=True)
+    study_year = Column(Integer)
+    total_credits_attempted = Column(Float)
+    total_credits_earned = Column(Float)
+    course_count = Column(Integer, nullable=False, default=0)
+    # parser that produced the stored result and the source PDF it came from
+    parser_version = Column(String(32), index=True)
+    source_sha256 = Column(String(64))
+    # epoch seconds: first parse, and most recent upload of the same content
+    created_at = Column(Float, nullable=False, index=True)
+    uploaded_at = Column(Float, nullable=False, index=True)
+
+    LISTING_FIELDS = (
+        "transcript_id", "filename", "university_name", "program_name",
+        "total_credits_attempted", "total_credits_earned", "study_year", "course_count",
+        "created_at", "uploaded_at", "parser_version",
+    )
+
+    def to_listing(self) -> dict:
+        return {field: getattr(self, field) for field in self.LISTING_FIELDS}
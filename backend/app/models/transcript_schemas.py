@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 class ExtractedCourse(BaseModel):
     course_code: Optional[str] = None
@@ -25,3 +25,4 @@ class TranscriptParseResponse(BaseModel):
     total_credits: float = Field(default=0.0, description="Alias for total_credits_attempted")
     completed_credits: float = Field(default=0.0, description="Alias for total_credits_earned")
     degree_credits: float = Field(default=0.0, description="Degree credits - excludes co-op courses (SCCO)")
+    timings: Optional[Dict[str, Any]] = Field(default=None, description="Per-stage and per-page parse timings in milliseconds")
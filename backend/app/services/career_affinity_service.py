@@ -0,0 +1,254 @@
+"""
+Career x course affinity matrix used to rank courses for a target career.
+
+Each career profile (app/data/career_profiles.json) is a keyword set. Course
+text (catalog title + description) is tokenized with scoring_service, weighted
+by TF-IDF over the same courses, and projected onto the profiles, giving a dense
+float32 matrix indexed by (career, course). Hand-picked seed courses are placed
+above every text score, in their listed order, so they always rank first for
+their career and keep the order the profile gives them.
+
+The matrix is built offline with scripts/build_career_affinity.py and saved to
+app/data/career_affinity.npz. If that file is missing or does not cover the
+requested courses it is built in memory on first use.
+"""
+import difflib
+import hashlib
+import json
+import threading
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.scoring_service import tokenize
+
+try:
+    from rapidfuzz import process, fuzz
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+PROFILES_PATH = DATA_DIR / "career_profiles.json"
+AFFINITY_PATH = DATA_DIR / "career_affinity.npz"
+
+# Text-derived affinity is scaled into [0, TEXT_WEIGHT]; seeds take (TEXT_WEIGHT, TEXT_WEIGHT + SEED_WEIGHT]
+TEXT_WEIGHT = 0.5
+SEED_WEIGHT = 1.0
+# Free-text targets whose resolution is memoised per CareerAffinity
+RESOLVE_CACHE_SIZE = 1024
+
+# Role words that say nothing about the field ("data engineer" vs "software engineer")
+GENERIC_ROLE_WORDS = {"engineer", "developer", "analyst", "specialist", "scientist", "and", "or", "of", "the", "a", "an", "in"}
+FUZZY_MIN_SCORE = 75
+# Shorter aliases ("ai", "ml", "sre") are too close to too many words to match fuzzily
+FUZZY_MIN_CHARS = 4
+
+
+_versions: Dict[Tuple, str] = {}
+
+def affinity_version(paths: Sequence[Path] = (PROFILES_PATH, AFFINITY_PATH)) -> str:
+    """
+    Short hash of the files rankings are built from (profiles and the offline
+    matrix; a missing file hashes as absent). Re-hashed only when one changes.
+    """
+    stamp = []
+    for path in paths:
+        try:
+            st = Path(path).stat()
+            stamp.append((str(path), st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append((str(path), None, None))
+    key = tuple(stamp)
+    if key not in _versions:
+        hasher = hashlib.sha256()
+        for path, mtime, _ in stamp:
+            hasher.update(Path(path).name.encode("utf-8"))
+            hasher.update(Path(path).read_bytes() if mtime is not None else b"\0absent")
+        _versions.clear()
+        _versions[key] = hasher.hexdigest()[:16]
+    return _versions[key]
+
+
+def load_career_profiles(path: Path = PROFILES_PATH) -> List[dict]:
+    raw = json.loads(Path(path).read_text(encoding="utf-8"))
+    return raw.get("careers", [])
+
+
+def course_texts_from_catalog(codes: Sequence[str], school: str = "tmu") -> Dict[str, str]:
+    """Title + description per course code (empty string when the catalog lacks it)."""
+    from app.services.catalog_service import get_catalog_service
+
+    catalog = get_catalog_service(school)
+    out: Dict[str, str] = {}
+    for code in codes:
+        c = catalog.get_by_code(code) or {}
+        out[code] = f"{c.get('title') or ''} {c.get('description') or ''}".strip()
+    return out
+
+
+def build_affinity_matrix(profiles: List[dict], course_texts: Dict[str, str]) -> Tuple[np.ndarray, List[str], List[str]]:
+    """Returns (matrix[career, course], career keys, course codes)."""
+    careers = [p["key"] for p in profiles]
+    codes = sorted(course_texts)
+
+    vocab: Dict[str, int] = {}
+    for p in profiles:
+        for kw in p.get("keywords", []):
+            for w in tokenize(kw):
+                vocab.setdefault(w, len(vocab))
+
+    # term frequencies restricted to profile vocabulary (courses x vocab)
+    tf = np.zeros((len(codes), len(vocab)), dtype=np.float32)
+    df = np.zeros(len(vocab), dtype=np.float32)
+    for i, code in enumerate(codes):
+        tokens = tokenize(course_texts[code])
+        if not tokens:
+            continue
+        counts = Counter(w for w in tokens if w in vocab)
+        for w, n in counts.items():
+            tf[i, vocab[w]] = n / len(tokens)
+            df[vocab[w]] += 1
+    idf = np.log((len(codes) + 1) / (df + 1)) + 1.0
+
+    profile = np.zeros((len(careers), len(vocab)), dtype=np.float32)
+    for r, p in enumerate(profiles):
+        for kw in p.get("keywords", []):
+            for w in tokenize(kw):
+                profile[r, vocab[w]] = 1.0
+
+    matrix = profile @ (tf * idf).T
+    row_max = matrix.max(axis=1, keepdims=True) if codes else np.zeros((len(careers), 1), dtype=np.float32)
+    matrix = np.divide(matrix, row_max, out=np.zeros_like(matrix), where=row_max > 0) * TEXT_WEIGHT
+
+    # seeds replace their text score: seed order must not depend on course text
+    code_index = {c: i for i, c in enumerate(codes)}
+    for r, p in enumerate(profiles):
+        seeds = p.get("seed_courses", [])
+        for rank, code in enumerate(seeds):
+            if code in code_index:
+                matrix[r, code_index[code]] = TEXT_WEIGHT + SEED_WEIGHT * (len(seeds) - rank) / len(seeds)
+
+    return matrix.astype(np.float32), careers, codes
+
+
+class CareerAffinity:
+    def __init__(self, matrix: np.ndarray, careers: List[str], codes: List[str], profiles: List[dict]):
+        self.matrix = matrix
+        self.careers = list(careers)
+        self.codes = list(codes)
+        self.career_index = {k: i for i, k in enumerate(self.careers)}
+        self.code_index = {c: i for i, c in enumerate(self.codes)}
+        self.profiles = {p["key"]: p for p in profiles if p["key"] in self.career_index}
+
+        self._aliases: Dict[str, str] = {}
+        self._alias_tokens: Dict[str, set] = {}
+        self._keyword_tokens: Dict[str, set] = {}
+        for key, p in self.profiles.items():
+            names = [key, p.get("title", ""), *p.get("aliases", [])]
+            for name in names:
+                norm = " ".join(tokenize(name))
+                if norm:
+                    self._aliases.setdefault(norm, key)
+            self._alias_tokens[key] = {w for n in names for w in tokenize(n)} - GENERIC_ROLE_WORDS
+            self._keyword_tokens[key] = {w for kw in p.get("keywords", []) for w in tokenize(kw)}
+        # typo fallback: whole names without role words, long enough to be distinctive
+        self._fuzzy: Dict[str, str] = {}
+        for norm, key in self._aliases.items():
+            core = self._core(norm.split())
+            if len(core) >= FUZZY_MIN_CHARS:
+                self._fuzzy.setdefault(core, key)
+        self._fuzzy_list = list(self._fuzzy)
+        # bounded: targets are free text from requests
+        self._resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve_uncached)
+
+    def save(self, path: Path = AFFINITY_PATH) -> None:
+        np.savez_compressed(path, matrix=self.matrix, careers=np.array(self.careers), codes=np.array(self.codes))
+
+    @classmethod
+    def load(cls, path: Path, profiles: List[dict]) -> "CareerAffinity":
+        with np.load(path) as data:
+            return cls(data["matrix"], data["careers"].tolist(), data["codes"].tolist(), profiles)
+
+    @staticmethod
+    def _core(tokens: Sequence[str]) -> str:
+        return " ".join(w for w in tokens if w not in GENERIC_ROLE_WORDS)
+
+    def _resolve_uncached(self, target: str) -> Optional[str]:
+        q_tokens = tokenize(target)
+        q = " ".join(q_tokens)
+        if not q:
+            return None
+        if q in self._aliases:
+            return self._aliases[q]
+
+        # Token overlap: alias words count double, profile keywords once
+        words = set(q_tokens) - GENERIC_ROLE_WORDS
+        best, best_score = None, 0
+        for key in self.profiles:
+            score = 2 * len(words & self._alias_tokens[key]) + len(words & self._keyword_tokens[key])
+            if score > best_score:
+                best, best_score = key, score
+        if best is not None:
+            return best
+
+        # Typos / near misses ("machne learning"): whole-string similarity, not partial
+        # matches, which would find "ai" inside "painter" or "trainer"
+        core = self._core(q_tokens)
+        if len(core) < FUZZY_MIN_CHARS:
+            return None
+        if RAPIDFUZZ_AVAILABLE:
+            hit = process.extractOne(core, self._fuzzy_list, scorer=fuzz.ratio, score_cutoff=FUZZY_MIN_SCORE)
+            return self._fuzzy[hit[0]] if hit else None
+        close = difflib.get_close_matches(core, self._fuzzy_list, n=1, cutoff=FUZZY_MIN_SCORE / 100)
+        return self._fuzzy[close[0]] if close else None
+
+    def resolve_career(self, target: Optional[str]) -> Optional[str]:
+        """Map free-text target_career to the nearest known career profile key."""
+        if not target:
+            return None
+        return self._resolve(target)
+
+    def rank(self, courses: List[str], career_key: str) -> List[str]:
+        """Courses by descending affinity to the career; ties (and unknown courses) by code."""
+        if not courses:
+            return []
+        row = self.matrix[self.career_index[career_key]]
+        idx = np.array([self.code_index.get(c, -1) for c in courses])
+        scores = np.where(idx >= 0, row[np.maximum(idx, 0)], 0.0)
+        order = np.lexsort((np.array(courses), -scores))
+        return [courses[i] for i in order]
+
+
+# Cached per course set (the planner catalog can be reloaded); dropped when the data files change
+_affinity: Dict[Tuple[str, ...], CareerAffinity] = {}
+_affinity_version: Optional[str] = None
+_affinity_lock = threading.Lock()
+
+def get_career_affinity(codes: Sequence[str]) -> CareerAffinity:
+    """Affinity for the given course codes: the offline matrix if it covers them, else built in memory."""
+    global _affinity_version
+    key = tuple(sorted(codes))
+    with _affinity_lock:
+        version = affinity_version()
+        if version != _affinity_version:
+            _affinity.clear()
+            _affinity_version = version
+        if key not in _affinity:
+            profiles = load_career_profiles()
+            affinity = None
+            if AFFINITY_PATH.exists():
+                try:
+                    loaded = CareerAffinity.load(AFFINITY_PATH, profiles)
+                    if set(key) <= set(loaded.codes) and set(loaded.careers) == {p["key"] for p in profiles}:
+                        affinity = loaded
+                except Exception:
+                    affinity = None
+            if affinity is None:
+                matrix, careers, built_codes = build_affinity_matrix(profiles, course_texts_from_catalog(key))
+                affinity = CareerAffinity(matrix, careers, built_codes, profiles)
+            _affinity[key] = affinity
+        return _affinity[key]
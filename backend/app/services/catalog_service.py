@@ -2,7 +2,9 @@ import json
 import os
 import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Iterable, List, Dict, Any, Optional
+
+from app.utils.course_codes import normalize_course_id
 
 try:
     from rapidfuzz import process, fuzz
@@ -39,6 +41,7 @@ class CatalogService:
             self.by_code: Dict[str, str] = {}
             self.by_title_norm: Dict[str, List[str]] = {}
             self.by_id: Dict[str, Dict[str, Any]] = {}
+            self.by_code_norm: Dict[str, str] = {}
             self.school = school or "ontariotech"
             return
 
@@ -48,6 +51,15 @@ class CatalogService:
         self.by_code: Dict[str, str] = raw.get("indexes", {}).get("by_code", {})
         self.by_title_norm: Dict[str, List[str]] = raw.get("indexes", {}).get("by_title_norm", {})
         self.by_id: Dict[str, Dict[str, Any]] = {c["id"]: c for c in self.courses}
+        # Normalized code ("CSCI 1030U" / "csci1030u" -> "CSCI1030U") -> id, so
+        # transcript codes match however the catalog happens to space them
+        self.by_code_norm: Dict[str, str] = {}
+        for code, cid in self.by_code.items():
+            self.by_code_norm.setdefault(normalize_course_id(code), cid)
+        for c in self.courses:
+            if c.get("code") and c.get("id"):
+                self.by_code_norm.setdefault(normalize_course_id(c["code"]), c["id"])
+        self.by_code_norm.pop("", None)
         
         # Cache list for fuzzy matching
         self._title_norm_list = [
@@ -81,9 +93,32 @@ class CatalogService:
         """Get course by course code (e.g., 'CPS109')."""
         if not self.by_code:
             return None
-        cid = self.by_code.get(code.upper())
+        cid = self.by_code.get(code.upper()) or self.by_code_norm.get(normalize_course_id(code))
         return self.by_id.get(cid) if cid else None
 
+    def get_many_by_code(self, codes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve many course codes in one pass. Returns catalog_key(code) -> course
+        for the codes found: the normalized code, or for codes the normalizer
+        doesn't cover (e.g. 5-letter subjects) the upper-cased code, which falls
+        back to an exact lookup as in get_by_code.
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        for code in set(codes):
+            norm = normalize_course_id(code)
+            cid = self.by_code_norm.get(norm)
+            if cid is None:
+                norm, cid = code.upper(), self.by_code.get(code.upper())
+            course = self.by_id.get(cid) if cid else None
+            if course is not None:
+                found[norm] = course
+        return found
+
+    def catalog_key(self, code: str) -> str:
+        """The key get_many_by_code uses for code."""
+        norm = normalize_course_id(code)
+        return norm if norm in self.by_code_norm else code.upper()
+
     def get_by_id(self, cid: str) -> Optional[Dict[str, Any]]:
         """Get course by internal ID."""
         return self.by_id.get(cid)
@@ -1,5 +1,5 @@
 import re
-from typing import Tuple, List, Optional
+from typing import Tuple, List, Optional, Sequence
 from app.models.transcript_schemas import ExtractedCourse
 
 # Ontario Tech: 3-5 letters + 3-4 digits + optional letter. TMU: 2-4 letters + optional space + 3 digits
@@ -56,16 +56,195 @@ TMU_ROW_MINIMAL_PATTERN = re.compile(
     re.IGNORECASE
 )
 
+# Column-table rows from pdf_text_service arrive as tab-separated cells.
+# The code cell may also hold the level marker (and title) when the gaps are narrow.
+CELL_CODE_PATTERN = re.compile(r'^(?P<subj>[A-Z]{2,5})\s?(?P<num>\d{3,4}[A-Z]?)(?:\s+(?P<rest>.+))?$')
+GRADE_CELL_PATTERN = re.compile(rf'^{GRADE_TOKEN}$', re.IGNORECASE)
+NUMBER_CELL_PATTERN = re.compile(r'^\d+(?:\.\d+)?$')
+LEVEL_TOKENS = {"UG", "GR"}
+
+# Pre-screens for classify_line. A line can only match the Ontario Tech row
+# patterns if it starts "<SUBJ> <NUM> UG|GR ", and the TMU ones if it starts
+# "<SUBJ><NUM>" followed by a separator or the end. These anchored prefix checks
+# are necessary conditions of the full patterns, so skipping a family whose
+# prefix fails never changes which pattern matches. ROW_LEAD applies both at
+# once: most lines are rejected by that single call.
+_OT_LEAD = r'\s*[A-Z]{3,5}\s+\d{3,4}[A-Z]?\s+(?:UG|GR)\s'
+_TMU_LEAD = r'\s*[A-Z]{2,4}\s?\d{3}(?:[\s\-–:]|$)'
+ROW_LEAD = re.compile(rf'(?P<ot>{_OT_LEAD})|{_TMU_LEAD}', re.IGNORECASE)
+OT_ROW_LEAD = re.compile(_OT_LEAD, re.IGNORECASE)
+TMU_ROW_LEAD = re.compile(_TMU_LEAD, re.IGNORECASE)
+
+# Row pattern families by transcript format: prefix check + patterns in priority order.
+# Institutions (institution_parsers) declare which families their transcripts use.
+ROW_FAMILIES = {
+    "ontariotech": (OT_ROW_LEAD, (("row", COURSE_ROW_PATTERN), ("inprogress", COURSE_ROW_INPROGRESS_PATTERN))),
+    "tmu": (TMU_ROW_LEAD, (("tmu", TMU_ROW_PATTERN), ("tmu_minimal", TMU_ROW_MINIMAL_PATTERN))),
+}
+
+WHITESPACE_RUN = re.compile(r'\s+')
+TITLE_TRAILER_PATTERN = re.compile(r'\s+(Attempt|Hours|Passed|Earned|GPA|Quality|Points)\b.*$', re.IGNORECASE)
+
 def _norm_course_code(subj: str, num: str) -> str:
     return f"{subj}{num}".replace(" ", "").upper()
 
 def _clean_title(title: str) -> str:
-    t = re.sub(r'\s+', ' ', (title or '').strip())
+    t = WHITESPACE_RUN.sub(' ', (title or '').strip())
     # Remove trailing junk if any
-    t = re.sub(r'\s+(Attempt|Hours|Passed|Earned|GPA|Quality|Points)\b.*$', '', t, flags=re.IGNORECASE)
+    t = TITLE_TRAILER_PATTERN.sub('', t)
     return t.strip(" -–")
 
-def extract_courses_from_text(text: str) -> Tuple[List[ExtractedCourse], List[str]]:
+def _course_from_cells(cells: List[str], term: Optional[str]) -> Optional[ExtractedCourse]:
+    """
+    Read a course straight from table cells: code, [level], title..., then grade
+    and credits in either order (Ontario Tech: grade, credits, points; TMU:
+    credits, grade). Returns None when the row doesn't look like a course, so the
+    caller can fall back to the line regexes.
+    """
+    cells = [c.strip() for c in cells if c.strip()]
+    m = CELL_CODE_PATTERN.match(cells[0]) if cells else None
+    if not m:
+        return None
+    rest = ([m.group("rest")] if m.group("rest") else []) + cells[1:]
+    if rest:
+        head, _, tail = rest[0].partition(" ")
+        if head.upper() in LEVEL_TOKENS:
+            rest = ([tail] if tail else []) + rest[1:]
+
+    title_parts: List[str] = []
+    grade: Optional[str] = None
+    credits: Optional[float] = None
+    for cell in rest:
+        if NUMBER_CELL_PATTERN.match(cell):
+            if credits is None:
+                credits = float(cell)
+        elif GRADE_CELL_PATTERN.match(cell):
+            if grade is None:
+                grade = cell.upper()
+        elif grade is None and credits is None:
+            title_parts.append(cell)
+
+    title = " ".join(title_parts)
+    if grade is None and title:
+        # grade cell glued to the title when the column gap was narrow
+        head, _, last = title.rpartition(" ")
+        if head and GRADE_CELL_PATTERN.match(last):
+            title, grade = head, last.upper()
+    if grade is None and credits is None:
+        return None
+
+    return ExtractedCourse(
+        course_code=_norm_course_code(m.group("subj"), m.group("num")),
+        course_title=_clean_title(title) or None,
+        credits=credits,
+        grade=grade,
+        term=term,
+        confidence=0.95,
+        flags=[]
+    )
+
+def _match_family(family: str, line: str) -> Tuple[Optional[str], Optional[re.Match]]:
+    for kind, pattern in ROW_FAMILIES[family][1]:
+        if kind == "tmu_minimal" and len(line) >= 120:
+            continue
+        m = pattern.match(line)
+        if m:
+            return kind, m
+    return None, None
+
+def classify_line(line: str, row_families: Optional[Sequence[str]] = None) -> Tuple[Optional[str], Optional[re.Match]]:
+    """
+    First course-row pattern matching a (stripped) line, in priority order:
+    "row" (full Ontario Tech row), "inprogress", "tmu", "tmu_minimal".
+    row_families limits the patterns to those families (e.g. the detected
+    institution's). Returns (None, None) for non-course lines, usually after
+    one prefix check.
+    """
+    if row_families is not None:
+        for family in row_families:
+            if ROW_FAMILIES[family][0].match(line):
+                kind, m = _match_family(family, line)
+                if kind is not None:
+                    return kind, m
+        return None, None
+
+    lead = ROW_LEAD.match(line)
+    if lead is None:
+        return None, None
+    if lead.group("ot"):
+        kind, m = _match_family("ontariotech", line)
+        if kind is not None:
+            return kind, m
+        # the alternation stopped at the Ontario Tech branch, so re-check the TMU prefix
+        if not TMU_ROW_LEAD.match(line):
+            return None, None
+    return _match_family("tmu", line)
+
+def _course_from_match(kind: str, m: re.Match, term: Optional[str]) -> ExtractedCourse:
+    code = _norm_course_code(m.group("subj").upper(), m.group("num").upper())
+
+    # Full structured row (best signal): "CSCI 1030U UG Intro to Computer Science A+ 3.000 12.90"
+    if kind == "row":
+        title = _clean_title(m.group("title"))
+        grade = m.group("grade").upper()
+        return ExtractedCourse(
+            course_code=code,
+            course_title=title or None,
+            credits=float(m.group("credits")),
+            grade=grade or None,
+            term=term,
+            confidence=0.95,
+            flags=[]
+        )
+
+    # In-progress row (no grade)
+    if kind == "inprogress":
+        title = _clean_title(m.group("title"))
+        return ExtractedCourse(
+            course_code=code,
+            course_title=title or None,
+            credits=float(m.group("credits")),
+            grade=None,
+            term=term,
+            confidence=0.85,
+            flags=["grade_missing"]
+        )
+
+    # TMU-style row: CPS 109, CPS 109 3.0 A, CPS 109 - Title 3.0 B+
+    if kind == "tmu":
+        title = _clean_title(m.group("title") or "")
+        try:
+            credits = float(m.group("credits"))
+        except (TypeError, ValueError):
+            credits = None
+        grade = (m.group("grade") or "").strip().upper() or None
+        return ExtractedCourse(
+            course_code=code,
+            course_title=title or None,
+            credits=credits,
+            grade=grade,
+            term=term,
+            confidence=0.9,
+            flags=[]
+        )
+
+    # TMU minimal: "CPS 109" or "CPS 109 - Title" (no credits/grade)
+    title = _clean_title(m.group("title") or "")
+    return ExtractedCourse(
+        course_code=code,
+        course_title=title or None,
+        credits=None,
+        grade=None,
+        term=term,
+        confidence=0.75,
+        flags=["credits_missing", "grade_missing"]
+    )
+
+def extract_courses_from_text(text: str, row_families: Optional[Sequence[str]] = None) -> Tuple[List[ExtractedCourse], List[str]]:
+    """
+    Extract course rows from transcript text. row_families restricts the row
+    patterns to the given families (see ROW_FAMILIES); None tries all of them.
+    """
     warnings: List[str] = []
     courses: List[ExtractedCourse] = []
 
@@ -78,8 +257,9 @@ def extract_courses_from_text(text: str) -> Tuple[List[ExtractedCourse], List[st
     current_term: Optional[str] = None
 
     for line_num, line in enumerate(lines):
-        # Track term headers (this fixes term_missing)
-        m_term = TERM_HEADER_PATTERN.search(line)
+        # Track term headers (this fixes term_missing); the substring test skips the regex on most lines
+        lowered = line.lower()
+        m_term = TERM_HEADER_PATTERN.search(line) if "term:" in lowered else None
         if m_term:
             season = m_term.group(1)
             year = m_term.group(2)
@@ -92,93 +272,16 @@ def extract_courses_from_text(text: str) -> Tuple[List[ExtractedCourse], List[st
             if m_inline and "Term Totals" not in line:
                 current_term = f"{m_inline.group(1)} {m_inline.group(2)}"
 
-        # Parse full structured row first (best signal)
-        m_row = COURSE_ROW_PATTERN.match(line)
-        if m_row:
-            subj = m_row.group("subj").upper()
-            num = m_row.group("num").upper()
-            code = _norm_course_code(subj, num)
-            title = _clean_title(m_row.group("title"))
-            grade = m_row.group("grade").upper()
-            credits = float(m_row.group("credits"))
-
-            course = ExtractedCourse(
-                course_code=code,
-                course_title=title or None,
-                credits=credits,
-                grade=grade or None,
-                term=current_term,
-                confidence=0.95,
-                flags=[]
-            )
-            courses.append(course)
-            continue
+        # Column-table row: fields are already separated
+        if "\t" in line:
+            course = _course_from_cells(line.split("\t"), current_term)
+            if course is not None:
+                courses.append(course)
+                continue
 
-        # In-progress row (no grade)
-        m_inprog = COURSE_ROW_INPROGRESS_PATTERN.match(line)
-        if m_inprog:
-            subj = m_inprog.group("subj").upper()
-            num = m_inprog.group("num").upper()
-            code = _norm_course_code(subj, num)
-            title = _clean_title(m_inprog.group("title"))
-            credits = float(m_inprog.group("credits"))
-
-            course = ExtractedCourse(
-                course_code=code,
-                course_title=title or None,
-                credits=credits,
-                grade=None,
-                term=current_term,
-                confidence=0.85,
-                flags=["grade_missing"]
-            )
-            courses.append(course)
-            continue
-
-        # TMU-style row: CPS 109, CPS 109 3.0 A, CPS 109 - Title 3.0 B+
-        m_tmu = TMU_ROW_PATTERN.match(line)
-        if m_tmu:
-            subj = m_tmu.group("subj").upper()
-            num = m_tmu.group("num").upper()
-            code = _norm_course_code(subj, num)
-            title = _clean_title(m_tmu.group("title") or "")
-            try:
-                credits = float(m_tmu.group("credits"))
-            except (TypeError, ValueError):
-                credits = None
-            grade = (m_tmu.group("grade") or "").strip().upper() or None
-
-            course = ExtractedCourse(
-                course_code=code,
-                course_title=title or None,
-                credits=credits,
-                grade=grade,
-                term=current_term,
-                confidence=0.9,
-                flags=[]
-            )
-            courses.append(course)
-            continue
-
-        # TMU minimal: "CPS 109" or "CPS 109 - Title" (no credits/grade)
-        m_tmu_min = TMU_ROW_MINIMAL_PATTERN.match(line)
-        if m_tmu_min and len(line) < 120:
-            subj = m_tmu_min.group("subj").upper()
-            num = m_tmu_min.group("num").upper()
-            code = _norm_course_code(subj, num)
-            title = _clean_title(m_tmu_min.group("title") or "")
-
-            course = ExtractedCourse(
-                course_code=code,
-                course_title=title or None,
-                credits=None,
-                grade=None,
-                term=current_term,
-                confidence=0.75,
-                flags=["credits_missing", "grade_missing"]
-            )
-            courses.append(course)
-            continue
+        kind, m = classify_line(line, row_families)
+        if kind is not None:
+            courses.append(_course_from_match(kind, m, current_term))
 
     # De-dupe (code+term)
     deduped: List[ExtractedCourse] = []
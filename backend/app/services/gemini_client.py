@@ -0,0 +1,347 @@
+# backend/app/services/gemini_client.py
+"""
+Long-lived async Gemini client shared by all recommendation requests.
+
+One genai.Client is built on first use and its async API (client.aio) is used,
+so a slow LLM call holds no worker thread. Every call goes through:
+
+  - a semaphore capping in-flight upstream requests (GEMINI_MAX_CONCURRENCY);
+    time spent waiting for a slot counts against the deadline
+  - a deadline for the whole call, retries included (GEMINI_TIMEOUT seconds)
+  - retries of transient failures (429, 5xx, timeouts, connection errors) with
+    exponential backoff and full jitter (GEMINI_MAX_RETRIES)
+  - a circuit breaker: after GEMINI_BREAKER_FAILURES consecutive failed calls
+    (one per call, however many attempts it made) calls fail fast with
+    CircuitOpenError for GEMINI_BREAKER_RESET seconds, then a single probe
+    call decides whether to close it again
+
+A call whose deadline passes while it waits for a slot raises LLMTimeout
+without counting towards the breaker: the upstream never saw it, the local
+queue is just long. So does one that got its slot with less than
+MIN_UPSTREAM_SHARE of its budget left and ran out of it upstream.
+
+Client errors (bad request, auth) are raised as-is, without retries, and don't
+count towards the breaker: the upstream answered.
+
+LLM_BACKEND picks what the manager talks to: "gemini" (default), or the local
+stand-ins of llm_stub.py ("stub" in process, "stub-http" over localhost) for
+load tests; register_backend() adds others.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from google import genai
+    GEMINI_AVAILABLE = True
+except ImportError:
+    GEMINI_AVAILABLE = False
+    genai = None
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# an upstream timeout only counts against Gemini if the attempt had this share of the call's budget
+MIN_UPSTREAM_SHARE = 0.5
+
+
+class LLMError(RuntimeError):
+    pass
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+class LLMNotConfigured(LLMError):
+    """No usable backend here (SDK or API key missing): not an upstream failure."""
+
+
+class _SlotTimeout(Exception):
+    """The deadline passed (mostly) while waiting for a concurrency slot."""
+
+
+class CircuitOpenError(LLMError):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Gemini is unavailable (circuit open); retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient upstream failures worth another attempt (and counted by the breaker)."""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    # google.genai.errors.APIError and httpx status errors carry the HTTP status
+    code = getattr(exc, "code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if code in RETRYABLE_STATUS:
+        return True
+    # httpx transport errors (connect/read failures) without a response
+    return type(exc).__module__.startswith("httpx") and code is None
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures -> half-open probe after `reset_timeout`."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self._probing or self.clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go upstream now."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            waited = self.clock() - self.opened_at
+            if waited < self.reset_timeout:
+                raise CircuitOpenError(self.reset_timeout - waited)
+            if self._probing:
+                # one probe at a time; everyone else keeps failing fast until it reports
+                raise CircuitOpenError(1)
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def abandon(self) -> None:
+        """A call ended without an answer either way (cancelled): free the probe slot."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._probing:
+                    self.times_opened += 1
+                self.opened_at = self.clock()
+                self._probing = False
+
+
+def _build_client():
+    if not GEMINI_AVAILABLE:
+        raise LLMNotConfigured("google-genai package not installed. Install with: pip install google-genai")
+    # If GEMINI_API_KEY is set, SDK picks it up automatically; we pass explicitly too.
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise LLMNotConfigured("Missing GEMINI_API_KEY env var. Set it in your environment or .env file.")
+    return genai.Client(api_key=api_key)
+
+
+def _stub_client():
+    from app.services.llm_stub import StubGenAIClient
+    return StubGenAIClient.from_env()
+
+
+def _stub_http_client():
+    from app.services.llm_stub import HTTPStubClient
+    return HTTPStubClient.from_env()
+
+
+# LLM_BACKEND name -> factory of a genai.Client-shaped client (aio.models.generate_content)
+LLM_BACKENDS: Dict[str, Callable[[], Any]] = {
+    "gemini": _build_client,
+    "stub": _stub_client,
+    "stub-http": _stub_http_client,
+}
+
+
+def register_backend(name: str, factory: Callable[[], Any]) -> None:
+    """Make another backend selectable with LLM_BACKEND=name (before the first call)."""
+    LLM_BACKENDS[name] = factory
+
+
+class GeminiClientManager:
+    def __init__(
+        self,
+        client_factory: Callable[[], Any] = _build_client,
+        max_concurrency: int = 4,
+        timeout: float = 30.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        breaker: Optional[CircuitBreaker] = None,
+        backend: str = "gemini",
+    ):
+        self.client_factory = client_factory
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.backend = backend
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.slot_timeouts = 0
+        self.rejected = 0
+
+    def client(self) -> Any:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self.client_factory()
+        return self._client
+
+    def _slots(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one loop (tests and scripts may run several)
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max, base * 2^attempt)]."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _attempt(self, model: str, contents: Any, deadline: float, budget: float) -> str:
+        slots = self._slots()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise _SlotTimeout() from None
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise _SlotTimeout()
+            try:
+                resp = await asyncio.wait_for(
+                    self.client().aio.models.generate_content(model=model, contents=contents), remaining
+                )
+            except asyncio.TimeoutError:
+                if remaining < budget * MIN_UPSTREAM_SHARE:
+                    raise _SlotTimeout() from None
+                raise
+        finally:
+            self.in_flight -= 1
+            slots.release()
+        return resp.text or ""
+
+    async def generate(self, model: str, contents: Any, timeout: Optional[float] = None) -> str:
+        """Response text for one prompt; raises LLMTimeout, CircuitOpenError or the upstream error."""
+        self.calls += 1
+        budget = timeout or self.timeout
+        deadline = time.monotonic() + budget
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.rejected += 1
+            raise
+        attempt = 0
+        while True:
+            try:
+                text = await self._attempt(model, contents, deadline, budget)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except LLMNotConfigured:
+                # nothing was sent upstream: says nothing about Gemini's health
+                self.breaker.abandon()
+                self.failures += 1
+                raise
+            except _SlotTimeout:
+                self.failures += 1
+                self.timeouts += 1
+                self.slot_timeouts += 1
+                # only upstream failures of this call count (once), not the local queue
+                if attempt:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.abandon()
+                raise LLMTimeout(f"Gemini did not answer within {budget:g}s (queued behind {self.max_concurrency} in-flight calls)") from None
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.record_success()
+                    self.failures += 1
+                    raise
+                delay = self._backoff(attempt)
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    # one failure per call, after its retries are spent
+                    self.breaker.record_failure()
+                    self.failures += 1
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.timeouts += 1
+                        raise LLMTimeout(f"Gemini did not answer within {budget:g}s") from e
+                    raise
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return text
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting_for_slot": self.waiting,
+            "timeout_seconds": self.timeout,
+            "max_retries": self.max_retries,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "slot_timeouts": self.slot_timeouts,
+            "rejected_circuit_open": self.rejected,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "consecutive_failures": self.breaker.failures,
+        }
+
+
+# Singleton (configured from env on first use)
+_gemini_client: Optional[GeminiClientManager] = None
+_gemini_client_lock = threading.Lock()
+
+def get_gemini_client() -> GeminiClientManager:
+    global _gemini_client
+    if _gemini_client is None:
+        with _gemini_client_lock:
+            if _gemini_client is None:
+                backend = os.getenv("LLM_BACKEND", "gemini").strip().lower()
+                if backend not in LLM_BACKENDS:
+                    raise RuntimeError(f"Unknown LLM_BACKEND {backend!r}; expected one of {sorted(LLM_BACKENDS)}")
+                _gemini_client = GeminiClientManager(
+                    LLM_BACKENDS[backend],
+                    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")),
+                    timeout=float(os.getenv("GEMINI_TIMEOUT", "30")),
+                    max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "2")),
+                    breaker=CircuitBreaker(
+                        failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+                        reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET", "30")),
+                    ),
+                    backend=backend,
+                )
+    return _gemini_client
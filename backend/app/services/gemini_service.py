@@ -2,23 +2,38 @@ import os
 import json
 from typing import Any, Dict, List
 
-try:
-    from google import genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    genai = None
-
-def _client():
-    if not GEMINI_AVAILABLE:
-        raise RuntimeError("google-genai package not installed. Install with: pip install google-genai")
-    # If GEMINI_API_KEY is set, SDK picks it up automatically; we pass explicitly too.
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("Missing GEMINI_API_KEY env var. Set it in your environment or .env file.")
-    return genai.Client(api_key=api_key)
-
-def recommend_3_careers(enriched_courses: List[Dict[str, Any]]) -> Dict[str, Any]:
+from app.services.gemini_client import GeminiClientManager, get_gemini_client
+from app.services.llm_cache_service import get_llm_cache, llm_cache_key
+
+# Bump when a prompt changes meaningfully: cached responses are keyed on it
+CAREERS_PROMPT_VERSION = "1"
+PROJECTS_PROMPT_VERSION = "1"
+
+def _model() -> str:
+    # Pick a fast model; adjust if you want higher quality later
+    return os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+def _parse_json_response(text: str) -> Dict[str, Any]:
+    text = (text or "").strip()
+
+    # Clean up JSON if wrapped in markdown code blocks
+    if text.startswith("```"):
+        lines = text.split("\n")
+        text = "\n".join(lines[1:-1]) if len(lines) > 2 else text
+    if text.startswith("```json"):
+        lines = text.split("\n")
+        text = "\n".join(lines[1:-1]) if len(lines) > 2 else text
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise RuntimeError(f"Failed to parse Gemini response as JSON: {e}\nResponse text: {text[:500]}")
+
+async def _generate_json(client: GeminiClientManager, prompt: str, model: str) -> Dict[str, Any]:
+    # Pooled async client: bounded concurrency, retries, deadline, circuit breaker
+    return _parse_json_response(await client.generate(model, prompt))
+
+async def recommend_3_careers(enriched_courses: List[Dict[str, Any]]) -> Dict[str, Any]:
     # Sort by importance, take top ~12 signals to keep prompt small
     ranked = sorted(enriched_courses, key=lambda x: x.get("importance", 0), reverse=True)[:12]
 
@@ -73,32 +88,14 @@ Input:
 {json.dumps(payload, ensure_ascii=False)}
 """
 
-    client = _client()
-    # Pick a fast model; adjust if you want higher quality later
-    model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-
-    resp = client.models.generate_content(
-        model=model,
-        contents=prompt,
-    )
-
-    text = (resp.text or "").strip()
-    
-    # Clean up JSON if wrapped in markdown code blocks
-    if text.startswith("```"):
-        lines = text.split("\n")
-        text = "\n".join(lines[1:-1]) if len(lines) > 2 else text
-    if text.startswith("```json"):
-        lines = text.split("\n")
-        text = "\n".join(lines[1:-1]) if len(lines) > 2 else text
-    
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError as e:
-        raise RuntimeError(f"Failed to parse Gemini response as JSON: {e}\nResponse text: {text[:500]}")
+    # Identical payloads (frontend re-requests on navigation) share one Gemini call
+    model = _model()
+    client = get_gemini_client()
+    key = llm_cache_key("careers", payload, model, CAREERS_PROMPT_VERSION, backend=client.backend)
+    return await get_llm_cache().get_or_compute(key, lambda: _generate_json(client, prompt, model))
 
 
-def recommend_3_projects(career_title: str, career_description: str) -> Dict[str, Any]:
+async def recommend_3_projects(career_title: str, career_description: str) -> Dict[str, Any]:
     """
     Generate 3 project recommendations based on the selected career path.
     Returns project details including name, description, difficulty, tech stack, and image URL.
@@ -135,25 +132,8 @@ Output schema:
 Make projects diverse in difficulty and complementary to the career path.
 """
 
-    client = _client()
-    model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-
-    resp = client.models.generate_content(
-        model=model,
-        contents=prompt,
-    )
-
-    text = (resp.text or "").strip()
-
-    # Clean up JSON if wrapped in markdown code blocks
-    if text.startswith("```"):
-        lines = text.split("\n")
-        text = "\n".join(lines[1:-1]) if len(lines) > 2 else text
-    if text.startswith("```json"):
-        lines = text.split("\n")
-        text = "\n".join(lines[1:-1]) if len(lines) > 2 else text
-
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError as e:
-        raise RuntimeError(f"Failed to parse Gemini response as JSON: {e}\nResponse text: {text[:500]}")
+    model = _model()
+    payload = {"career_title": career_title, "career_description": career_description}
+    client = get_gemini_client()
+    key = llm_cache_key("projects", payload, model, PROJECTS_PROMPT_VERSION, backend=client.backend)
+    return await get_llm_cache().get_or_compute(key, lambda: _generate_json(client, prompt, model))
@@ -0,0 +1,74 @@
+"""
+Registry of institution-specific transcript parsers.
+
+Each institution declares a cheap fingerprint (a regex run on the head of the
+extracted text, i.e. the first page) and the course-row pattern families its
+transcripts use (see course_extract_service.ROW_FAMILIES). parse_transcript_pdf
+detects the institution first and only runs that institution's row patterns on
+the rest of the document; undetected transcripts, and detected ones in which
+those patterns find no rows, still try every family.
+
+Adding a school: register_parser(InstitutionParser(...)) with its fingerprint,
+row families (reuse an existing one or add a family to course_extract_service)
+and the catalog_service school key used for enrichment.
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+
+# Characters of extracted text the fingerprints look at (roughly the first page)
+FINGERPRINT_CHARS = 4000
+
+
+@dataclass(frozen=True)
+class InstitutionParser:
+    key: str
+    name: str
+    fingerprint: Pattern
+    row_families: Tuple[str, ...]
+    catalog_school: Optional[str] = None
+
+    def matches(self, text: str) -> bool:
+        return self.fingerprint.search(text) is not None
+
+
+_REGISTRY: Dict[str, InstitutionParser] = {}
+
+
+def register_parser(parser: InstitutionParser) -> None:
+    """Add (or replace) an institution; detection tries them in registration order."""
+    _REGISTRY[parser.key] = parser
+
+
+def get_parser(key: str) -> Optional[InstitutionParser]:
+    return _REGISTRY.get(key)
+
+
+def list_parsers() -> List[InstitutionParser]:
+    return list(_REGISTRY.values())
+
+
+def detect_institution(text: str, head_chars: int = FINGERPRINT_CHARS) -> Optional[InstitutionParser]:
+    """The first registered institution whose fingerprint matches the head of the text."""
+    head = (text or "")[:head_chars]
+    for parser in _REGISTRY.values():
+        if parser.matches(head):
+            return parser
+    return None
+
+
+register_parser(InstitutionParser(
+    key="ontariotech",
+    name="Ontario Tech University",
+    fingerprint=re.compile(r"Ontario\s+Tech\s+University|University\s+of\s+Ontario\s+Institute\s+of\s+Technology", re.IGNORECASE),
+    row_families=("ontariotech",),
+    catalog_school="ontariotech",
+))
+register_parser(InstitutionParser(
+    key="tmu",
+    name="Toronto Metropolitan University",
+    # the acronym only as a capitalised word: "tmu" occurs inside ordinary words
+    fingerprint=re.compile(r"(?i:\bToronto\s+Metropolitan\s+University\b|\bRyerson\s+University\b)|\bTMU\b"),
+    row_families=("tmu",),
+    catalog_school="tmu",
+))
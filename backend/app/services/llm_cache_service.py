@@ -0,0 +1,274 @@
+# backend/app/services/llm_cache_service.py
+"""
+Response cache for Gemini recommendations (gemini_service).
+
+The frontend re-requests recommendations on navigation, so the same ranked
+course payload reaches Gemini again and again. Responses are cached under a
+canonical hash of (kind, payload, model, prompt version): bumping a prompt
+version or switching GEMINI_MODEL never serves an answer produced for another
+prompt. Entries expire after GEMINI_CACHE_TTL seconds; a bounded in-process LRU
+sits in front of an optional shared backend chosen with GEMINI_CACHE_BACKEND:
+
+  - "memory" (default): in-process LRU only
+  - "sqlite": GEMINI_CACHE_DB, shared by workers on one host and kept across restarts
+
+Misses are single-flight: concurrent identical requests wait for the first
+one's upstream call instead of each making their own. Failures are not cached.
+get_or_compute only touches the LRU on the event loop; backend reads and writes
+run on worker threads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+DEFAULT_CACHE_DB = Path(__file__).resolve().parents[2] / "gemini_cache.db"
+
+
+def llm_cache_key(kind: str, payload: Any, model: str, prompt_version: str, backend: str = "gemini") -> str:
+    """
+    Canonical hash of everything a response depends on (key order in payload
+    doesn't matter). The backend is part of it so stub answers from a load test
+    never come back from a shared cache as real Gemini ones.
+    """
+    canonical = {"kind": kind, "payload": payload, "model": model, "prompt_version": prompt_version, "backend": backend}
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------------------------
+# Shared backend (optional)
+# -------------------------------------------------------------------
+class SQLiteLLMCacheBackend:
+    """One row per key with its expiry time; expired rows are pruned on write."""
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: Path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads; one per handler thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        row = self._conn().execute(
+            "SELECT expires_at, value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at)
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+
+    def clear(self) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+
+# -------------------------------------------------------------------
+# LRU front + single-flight + metrics
+# -------------------------------------------------------------------
+class LLMResponseCache:
+    def __init__(self, max_entries: int = 512, ttl: float = 86400, backend: Any = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        # key -> (expires_at, response JSON)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled():
+            return None
+        cached = self._get_memory(key)
+        return cached if cached is not None else self._get_backend(key)
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        """LRU lookup only: cheap enough for the event loop. Misses are counted by _get_backend."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(entry[1])
+                del self._entries[key]
+                self.expirations += 1
+        return None
+
+    def _get_backend(self, key: str) -> Optional[Dict[str, Any]]:
+        """Shared backend lookup (blocking I/O); a hit is copied into the LRU."""
+        entry = None
+        if self.backend is not None:
+            try:
+                entry = self.backend.get(key)
+            except Exception:
+                entry = None  # a flaky shared backend must never fail a recommendation
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.backend_hits += 1
+            self._store_locked(key, entry)
+        return json.loads(entry[1])
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        entry = self._remember(key, response)
+        if entry is not None:
+            self._write_backend(key, entry)
+
+    def _remember(self, key: str, response: Dict[str, Any]) -> Optional[Tuple[float, str]]:
+        if not self.enabled():
+            return None
+        entry = (time.time() + self.ttl, json.dumps(response, ensure_ascii=False))
+        with self._lock:
+            self._store_locked(key, entry)
+        return entry
+
+    def _write_backend(self, key: str, entry: Tuple[float, str]) -> None:
+        if self.backend is not None:
+            try:
+                self.backend.set(key, entry[1], entry[0])
+            except Exception:
+                pass
+
+    def _store_locked(self, key: str, entry: Tuple[float, str]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Cached response for `key`, else await compute() once: callers arriving
+        while it runs await the same task (its result or its exception) instead
+        of calling upstream. The task is shielded, so a caller that disconnects
+        doesn't cancel the call the others are waiting for.
+        """
+        # only the in-process LRU is read here; the shared backend is read by the flight
+        cached = self._get_memory(key) if self.enabled() else None
+        if cached is not None:
+            return cached
+        # no await between the lookup and registering the flight: single-flight per event loop
+        flight = self._inflight.get(key)
+        if flight is None or flight.get_loop() is not asyncio.get_running_loop():
+            flight = self._inflight[key] = asyncio.ensure_future(self._fill(key, compute))
+            flight.add_done_callback(lambda done: self._flight_done(key, done))
+        else:
+            with self._lock:
+                self.coalesced += 1
+        response = await asyncio.shield(flight)
+        # every caller gets its own copy, like a cache hit
+        return json.loads(json.dumps(response, ensure_ascii=False))
+
+    def _flight_done(self, key: str, flight: "asyncio.Future[Dict[str, Any]]") -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if not flight.cancelled():
+            flight.exception()  # retrieved: all its callers may have gone away
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        # the shared backend (SQLite) blocks: read and write it on a worker thread
+        if self.enabled():
+            if self.backend is not None:
+                cached = await asyncio.to_thread(self._get_backend, key)
+            else:
+                cached = self._get_backend(key)
+            if cached is not None:
+                return cached
+        response = await compute()
+        entry = self._remember(key, response)
+        if entry is not None and self.backend is not None:
+            await asyncio.to_thread(self._write_backend, key, entry)
+        return response
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            try:
+                self.backend.clear()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.backend_hits + self.misses
+            return {
+                "enabled": self.enabled(),
+                "backend": type(self.backend).__name__ if self.backend is not None else "memory",
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "backend_hits": self.backend_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round((self.hits + self.backend_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _backend_from_env() -> Any:
+    kind = os.getenv("GEMINI_CACHE_BACKEND", "memory").strip().lower()
+    if kind == "sqlite":
+        return SQLiteLLMCacheBackend(Path(os.getenv("GEMINI_CACHE_DB") or DEFAULT_CACHE_DB))
+    return None
+
+
+# Singleton (configured from env on first use)
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMResponseCache:
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache(
+                    max_entries=int(os.getenv("GEMINI_CACHE_SIZE", "512")),
+                    ttl=float(os.getenv("GEMINI_CACHE_TTL", "86400")),
+                    backend=_backend_from_env(),
+                )
+    return _llm_cache
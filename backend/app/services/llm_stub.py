@@ -0,0 +1,219 @@
+# backend/app/services/llm_stub.py
+"""
+Local stand-in for Gemini, for load and latency testing without an API key.
+
+Answers the career and project prompts of gemini_service with schema-valid JSON
+(careers cite course titles from the prompt; projects name the career), after a
+delay drawn from a configurable distribution, failing a configurable fraction of
+calls with retryable HTTP errors. Two ways to plug it in (LLM_BACKEND):
+
+  - "stub":      StubGenAIClient, in process (no network)
+  - "stub-http": HTTPStubClient talking to the server started with
+                     python -m app.services.llm_stub --port 8765
+                 (LLM_STUB_URL, default http://127.0.0.1:8765)
+
+Both look like genai.Client to GeminiClientManager, so concurrency limits,
+retries, deadlines and the circuit breaker behave exactly as with Gemini.
+
+Latency specs (seconds): "fixed:0.8", "uniform:0.2,1.5", "lognormal:0.8,0.5"
+(median, sigma). Configure with LLM_STUB_LATENCY, LLM_STUB_ERROR_RATE and
+LLM_STUB_ERROR_CODES (comma-separated, default "503,429").
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+CAREERS = (
+    ("Software Developer", "Builds and maintains the apps and services people use every day."),
+    ("Data Analyst", "Turns raw data into charts and answers that help teams decide what to do."),
+    ("Machine Learning Engineer", "Builds systems that learn patterns from data to make predictions."),
+    ("Cybersecurity Analyst", "Protects an organization's computers and data from attacks."),
+    ("Systems Engineer", "Designs how hardware, software and networks fit together reliably."),
+    ("Product Manager", "Decides what a product should do next and keeps the team focused on it."),
+)
+TECH = ("Python", "TypeScript", "React", "FastAPI", "PostgreSQL", "Docker", "PyTorch", "Pandas", "Go", "Redis")
+DIFFICULTIES = ("Beginner", "Intermediate", "Advanced")
+
+
+class StubUpstreamError(Exception):
+    """Injected failure; carries an HTTP status like google.genai.errors.APIError."""
+
+    def __init__(self, code: int):
+        super().__init__(f"Stub LLM error {code}")
+        self.code = code
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Sampler for a latency spec ("fixed:s", "uniform:lo,hi", "lognormal:median,sigma")."""
+    kind, _, args = (spec or "fixed:0").partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] if args else []
+    kind = kind.strip().lower()
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Bad latency spec {spec!r}; use fixed:S, uniform:LO,HI or lognormal:MEDIAN,SIGMA")
+
+
+def _rng_for(prompt: str) -> random.Random:
+    # same prompt, same answer (like a cached upstream); content varies across prompts
+    return random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+
+
+def _course_titles(prompt: str) -> List[str]:
+    start = prompt.rfind("Input:")
+    try:
+        payload = json.loads(prompt[start + len("Input:"):]) if start >= 0 else {}
+    except ValueError:
+        payload = {}
+    return [c.get("title") for c in payload.get("courses", []) if c.get("title")] or ["your coursework"]
+
+
+def answer(prompt: str) -> Dict[str, Any]:
+    """Schema-valid response for a gemini_service prompt."""
+    rng = _rng_for(prompt)
+    if "project advisor" in prompt:
+        match = re.search(r'career path "([^"]+)"', prompt)
+        career = match.group(1) if match else "this career"
+        return {"projects": [
+            {
+                "name": f"{career} Project {i + 1}",
+                "description": f"A hands-on {difficulty.lower()} project for an aspiring {career}. It builds a small but complete tool.",
+                "difficulty": difficulty,
+                "tech_stack": rng.sample(TECH, 3 + i),
+                "estimated_hours": 10 * (i + 1) + rng.randint(0, 9),
+                "learning_outcomes": [f"Skill {j + 1} for {career}" for j in range(3)],
+            }
+            for i, difficulty in enumerate(DIFFICULTIES)
+        ]}
+    titles = _course_titles(prompt)
+    return {"careers": [
+        {
+            "title": title,
+            "description": description,
+            "why_recommended": [f"Strong result in {t}" for t in (titles * 3)[i:i + 3]],
+            "confidence": round(0.9 - 0.1 * i - rng.random() * 0.05, 2),
+        }
+        for i, (title, description) in enumerate(rng.sample(CAREERS, 3))
+    ]}
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubModels:
+    def __init__(self, generate: Callable[..., Any]):
+        self.generate_content = generate
+
+
+class StubGenAIClient:
+    """In-process stand-in with genai.Client's async shape (client.aio.models.generate_content)."""
+
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        error_rate: float = 0.0,
+        error_codes: Sequence[int] = (503, 429),
+        seed: Optional[int] = None,
+    ):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.aio = self
+        self.models = StubModels(self._generate)
+
+    async def _generate(self, model: str, contents: Any) -> StubResponse:
+        self.calls += 1
+        await asyncio.sleep(self.sample_latency(self.rng))
+        if self.rng.random() < self.error_rate:
+            raise StubUpstreamError(self.rng.choice(self.error_codes))
+        return StubResponse(json.dumps(answer(str(contents))))
+
+    @classmethod
+    def from_env(cls) -> "StubGenAIClient":
+        return cls(
+            latency=os.getenv("LLM_STUB_LATENCY", "lognormal:0.8,0.4"),
+            error_rate=float(os.getenv("LLM_STUB_ERROR_RATE", "0")),
+            error_codes=[int(c) for c in os.getenv("LLM_STUB_ERROR_CODES", "503,429").split(",")],
+        )
+
+
+class HTTPStubClient:
+    """genai.Client-shaped client for the stub server (one pooled httpx connection pool)."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.http = httpx.AsyncClient(base_url=self.url, timeout=None)
+        self.aio = self
+        self.models = StubModels(self._generate)
+
+    async def _generate(self, model: str, contents: Any) -> StubResponse:
+        resp = await self.http.post("/generate", json={"model": model, "prompt": str(contents)})
+        if resp.status_code >= 400:
+            raise StubUpstreamError(resp.status_code)
+        return StubResponse(resp.json()["text"])
+
+    @classmethod
+    def from_env(cls) -> "HTTPStubClient":
+        return cls(os.getenv("LLM_STUB_URL", "http://127.0.0.1:8765"))
+
+
+def create_app(client: StubGenAIClient):
+    """FastAPI app for the HTTP stub: POST /generate {"model", "prompt"} -> {"text"}."""
+    from fastapi import FastAPI, HTTPException
+    from pydantic import BaseModel
+
+    class GenerateRequest(BaseModel):
+        model: str
+        prompt: str
+
+    app = FastAPI(title="PathPilot LLM stub")
+
+    @app.post("/generate")
+    async def generate(req: GenerateRequest):
+        try:
+            resp = await client.aio.models.generate_content(model=req.model, contents=req.prompt)
+        except StubUpstreamError as e:
+            raise HTTPException(status_code=e.code, detail=str(e))
+        return {"text": resp.text}
+
+    @app.get("/stats")
+    def stats():
+        return {"calls": client.calls}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local stand-in LLM server (Gemini prompts -> schema-valid JSON)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default=os.getenv("LLM_STUB_LATENCY", "lognormal:0.8,0.4"))
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("LLM_STUB_ERROR_RATE", "0")))
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    client = StubGenAIClient(args.latency, args.error_rate, seed=args.seed)
+    uvicorn.run(create_app(client), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# backend/app/services/local_recommender_service.py
+"""
+Offline career recommender: 3 ranked careers with evidence in milliseconds.
+
+Works on the enriched courses of /enrich/courses (strength, uniqueness and
+importance from scoring_service) and the career profiles of
+career_affinity_service. A careers x terms matrix is precomputed once: each
+profile's keywords weighted by IDF over the catalog's course text, rows
+L2-normalised. Recommending is then one small projection per transcript:
+
+  affinity(course, career) = cosine(course term vector, profile row)
+                             + SEED_BONUS if it is one of the profile's seed courses
+  score(career)            = sum over courses of importance * affinity
+
+Careers are ranked by score (ties in profile order). The courses that
+contribute most are cited as evidence. The answer has the same shape as
+gemini_service.recommend_3_careers, so the LLM answer can replace it later. It
+serves as the instant first response and as the fallback when Gemini is slow
+or unavailable.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.career_affinity_service import load_career_profiles
+from app.services.scoring_service import CatalogStats, build_catalog_stats, tokenize
+from app.utils.course_codes import normalize_course_id
+
+SEED_BONUS = 0.5
+# career score at which confidence reaches 0.5 (confidence = score / (score + CONFIDENCE_HALF))
+CONFIDENCE_HALF = 0.5
+EVIDENCE_LIMIT = 4
+STRONG_STRENGTH = 0.75
+
+
+class LocalCareerRecommender:
+    def __init__(self, profiles: List[dict], stats: Optional[CatalogStats] = None):
+        self.profiles = list(profiles)
+        self.seeds = [set(p.get("seed_courses", [])) for p in self.profiles]
+
+        vocab: Dict[str, int] = {}
+        for p in self.profiles:
+            for kw in p.get("keywords", []):
+                for w in tokenize(kw):
+                    vocab.setdefault(w, len(vocab))
+        self.vocab = vocab
+        self.terms = list(vocab)
+
+        # same smoothing as the affinity matrix; without a catalog every term weighs 1
+        n = stats.N if stats else 0
+        df = stats.df if stats else {}
+        idf = np.array([math.log((n + 1) / (df.get(w, 0) + 1)) + 1.0 for w in self.terms], dtype=np.float32)
+        self.idf = idf
+
+        matrix = np.zeros((len(self.profiles), len(vocab)), dtype=np.float32)
+        for r, p in enumerate(self.profiles):
+            for kw in p.get("keywords", []):
+                for w in tokenize(kw):
+                    matrix[r, vocab[w]] = idf[vocab[w]]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    def _affinities(self, courses: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """(courses x careers) cosine affinity plus seed bonus."""
+        out = np.zeros((len(courses), len(self.profiles)), dtype=np.float32)
+        for i, c in enumerate(courses):
+            counts = Counter(w for w in tokenize(f"{c.get('title') or ''} {c.get('catalog_description') or ''}") if w in self.vocab)
+            if counts:
+                idx = np.fromiter((self.vocab[w] for w in counts), dtype=np.intp, count=len(counts))
+                vec = np.fromiter(counts.values(), dtype=np.float32, count=len(counts)) * self.idf[idx]
+                out[i] = self.matrix[:, idx] @ (vec / np.linalg.norm(vec))
+            code = normalize_course_id(c.get("catalog_code") or c.get("title") or "")
+            if code:
+                for r, seeds in enumerate(self.seeds):
+                    if code in seeds:
+                        out[i, r] += SEED_BONUS
+        return out
+
+    def _matched_terms(self, course: Dict[str, Any], profile: dict) -> List[str]:
+        keywords = {w for kw in profile.get("keywords", []) for w in tokenize(kw)}
+        seen: List[str] = []
+        for w in tokenize(f"{course.get('title') or ''} {course.get('catalog_description') or ''}"):
+            if w in keywords and w not in seen:
+                seen.append(w)
+        return seen
+
+    def _why(self, course: Dict[str, Any], profile: dict) -> str:
+        title = course.get("title") or "A course"
+        grade = f" ({course['grade']})" if course.get("grade") else ""
+        code = normalize_course_id(course.get("catalog_code") or title)
+        if code and code in profile.get("seed_courses", []):
+            return f"{title}{grade} is a core course for this path"
+        terms = self._matched_terms(course, profile)[:3]
+        lead = "Strong result in" if (course.get("strength") or 0) >= STRONG_STRENGTH else "Coursework in"
+        return f"{lead} {title}{grade}" + (f", covering {', '.join(terms)}" if terms else "")
+
+    def recommend(self, courses: Sequence[Dict[str, Any]], limit: int = 3) -> Dict[str, Any]:
+        """Top `limit` careers in recommend_3_careers' schema, plus evidence_courses per career."""
+        courses = list(courses)
+        importance = np.array([float(c.get("importance") or 0.0) for c in courses], dtype=np.float32)
+        contributions = self._affinities(courses) * importance[:, None] if courses else np.zeros((0, len(self.profiles)))
+        scores = contributions.sum(axis=0) if courses else np.zeros(len(self.profiles))
+        # stable: equal scores keep profile order
+        ranked = sorted(range(len(self.profiles)), key=lambda r: -scores[r])[:limit]
+
+        careers = []
+        for r in ranked:
+            profile = self.profiles[r]
+            order = sorted(range(len(courses)), key=lambda i: -contributions[i, r])
+            evidence = [courses[i] for i in order if contributions[i, r] > 0][:EVIDENCE_LIMIT]
+            score = float(scores[r])
+            careers.append({
+                "title": profile.get("title") or profile["key"],
+                "description": profile.get("description") or "",
+                "why_recommended": [self._why(c, profile) for c in evidence]
+                or ["None of your courses so far point strongly to this path"],
+                "confidence": round(score / (score + CONFIDENCE_HALF), 2) if score > 0 else 0.0,
+                "evidence_courses": [c.get("title") for c in evidence],
+            })
+        return {"careers": careers}
+
+
+# Singleton (profiles + IDF over the default school's catalog, built on first use)
+_local_recommender: Optional[LocalCareerRecommender] = None
+_local_recommender_lock = threading.Lock()
+
+def get_local_recommender() -> LocalCareerRecommender:
+    global _local_recommender
+    if _local_recommender is None:
+        with _local_recommender_lock:
+            if _local_recommender is None:
+                from app.services.catalog_service import get_catalog_service
+
+                stats = build_catalog_stats(get_catalog_service().get_all_courses())
+                _local_recommender = LocalCareerRecommender(load_career_profiles(), stats)
+    return _local_recommender
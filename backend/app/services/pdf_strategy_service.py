@@ -0,0 +1,114 @@
+"""
+Learned per-template choice of PDF text extraction strategy.
+
+pdf_text_service can extract a page four ways, cheapest first:
+  raw    - page.extract_text(): plain text layer, no layout simulation
+  table  - words clustered into columns, rows emitted as tab-separated cells
+  layout - page.extract_text(layout=True): slower, keeps column spacing
+  words  - extract_words + row reconstruction: for pages the others miss
+
+Every extracted page is recorded here under a template key (detected school +
+a fingerprint of the first page's fonts and size). Once a template has enough
+history, later uploads start with the strategy that usually wins for it,
+instead of walking the ladder from the top.
+
+Stats persist as JSON at PDF_STRATEGY_STATS. Each process merges its own counts
+into the file, so concurrent parse workers may lose a few increments but never
+corrupt it.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from app.services.institution_parsers import detect_institution
+
+STRATEGIES = ("raw", "table", "layout", "words")
+
+DEFAULT_STATS_PATH = Path(__file__).resolve().parents[2] / "pdf_strategy_stats.json"
+# Pages a template needs on record before its preferred strategy is trusted
+MIN_TEMPLATE_PAGES = 3
+# Share of a template's pages a strategy must have won to be tried first
+MIN_WIN_SHARE = 0.8
+
+def detect_school(text: str) -> str:
+    institution = detect_institution(text)
+    return institution.key if institution else "unknown"
+
+
+def template_key(first_page_text: str, fontnames: Iterable[str], width: float, height: float) -> str:
+    """'<school>:<fingerprint>' for the document whose first page is described."""
+    fingerprint = "|".join(sorted(set(fontnames))) + f"|{round(width)}x{round(height)}"
+    return f"{detect_school(first_page_text)}:{hashlib.sha1(fingerprint.encode()).hexdigest()[:10]}"
+
+
+class StrategyStats:
+    def __init__(self, path: Path = DEFAULT_STATS_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Dict[str, float]]] = self._read()
+        # counts added since the last flush, merged into the file by flush()
+        self._delta: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+
+    def _read(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def preferred(self, key: str) -> Optional[str]:
+        """Strategy to try first for this template, or None to use the default ladder."""
+        with self._lock:
+            template = self._stats.get(key) or {}
+            pages = sum(s.get("pages", 0) for s in template.values())
+            if pages < MIN_TEMPLATE_PAGES:
+                return None
+            best = max(template, key=lambda name: template[name].get("pages", 0))
+            return best if template[best].get("pages", 0) / pages >= MIN_WIN_SHARE else None
+
+    def record(self, key: str, strategy: str, rows: int, ms: float) -> None:
+        with self._lock:
+            for target in (self._stats.setdefault(key, {}).setdefault(strategy, {}), self._delta[key][strategy]):
+                target["pages"] = target.get("pages", 0) + 1
+                target["rows"] = target.get("rows", 0) + rows
+                target["ms"] = round(target.get("ms", 0.0) + ms, 3)
+
+    def flush(self) -> None:
+        """Merge counts recorded since the last flush into the stats file."""
+        with self._lock:
+            if not self._delta:
+                return
+            merged = self._read()
+            for key, strategies in self._delta.items():
+                for strategy, counts in strategies.items():
+                    target = merged.setdefault(key, {}).setdefault(strategy, {})
+                    for field, value in counts.items():
+                        target[field] = round(target.get(field, 0) + value, 3)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(merged, f, indent=2, sort_keys=True)
+                os.replace(tmp, self.path)
+            except OSError:
+                return  # stats are advisory; keep the delta for the next flush
+            self._stats = merged
+            self._delta.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+
+# Singleton
+_stats: Optional[StrategyStats] = None
+
+def get_strategy_stats() -> StrategyStats:
+    global _stats
+    if _stats is None:
+        _stats = StrategyStats(Path(os.getenv("PDF_STRATEGY_STATS") or DEFAULT_STATS_PATH))
+    return _stats
@@ -1,14 +1,33 @@
-from typing import Tuple, List
+from typing import Tuple, List, Optional
+import multiprocessing
 import os
+import re
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.services.pdf_strategy_service import STRATEGIES, get_strategy_stats, template_key
+from app.utils.tracing import annotate, record_page
 
-def _rows_from_words(words, y_tol=3):
-    """
-    Group words into rows by their top y coordinate (pdfplumber word dict has 'top', 'x0').
-    This helps reconstruct table-like layouts where columns might be lost.
-    """
-    if not words:
-        return []
+# "adaptive": per page, try the cheapest extractor likely to yield course rows
+# (raw text layer -> column table -> layout -> word rows), starting from the strategy that has
+# worked for this school/template before. "layout": always layout first, then
+# word rows (the original behaviour).
+PDF_EXTRACT_STRATEGY = os.getenv("PDF_EXTRACT_STRATEGY", "adaptive").strip().lower()
 
+# Page-parallel extraction: documents with at least PDF_PARALLEL_MIN_PAGES pages
+# are split into page ranges extracted by PDF_PARALLEL_WORKERS processes (each
+# opens the file itself). Smaller documents, or PDF_PARALLEL_WORKERS<=1, stay
+# sequential since process hand-off costs more than a few pages of extraction.
+# API parse workers (TRANSCRIPT_PARSE_WORKERS>=1) already run one parse per
+# process and turn this off (disable_page_pool); it applies when parsing runs
+# in-process (TRANSCRIPT_PARSE_WORKERS=0) and to scripts.
+PDF_PARALLEL_WORKERS = int(os.getenv("PDF_PARALLEL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+
+def _group_rows(words, y_tol=3):
+    """Group words into rows by their top y coordinate, each row sorted left-to-right."""
     # sort top-to-bottom then left-to-right
     words = sorted(words, key=lambda w: (round(w["top"]), w["x0"]))
 
@@ -28,24 +47,202 @@ def _rows_from_words(words, y_tol=3):
 
     if current:
         rows.append(current)
+    return [sorted(row, key=lambda w: w["x0"]) for row in rows]
+
+def _rows_from_words(words, y_tol=3):
+    """
+    Group words into rows by their top y coordinate (pdfplumber word dict has 'top', 'x0').
+    This helps reconstruct table-like layouts where columns might be lost.
+    """
+    if not words:
+        return []
 
     # join each row left-to-right
     lines = []
-    for row in rows:
-        row_sorted = sorted(row, key=lambda w: w["x0"])
-        line = " ".join(w["text"] for w in row_sorted).strip()
+    for row in _group_rows(words, y_tol):
+        line = " ".join(w["text"] for w in row).strip()
         if line:
             lines.append(line)
     return lines
 
-def extract_text_from_pdf(pdf_path: str) -> Tuple[str, List[str]]:
+def _table_rows_from_words(words, y_tol=3) -> List[List[str]]:
+    """
+    Rebuild table rows as lists of cell strings, keeping column boundaries.
+
+    Words in a row are split into cells wherever the horizontal gap is wider
+    than ~2 characters. The cells' x0 positions across the whole page are then
+    clustered into columns once, and cells landing in the same column are
+    merged (e.g. a title whose words happen to be spaced widely).
+    """
+    if not words:
+        return []
+    rows = _group_rows(words, y_tol)
+
+    widths = sorted((w["x1"] - w["x0"]) / max(1, len(w["text"])) for w in words)
+    char_w = widths[len(widths) // 2] or 1.0
+    gap = 2 * char_w
+
+    split_rows = []
+    for row in rows:
+        cells = [[row[0]]]
+        for prev, w in zip(row, row[1:]):
+            if w["x0"] - prev["x1"] > gap:
+                cells.append([w])
+            else:
+                cells[-1].append(w)
+        split_rows.append([(cell[0]["x0"], " ".join(w["text"] for w in cell)) for cell in cells])
+
+    # column anchors: clusters of cell start positions, left edges within `gap`
+    anchors: List[float] = []
+    for x0 in sorted(x0 for cells in split_rows for x0, _ in cells):
+        if not anchors or x0 - anchors[-1] > gap:
+            anchors.append(x0)
+
+    table = []
+    for cells in split_rows:
+        merged: List[List] = []
+        for x0, text in cells:
+            column = bisect_right(anchors, x0) - 1
+            if merged and merged[-1][0] == column:
+                merged[-1][1] += " " + text
+            else:
+                merged.append([column, text])
+        table.append([text for _, text in merged])
+    return table
+
+# Cheap probes for "will this text parse into course rows": course-code tokens
+# anywhere vs. lines that start with one (what the row regexes need)
+_CODE_TOKEN = re.compile(r'\b[A-Z]{2,5}\s?\d{3,4}[A-Z]?\b')
+_ROW_START = re.compile(r'^\s*[A-Z]{2,5}\s?\d{3,4}[A-Z]?\b', re.MULTILINE)
+# Raw text is accepted when at least this share of course codes begin a line;
+# less means columns were interleaved and layout mode is needed
+RAW_ROW_SHARE = 0.9
+MIN_PAGE_CHARS = 50
+
+def _run_strategy(page, strategy: str) -> Optional[str]:
+    if strategy == "raw":
+        return page.extract_text()
+    if strategy == "table":
+        # one line per row, cells separated by tabs (course_extract reads them as fields)
+        table = _table_rows_from_words(page.extract_words(keep_blank_chars=False, use_text_flow=True))
+        return "\n".join("\t".join(cells) for cells in table) or None
+    if strategy == "layout":
+        return page.extract_text(layout=True)
+    # reconstruct rows from words (captures columns)
+    words = page.extract_words(keep_blank_chars=False, use_text_flow=True)
+    lines = _rows_from_words(words)
+    return "\n".join(lines) if lines else None
+
+def _accepts(strategy: str, text: Optional[str]) -> bool:
+    if strategy == "words":
+        return bool(text)
+    if not text or len(text.strip()) <= MIN_PAGE_CHARS:
+        return False
+    if strategy in ("raw", "table"):
+        codes = len(_CODE_TOKEN.findall(text))
+        if len(_ROW_START.findall(text)) < codes * RAW_ROW_SHARE:
+            return False
+        # a table only helps if columns were actually found
+        return strategy == "raw" or any(line.count("\t") >= 2 for line in text.splitlines())
+    return True
+
+def _extract_page(page, preferred: Optional[str] = None) -> Tuple[Optional[str], str, float]:
+    """
+    Text for one pdfplumber page (None if nothing usable was found), the
+    strategy that produced it, and the milliseconds spent.
+    """
+    started = time.perf_counter_ns()
+    if PDF_EXTRACT_STRATEGY == "layout":
+        ladder = ("layout", "words")
+    else:
+        ladder = ((preferred,) if preferred in STRATEGIES else ()) + tuple(s for s in STRATEGIES if s != preferred)
+    for strategy in ladder:
+        text = _run_strategy(page, strategy)
+        if _accepts(strategy, text):
+            return text, strategy, (time.perf_counter_ns() - started) / 1_000_000
+    return None, "none", (time.perf_counter_ns() - started) / 1_000_000
+
+def _extract_page_range(pdf_path: str, start: int, stop: int, preferred: Optional[str] = None) -> List[Tuple[Optional[str], str, float]]:
+    """Worker entry point: open the PDF independently and extract pages [start, stop)."""
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        return [_extract_page(page, preferred) for page in pdf.pages[start:stop]]
+
+def _template_key(page) -> str:
+    fonts = (c.get("fontname", "") for c in page.chars[:500])
+    return template_key(page.extract_text() or "", fonts, page.width, page.height)
+
+_page_executor: Optional[ProcessPoolExecutor] = None
+_page_executor_lock = threading.Lock()
+_page_pool_disabled = False
+
+def disable_page_pool() -> None:
+    """
+    Keep this process's extraction sequential. Called by the initializers of
+    parse worker pools: a nested page pool per worker would multiply the process
+    count they are meant to bound.
+    """
+    global _page_pool_disabled
+    _page_pool_disabled = True
+
+def _get_page_executor() -> Optional[ProcessPoolExecutor]:
+    global _page_executor
+    if PDF_PARALLEL_WORKERS <= 1 or _page_pool_disabled or multiprocessing.current_process().daemon:
+        # daemonic processes (e.g. multiprocessing.Pool workers) cannot start children
+        return None
+    with _page_executor_lock:
+        if _page_executor is None:
+            _page_executor = ProcessPoolExecutor(max_workers=PDF_PARALLEL_WORKERS)
+        return _page_executor
+
+def _discard_page_executor(broken: ProcessPoolExecutor) -> None:
+    """A crashed page worker breaks the pool for good: drop it so the next PDF starts a new one."""
+    global _page_executor
+    with _page_executor_lock:
+        if _page_executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            _page_executor = None
+
+def _page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Split [0, page_count) into at most `parts` contiguous, near-equal ranges."""
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges, start = [], 0
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def _extract_pages_parallel(
+    pdf_path: str, page_count: int, preferred: Optional[str], warnings: List[str]
+) -> Optional[List[Tuple[Optional[str], str, float]]]:
+    """Per-page results in page order, or None when parallel extraction isn't available/failed."""
+    executor = _get_page_executor()
+    if executor is None:
+        return None
+    ranges = _page_ranges(page_count, PDF_PARALLEL_WORKERS)
+    try:
+        futures = [executor.submit(_extract_page_range, pdf_path, start, stop, preferred) for start, stop in ranges]
+        return [page for f in futures for page in f.result()]
+    except BrokenProcessPool as e:
+        _discard_page_executor(executor)
+        warnings.append(f"Parallel page extraction failed ({e}); extracted sequentially")
+        return None
+    except Exception as e:
+        warnings.append(f"Parallel page extraction failed ({e}); extracted sequentially")
+        return None
+
+def extract_text_from_pdf(pdf_path: str, parallel: Optional[bool] = None) -> Tuple[str, List[str]]:
     """
     Extract text from a PDF file using pdfplumber (preferred) or PyPDF2 (fallback).
-    Uses layout-aware extraction and word-based row reconstruction to capture
-    table columns that might be lost in simple text extraction.
+    Each page uses the cheapest strategy that yields usable course rows (plain
+    text layer, layout-aware extraction, or word-based row reconstruction to
+    capture table columns), learning which one works per school/template.
     
     Args:
         pdf_path: Path to the PDF file
+        parallel: Force page-parallel extraction on/off; None decides by page count
         
     Returns:
         Tuple of (extracted_text, warnings)
@@ -61,21 +258,29 @@ def extract_text_from_pdf(pdf_path: str) -> Tuple[str, List[str]]:
     try:
         import pdfplumber
         with pdfplumber.open(pdf_path) as pdf:
-            pages_text = []
-            for page in pdf.pages:
-                # 1) Try layout-aware extraction
-                page_text = page.extract_text(layout=True)
-                if page_text and len(page_text.strip()) > 50:
-                    pages_text.append(page_text)
-                    continue
+            page_count = len(pdf.pages)
+            adaptive = PDF_EXTRACT_STRATEGY != "layout" and page_count > 0
+            key = _template_key(pdf.pages[0]) if adaptive else None
+            preferred = get_strategy_stats().preferred(key) if adaptive else None
+
+            use_parallel = parallel if parallel is not None else page_count >= PDF_PARALLEL_MIN_PAGES
+            pages = None
+            if use_parallel and page_count > 1:
+                pages = _extract_pages_parallel(pdf_path, page_count, preferred, warnings)
+            if pages is None:
+                pages = [_extract_page(page, preferred) for page in pdf.pages]
 
-                # 2) Fallback: reconstruct rows from words (captures columns)
-                words = page.extract_words(keep_blank_chars=False, use_text_flow=True)
-                lines = _rows_from_words(words)
-                if lines:
-                    pages_text.append("\n".join(lines))
+            for _, strategy, ms in pages:
+                record_page(ms, strategy)
+            if adaptive:
+                annotate("template", key)
+                stats = get_strategy_stats()
+                for page_text, strategy, ms in pages:
+                    if page_text:
+                        stats.record(key, strategy, len(_ROW_START.findall(page_text)), ms)
+                stats.flush()
 
-            text = "\n".join(pages_text).strip()
+            text = "\n".join(t for t, _, _ in pages if t).strip()
             if text:
                 return text, warnings
     except ImportError:
@@ -0,0 +1,154 @@
+# backend/app/services/plan_batch_service.py
+"""
+Cohort plan generation (/plan/generate/batch).
+
+Requests are answered from the plan cache where possible; the rest are grouped
+by completed set so each group's prerequisite structures are compiled once,
+and identical requests inside a group are solved once. Distinct groups fan out
+across a process pool and results are streamed back as NDJSON lines in
+completion order (cache lookups and writes, which may be disk or redis I/O, run
+on worker threads):
+
+  {"type": "result", "index": 3, "cached": false, "plan": {...}}
+  {"type": "error",  "index": 7, "error": "..."}
+  {"type": "summary", "requests": 250, "cache_hits": 40, "groups": 12, ...}
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.models.plan_schemas import PlanRequest, PlanResponse
+from app.services import planner_service
+from app.services.plan_cache_service import get_plan_cache, plan_cache_key
+
+# 0 workers = solve in the event loop's default thread pool instead of processes
+BATCH_WORKERS = int(os.getenv("PLAN_BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Below this many distinct groups, process start-up costs more than it saves
+BATCH_POOL_MIN_GROUPS = int(os.getenv("PLAN_BATCH_POOL_MIN_GROUPS", "8"))
+MAX_BATCH_SIZE = int(os.getenv("PLAN_BATCH_MAX", "5000"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_version: Optional[str] = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(catalog: Dict[str, dict]) -> None:
+    # Workers must plan against the parent's catalog, even after a reload; the
+    # (possibly shared) plan cache is the parent's business
+    if planner_service._compute_catalog_version(catalog) != planner_service.get_catalog_version():
+        planner_service.reload_course_catalog(catalog, invalidate=False)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Shared pool, rebuilt when the planner catalog version changes."""
+    global _pool, _pool_version
+    version = planner_service.get_catalog_version()
+    with _pool_lock:
+        if _pool is None or _pool_version != version:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS,
+                initializer=_init_worker,
+                initargs=(dict(planner_service.COURSE_CATALOG),),
+            )
+            _pool_version = version
+    return _pool
+
+
+def _discard_pool(broken: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died (OOM, crash) so the next _get_pool() starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _line(obj: dict) -> str:
+    return json.dumps(obj, ensure_ascii=False) + "\n"
+
+
+def _group_requests(
+    requests: List[PlanRequest], version: str
+) -> Tuple[List[Tuple[int, PlanResponse]], Dict[Tuple[str, ...], Dict[Tuple[Optional[str], int], List[int]]], List[str]]:
+    """Split into cache hits and misses grouped as completed set -> variant -> request indexes."""
+    cache = get_plan_cache()
+    hits: List[Tuple[int, PlanResponse]] = []
+    groups: Dict[Tuple[str, ...], Dict[Tuple[Optional[str], int], List[int]]] = {}
+    keys: List[str] = []
+    for i, req in enumerate(requests):
+        key = plan_cache_key(req, version)
+        keys.append(key)
+        cached = cache.get(key)
+        if cached is not None:
+            hits.append((i, cached))
+            continue
+        completed = tuple(sorted(set(req.completed_courses)))
+        variant = (req.target_career or None, max(1, req.max_courses_per_term))
+        groups.setdefault(completed, {}).setdefault(variant, []).append(i)
+    return hits, groups, keys
+
+
+async def generate_plans_ndjson(requests: List[PlanRequest]) -> AsyncIterator[str]:
+    started = time.perf_counter()
+    cache = get_plan_cache()
+    hits, groups, keys = await asyncio.to_thread(_group_requests, requests, planner_service.plan_version())
+
+    for i, plan in hits:
+        yield _line({"type": "result", "index": i, "cached": True, "plan": plan.model_dump(mode="json")})
+
+    loop = asyncio.get_running_loop()
+    use_pool = BATCH_WORKERS > 0 and len(groups) >= BATCH_POOL_MIN_GROUPS
+    executor = _get_pool() if use_pool else None
+
+    async def _solve(completed: Tuple[str, ...], variants: Dict[Tuple[Optional[str], int], List[int]]):
+        order = list(variants)
+        try:
+            try:
+                plans = await loop.run_in_executor(executor, planner_service.solve_plan_group, list(completed), order)
+            except BrokenProcessPool:
+                # a worker died: replace the pool and give the group one more try
+                _discard_pool(executor)
+                plans = await loop.run_in_executor(_get_pool(), planner_service.solve_plan_group, list(completed), order)
+            return completed, order, plans, None
+        except Exception as e:
+            return completed, order, None, f"{type(e).__name__}: {e}"
+
+    errors = 0
+    solves = 0
+    tasks = [asyncio.ensure_future(_solve(c, v)) for c, v in groups.items()]
+    for done in asyncio.as_completed(tasks):
+        completed, order, plans, error = await done
+        variants = groups[completed]
+        for j, variant in enumerate(order):
+            indexes = variants[variant]
+            if error is not None:
+                errors += len(indexes)
+                for i in indexes:
+                    yield _line({"type": "error", "index": i, "error": error})
+                continue
+            solves += 1
+            resp = PlanResponse.model_validate(plans[j])
+            await asyncio.to_thread(cache.put, keys[indexes[0]], resp)
+            for i in indexes:
+                yield _line({"type": "result", "index": i, "cached": False, "plan": plans[j]})
+
+    yield _line({
+        "type": "summary",
+        "requests": len(requests),
+        "cache_hits": len(hits),
+        "groups": len(groups),
+        "distinct_solves": solves,
+        "errors": errors,
+        "process_pool": use_pool,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    })
@@ -0,0 +1,223 @@
+# backend/app/services/plan_cache_service.py
+"""
+Result cache for planner_service.generate_plan.
+
+generate_plan is deterministic in (completed set, target_career, max per term)
+plus the catalog version, so responses are cached under a canonical hash of
+those inputs. A bounded in-process LRU sits in front of an optional shared
+backend chosen with PLAN_CACHE_BACKEND:
+
+  - "memory" (default): in-process LRU only
+  - "disk":  one JSON file per key under PLAN_CACHE_DIR (shared by workers on one host)
+  - "redis": any Redis-compatible server at PLAN_CACHE_URL (needs the `redis` package)
+
+Entries are stored as PlanResponse JSON so every hit returns a fresh model that
+callers can mutate freely.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.models.plan_schemas import PlanRequest, PlanResponse
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[2] / "plan_cache"
+REDIS_KEY_PREFIX = "pathpilot:plan:"
+
+
+def plan_cache_key(req: PlanRequest, catalog_version: str) -> str:
+    """
+    Canonical hash of everything generate_plan depends on.
+    Duplicate/reordered completed courses and ""/None careers map to the same key.
+    """
+    canonical = {
+        "completed": sorted(set(req.completed_courses)),
+        "target_career": req.target_career or None,
+        "max_per": max(1, req.max_courses_per_term),
+        "catalog": catalog_version,
+    }
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------------------------
+# Shared backends (optional)
+# -------------------------------------------------------------------
+class DiskPlanCacheBackend:
+    """One JSON file per key; writes go through a temp file + rename."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            return self._path(key).read_text(encoding="utf-8")
+        except (FileNotFoundError, OSError):
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(value, encoding="utf-8")
+        os.replace(tmp, path)
+
+    def clear(self) -> None:
+        for f in self.directory.glob("*.json"):
+            try:
+                f.unlink()
+            except OSError:
+                pass
+
+
+class RedisPlanCacheBackend:
+    """Redis-compatible backend; entries expire after `ttl` seconds (0 = never)."""
+
+    def __init__(self, url: str, ttl: int = 0):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis package not installed. Install with: pip install redis")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[str]:
+        raw = self.client.get(REDIS_KEY_PREFIX + key)
+        return raw.decode("utf-8") if raw is not None else None
+
+    def set(self, key: str, value: str) -> None:
+        self.client.set(REDIS_KEY_PREFIX + key, value, ex=self.ttl or None)
+
+    def clear(self) -> None:
+        for k in self.client.scan_iter(match=REDIS_KEY_PREFIX + "*"):
+            self.client.delete(k)
+
+
+# -------------------------------------------------------------------
+# LRU front + metrics
+# -------------------------------------------------------------------
+class PlanCache:
+    def __init__(self, max_entries: int = 1024, backend: Any = None):
+        self.max_entries = max_entries
+        self.backend = backend
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[PlanResponse]:
+        if not self.enabled():
+            return None
+        with self._lock:
+            raw = self._entries.get(key)
+            if raw is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return PlanResponse.model_validate_json(raw)
+
+        raw = None
+        if self.backend is not None:
+            try:
+                raw = self.backend.get(key)
+            except Exception:
+                raw = None  # a flaky shared backend must never fail a plan request
+
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.backend_hits += 1
+            self._store_locked(key, raw)
+        return PlanResponse.model_validate_json(raw)
+
+    def put(self, key: str, resp: PlanResponse) -> None:
+        if not self.enabled():
+            return
+        raw = resp.model_dump_json()
+        with self._lock:
+            self._store_locked(key, raw)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, raw)
+            except Exception:
+                pass
+
+    def _store_locked(self, key: str, raw: str) -> None:
+        self._entries[key] = raw
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Drop every cached plan (called when the planner catalog is reloaded)."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+        if self.backend is not None:
+            try:
+                self.backend.clear()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.backend_hits + self.misses
+            return {
+                "enabled": self.enabled(),
+                "backend": type(self.backend).__name__ if self.backend is not None else "memory",
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "backend_hits": self.backend_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": round((self.hits + self.backend_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _backend_from_env() -> Any:
+    kind = os.getenv("PLAN_CACHE_BACKEND", "memory").strip().lower()
+    if kind == "disk":
+        return DiskPlanCacheBackend(Path(os.getenv("PLAN_CACHE_DIR") or DEFAULT_CACHE_DIR))
+    if kind == "redis":
+        url = os.getenv("PLAN_CACHE_URL", "redis://localhost:6379/0")
+        return RedisPlanCacheBackend(url, ttl=int(os.getenv("PLAN_CACHE_TTL", "86400")))
+    return None
+
+
+# Singleton (configured from env on first use)
+_plan_cache: Optional[PlanCache] = None
+_plan_cache_lock = threading.Lock()
+
+def get_plan_cache() -> PlanCache:
+    global _plan_cache
+    if _plan_cache is None:
+        with _plan_cache_lock:
+            if _plan_cache is None:
+                _plan_cache = PlanCache(
+                    max_entries=int(os.getenv("PLAN_CACHE_SIZE", "1024")),
+                    backend=_backend_from_env(),
+                )
+    return _plan_cache
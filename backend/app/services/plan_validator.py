@@ -0,0 +1,244 @@
+# backend/app/services/plan_validator.py
+"""
+Incremental plan validator.
+
+Produces exactly the same issues as a full validation pass, but keeps enough
+state (per-term counts, where each course sits, per-course issue counts) that a
+move/add/remove only re-checks the courses it can affect: the moved course and
+the courses that list it as a prerequisite. is_valid() is O(1); issues() walks
+the plan once to render messages in plan order.
+
+One validator is owned by each repair run or interactive session; all edits
+must go through it so the counters stay in sync with the semesters.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.models.plan_schemas import Semester
+
+
+def _dependents_index(catalog: Dict[str, dict]) -> Dict[str, List[str]]:
+    """Reverse prerequisite edges: prereq -> courses that require it."""
+    out: Dict[str, List[str]] = {}
+    for code, info in catalog.items():
+        for p in info.get("prereqs", []):
+            out.setdefault(p, []).append(code)
+    return out
+
+
+class PlanValidator:
+    def __init__(
+        self,
+        semesters: List[Semester],
+        completed_courses: Iterable[str],
+        max_per_term: int,
+        catalog: Optional[Dict[str, dict]] = None,
+    ):
+        if catalog is None:
+            from app.services.planner_service import COURSE_CATALOG
+            catalog = COURSE_CATALOG
+        self.catalog = catalog
+        self.dependents = _dependents_index(catalog)
+        self.completed: Set[str] = set(completed_courses)
+        self.max_per_term = max_per_term
+
+        # Own a private copy so callers' plans are never mutated behind their back
+        self.semesters: List[Semester] = [Semester(term=s.term, courses=list(s.courses)) for s in semesters]
+
+        # course -> term index of every occurrence (duplicates allowed)
+        self._positions: Dict[str, List[int]] = {}
+        # (course, term index) -> issue count for one occurrence at that slot
+        self._slot_issues: Dict[Tuple[str, int], int] = {}
+        self._overloaded: Set[int] = set()
+        self._total = 0
+        self._bad = 0
+
+        for t, sem in enumerate(self.semesters):
+            for c in sem.courses:
+                self._positions.setdefault(c, []).append(t)
+                self._total += 1
+        for t in range(len(self.semesters)):
+            self._refresh_term(t)
+        for c, terms in self._positions.items():
+            for t in set(terms):
+                self._refresh_slot(c, t)
+
+    # ---------------------------------------------------------------
+    # Per-slot rules (mirror the full validator)
+    # ---------------------------------------------------------------
+    def _offered(self, course: str, t: int) -> bool:
+        if course not in self.catalog:
+            return True
+        return self.semesters[t].term in self.catalog[course]["offered"]
+
+    def _missing_prereqs(self, course: str, t: int) -> List[str]:
+        if course not in self.catalog:
+            return []
+        missing = []
+        for p in self.catalog[course]["prereqs"]:
+            if p in self.completed:
+                continue
+            where = self._positions.get(p)
+            if not where or min(where) >= t:
+                missing.append(p)
+        return missing
+
+    def _count_slot(self, course: str, t: int) -> int:
+        n = 0
+        if course in self.completed:
+            n += 1
+        if not self._offered(course, t):
+            n += 1
+        if self._missing_prereqs(course, t):
+            n += 1
+        return n
+
+    def _multiplicity(self, course: str, t: int) -> int:
+        return self._positions.get(course, []).count(t)
+
+    def _refresh_slot(self, course: str, t: int) -> None:
+        key = (course, t)
+        mult = self._multiplicity(course, t)
+        old = self._slot_issues.pop(key, 0)
+        # old count was applied once per occurrence; multiplicity changes are
+        # accounted for by the caller via _forget_slot before mutating
+        self._bad -= old * mult
+        if mult:
+            new = self._count_slot(course, t)
+            if new:
+                self._slot_issues[key] = new
+            self._bad += new * mult
+
+    def _forget_slot(self, course: str, t: int) -> None:
+        """Remove a slot's contribution before its multiplicity changes."""
+        old = self._slot_issues.pop((course, t), 0)
+        self._bad -= old * self._multiplicity(course, t)
+
+    def _refresh_term(self, t: int) -> None:
+        over = len(self.semesters[t].courses) > self.max_per_term
+        if over and t not in self._overloaded:
+            self._overloaded.add(t)
+            self._bad += 1
+        elif not over and t in self._overloaded:
+            self._overloaded.discard(t)
+            self._bad -= 1
+
+    def _refresh_dependents(self, course: str) -> None:
+        for d in self.dependents.get(course, []):
+            for t in set(self._positions.get(d, [])):
+                self._refresh_slot(d, t)
+
+    # ---------------------------------------------------------------
+    # Edits (each O(affected courses))
+    # ---------------------------------------------------------------
+    def _place(self, course: str, t: int, position: Optional[int] = None) -> None:
+        self._forget_slot(course, t)
+        courses = self.semesters[t].courses
+        if position is None or position >= len(courses):
+            courses.append(course)
+        else:
+            courses.insert(max(0, position), course)
+        self._positions.setdefault(course, []).append(t)
+        self._total += 1
+        self._refresh_slot(course, t)
+        self._refresh_term(t)
+
+    def _unplace(self, course: str, t: int, index: Optional[int] = None) -> None:
+        self._forget_slot(course, t)
+        courses = self.semesters[t].courses
+        if index is None:
+            courses.remove(course)
+        else:
+            del courses[index]
+        where = self._positions[course]
+        where.remove(t)
+        if not where:
+            del self._positions[course]
+        self._total -= 1
+        self._refresh_slot(course, t)
+        self._refresh_term(t)
+
+    def find(self, course: str) -> Optional[int]:
+        """Index of the first semester containing course, or None."""
+        for t, sem in enumerate(self.semesters):
+            if course in sem.courses:
+                return t
+        return None
+
+    def add(self, course: str, term_index: int, position: Optional[int] = None) -> None:
+        self._place(course, term_index, position)
+        self._refresh_dependents(course)
+
+    def remove(self, course: str, term_index: int) -> None:
+        """Remove the first occurrence of course from a semester."""
+        self._unplace(course, term_index)
+        self._refresh_dependents(course)
+
+    def pop(self, term_index: int) -> str:
+        """Remove and return the last course of a semester."""
+        courses = self.semesters[term_index].courses
+        course = courses[-1]
+        self._unplace(course, term_index, index=len(courses) - 1)
+        self._refresh_dependents(course)
+        return course
+
+    def move(self, course: str, src_index: int, dst_index: int, position: Optional[int] = None) -> None:
+        self._unplace(course, src_index)
+        self._place(course, dst_index, position)
+        self._refresh_dependents(course)
+
+    def replace(self, old: str, new: str, term_index: int) -> None:
+        """Replace every occurrence of old in one semester with new, in place."""
+        courses = self.semesters[term_index].courses
+        slots = [i for i, c in enumerate(courses) if c == old]
+        for i in reversed(slots):
+            self._unplace(old, term_index, index=i)
+        for i in slots:
+            self._place(new, term_index, position=i)
+        self._refresh_dependents(old)
+        self._refresh_dependents(new)
+
+    # ---------------------------------------------------------------
+    # Results
+    # ---------------------------------------------------------------
+    def has_duplicates(self) -> bool:
+        return self._total != len(self._positions)
+
+    def is_valid(self) -> bool:
+        return self._bad == 0 and not self.has_duplicates()
+
+    def term_counts(self) -> List[int]:
+        return [len(s.courses) for s in self.semesters]
+
+    def _iter_issues(self):
+        for t, sem in enumerate(self.semesters):
+            if t in self._overloaded:
+                yield f"{sem.term}: too many courses (max {self.max_per_term})."
+            for c in sem.courses:
+                if (c, t) not in self._slot_issues:
+                    continue
+                if c in self.completed:
+                    yield f"{c} is already completed but appears in the plan."
+                if not self._offered(c, t):
+                    yield f"{c} is not offered in {sem.term}."
+                missing = self._missing_prereqs(c, t)
+                if missing:
+                    yield f"{c} missing prereqs when scheduled: {missing}"
+        if self.has_duplicates():
+            yield "Duplicate course found across semesters."
+
+    def issues(self) -> List[str]:
+        if self.is_valid():
+            return []
+        return list(self._iter_issues())
+
+    def first_issue(self) -> Optional[str]:
+        if self.is_valid():
+            return None
+        return next(self._iter_issues(), None)
+
+    def result(self) -> Tuple[bool, List[str]]:
+        issues = self.issues()
+        return (len(issues) == 0), issues
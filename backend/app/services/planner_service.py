@@ -2,7 +2,12 @@
 
 from __future__ import annotations
 
-from copy import deepcopy
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
 from typing import Dict, List, Optional, Tuple
 
 from app.models.plan_schemas import (
@@ -11,7 +16,14 @@ from app.models.plan_schemas import (
     Semester,
     RepairRequest,
     RepairResponse,
+    PlanDelta,
+    PlanSessionRequest,
+    PlanDeltaRequest,
+    PlanSessionResponse,
 )
+from app.services.plan_cache_service import get_plan_cache, plan_cache_key
+from app.services.plan_validator import PlanValidator
+from app.services.career_affinity_service import affinity_version, get_career_affinity
 
 # -------------------------------------------------------------------
 # Hackathon-stable demo catalog (edit later without changing APIs)
@@ -25,12 +37,41 @@ COURSE_CATALOG: Dict[str, dict] = {
     "CPS633": {"prereqs": ["CPS305"], "offered": {"Fall", "Winter"}},
 }
 
-# Simple career weighting for deterministic “scoring” selection order
-CAREER_BOOST: Dict[str, List[str]] = {
-    "ai": ["CPS510", "CPS633"],
-    "data": ["CPS510", "CPS633"],
-    "software": ["CPS305", "CPS506"],
-}
+def _compute_catalog_version(catalog: Dict[str, dict]) -> str:
+    canonical = {
+        code: {"prereqs": list(info.get("prereqs", [])), "offered": sorted(info.get("offered", []))}
+        for code, info in catalog.items()
+    }
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+# Changes whenever the catalog is reloaded
+CATALOG_VERSION: str = _compute_catalog_version(COURSE_CATALOG)
+
+def get_catalog_version() -> str:
+    return CATALOG_VERSION
+
+def plan_version() -> str:
+    """
+    Part of every plan cache key: the catalog version plus the career affinity
+    data version (plans are ordered by affinity too), re-checked on every lookup
+    so edited profiles or a rebuilt matrix take effect without a reload.
+    """
+    return f"{CATALOG_VERSION}-{affinity_version()}"
+
+def reload_course_catalog(catalog: Dict[str, dict], invalidate: bool = True) -> str:
+    """
+    Swap in a new planner catalog and invalidate cached plans. Returns the new version.
+    invalidate=False only installs it (batch workers adopting the parent's catalog
+    must not clear a cache shared with every other process).
+    """
+    global CATALOG_VERSION
+    COURSE_CATALOG.clear()
+    COURSE_CATALOG.update(catalog)
+    CATALOG_VERSION = _compute_catalog_version(COURSE_CATALOG)
+    if invalidate:
+        get_plan_cache().invalidate()
+    return CATALOG_VERSION
 
 # -------------------------------------------------------------------
 # Validation helpers (internal)
@@ -49,59 +90,34 @@ def _validate_plan(
     completed_courses: List[str],
     max_per_term: int,
 ) -> Tuple[bool, List[str]]:
-    issues: List[str] = []
-
-    completed = set(completed_courses)
-    seen = set(completed_courses)
-
-    all_courses: List[str] = []
-
-    for sem in semesters:
-        if len(sem.courses) > max_per_term:
-            issues.append(f"{sem.term}: too many courses (max {max_per_term}).")
-
-        for c in sem.courses:
-            all_courses.append(c)
-
-            if c in completed:
-                issues.append(f"{c} is already completed but appears in the plan.")
-
-            if not _offered_in_term(c, sem.term):
-                issues.append(f"{c} is not offered in {sem.term}.")
-
-            if c in COURSE_CATALOG:
-                missing = [p for p in COURSE_CATALOG[c]["prereqs"] if p not in seen]
-                if missing:
-                    issues.append(f"{c} missing prereqs when scheduled: {missing}")
-
-        for c in sem.courses:
-            seen.add(c)
-
-    if len(set(all_courses)) != len(all_courses):
-        issues.append("Duplicate course found across semesters.")
-
-    return (len(issues) == 0), issues
+    """One-shot full validation; use PlanValidator directly when the plan will be edited."""
+    return PlanValidator(semesters, completed_courses, max_per_term, catalog=COURSE_CATALOG).result()
 
 def _auto_repair(
     semesters: List[Semester],
     completed_courses: List[str],
     max_per_term: int,
+    validator: Optional[PlanValidator] = None,
 ) -> Tuple[List[Semester], List[str]]:
     """
     Best-effort, deterministic repair for demo stability:
       - moves offering-mismatched courses to the other term if possible
       - moves prereq-problem courses later if possible
       - otherwise drops a course (last in Winter, else Fall)
+
+    Pass an existing validator to reuse its state; every move is applied
+    through it so re-validation only touches the affected courses.
     """
-    semesters = deepcopy(semesters)
+    if validator is None:
+        validator = PlanValidator(semesters, completed_courses, max_per_term, catalog=COURSE_CATALOG)
+    semesters = validator.semesters
     notes: List[str] = []
 
     for _ in range(5):
-        valid, issues = _validate_plan(semesters, completed_courses, max_per_term)
-        if valid:
+        if validator.is_valid():
             return semesters, notes
 
-        notes.append(f"Validator: {issues[0]}")
+        notes.append(f"Validator: {validator.first_issue()}")
 
         # Only supports the 2-term demo grid (Fall/Winter)
         if len(semesters) != 2:
@@ -112,12 +128,12 @@ def _auto_repair(
 
         # 1) Fix offering mismatch: move to the other term if offered there and capacity allows
         moved = False
-        for src, dst in [(fall, winter), (winter, fall)]:
+        for src_i, dst_i in [(0, 1), (1, 0)]:
+            src, dst = semesters[src_i], semesters[dst_i]
             for c in list(src.courses):
                 if c in COURSE_CATALOG and (not _offered_in_term(c, src.term)) and _offered_in_term(c, dst.term):
                     if len(dst.courses) < max_per_term:
-                        src.courses.remove(c)
-                        dst.courses.append(c)
+                        validator.move(c, src_i, dst_i)
                         notes.append(f"Auto-repair: moved {c} from {src.term} to {dst.term}.")
                         moved = True
                         break
@@ -129,14 +145,12 @@ def _auto_repair(
         # 2) Fix prereq issues: move Fall course to Winter if it helps and capacity allows
         moved = False
         taken_before_fall = set(completed_courses)
-        taken_after_fall = taken_before_fall | set(fall.courses)
 
         for c in list(fall.courses):
             if c in COURSE_CATALOG:
                 missing_if_in_fall = [p for p in COURSE_CATALOG[c]["prereqs"] if p not in taken_before_fall]
                 if missing_if_in_fall and len(winter.courses) < max_per_term and _offered_in_term(c, "Winter"):
-                    fall.courses.remove(c)
-                    winter.courses.append(c)
+                    validator.move(c, 0, 1)
                     notes.append(f"Auto-repair: moved {c} from Fall to Winter to satisfy prereqs.")
                     moved = True
                     break
@@ -145,10 +159,10 @@ def _auto_repair(
 
         # 3) If still invalid, drop something deterministically
         if winter.courses:
-            dropped = winter.courses.pop()
+            dropped = validator.pop(1)
             notes.append(f"Auto-repair: dropped {dropped} (could not place validly).")
         elif fall.courses:
-            dropped = fall.courses.pop()
+            dropped = validator.pop(0)
             notes.append(f"Auto-repair: dropped {dropped} (could not place validly).")
         else:
             notes.append("Auto-repair: nothing left to adjust.")
@@ -156,32 +170,49 @@ def _auto_repair(
 
     return semesters, notes
 
-def _rank_courses_for_career(courses: List[str], target_career: Optional[str]) -> List[str]:
+def _resolve_career(target_career: Optional[str]) -> Optional[str]:
     if not target_career:
-        return sorted(courses)
+        return None
+    return get_career_affinity(COURSE_CATALOG.keys()).resolve_career(target_career)
 
-    key = target_career.strip().lower()
-    boost = CAREER_BOOST.get(key, [])
-
-    boosted = [c for c in boost if c in courses]
-    rest = sorted([c for c in courses if c not in boosted])
-    return boosted + rest
+def _rank_courses_for_career(courses: List[str], target_career: Optional[str]) -> List[str]:
+    """Order by the career x course affinity matrix row; sorted by code when no profile matches."""
+    career = _resolve_career(target_career)
+    if career is None:
+        return sorted(courses)
+    return get_career_affinity(COURSE_CATALOG.keys()).rank(courses, career)
 
 # -------------------------------------------------------------------
 # Public functions used by controllers
 # -------------------------------------------------------------------
 def generate_plan(req: PlanRequest) -> PlanResponse:
+    cache = get_plan_cache()
+    key = plan_cache_key(req, plan_version())
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    resp = _solve_plan(req)
+    cache.put(key, resp)
+    return resp
+
+def _compile_completed(completed_courses: List[str]) -> Tuple[frozenset, List[str]]:
+    """Structures that depend only on the completed set; shared by every plan solved for it."""
+    completed = frozenset(completed_courses)
+    return completed, [c for c in COURSE_CATALOG.keys() if c not in completed]
+
+def _solve_plan(req: PlanRequest, compiled: Optional[Tuple[frozenset, List[str]]] = None) -> PlanResponse:
     max_per = max(1, req.max_courses_per_term)
+    completed, base_remaining = compiled or _compile_completed(req.completed_courses)
 
     # remaining courses (demo-safe deterministic set)
-    remaining = [c for c in COURSE_CATALOG.keys() if c not in set(req.completed_courses)]
-    remaining = _rank_courses_for_career(remaining, req.target_career)
+    remaining = _rank_courses_for_career(list(base_remaining), req.target_career)
 
     fall = Semester(term="Fall", courses=[])
     winter = Semester(term="Winter", courses=[])
 
     notes: List[str] = []
-    taken = set(req.completed_courses)
+    taken = set(completed)
 
     # Fill Fall where prereqs met and offered
     for c in list(remaining):
@@ -202,34 +233,52 @@ def generate_plan(req: PlanRequest) -> PlanResponse:
             winter.courses.append(c)
             remaining.remove(c)
 
-    semesters = [fall, winter]
-
     # Validate + auto-repair for demo stability
-    valid, issues = _validate_plan(semesters, req.completed_courses, max_per)
-    if not valid:
-        notes.extend(issues)
-        semesters, repair_notes = _auto_repair(semesters, req.completed_courses, max_per)
+    validator = PlanValidator([fall, winter], req.completed_courses, max_per, catalog=COURSE_CATALOG)
+    semesters = validator.semesters
+    if not validator.is_valid():
+        notes.extend(validator.issues())
+        semesters, repair_notes = _auto_repair(semesters, req.completed_courses, max_per, validator=validator)
         notes.extend(repair_notes)
 
-        valid2, issues2 = _validate_plan(semesters, req.completed_courses, max_per)
-        if not valid2:
-            notes.extend(issues2)
+        if not validator.is_valid():
+            notes.extend(validator.issues())
             notes.append("Warning: plan may still be invalid; review validator notes.")
 
     notes.append("Generated a deterministic demo plan (Fall/Winter).")
     if req.target_career:
-        notes.append(f"Course ordering influenced by target_career='{req.target_career}' (simple scoring).")
+        career = _resolve_career(req.target_career)
+        if career:
+            notes.append(f"Course ordering influenced by target_career='{req.target_career}' (career profile: {career}).")
+        else:
+            notes.append(f"No career profile matched target_career='{req.target_career}'; using default course order.")
 
     return PlanResponse(semesters=semesters, notes=notes)
 
+def solve_plan_group(completed_courses: List[str], variants: List[Tuple[Optional[str], int]]) -> List[dict]:
+    """
+    Solve every (target_career, max_courses_per_term) variant for one completed set,
+    compiling the completed-set structures once. Runs inside batch worker processes,
+    so it takes and returns plain data.
+    """
+    compiled = _compile_completed(completed_courses)
+    out = []
+    for target_career, max_per in variants:
+        req = PlanRequest(completed_courses=completed_courses, target_career=target_career, max_courses_per_term=max_per)
+        out.append(_solve_plan(req, compiled).model_dump(mode="json"))
+    return out
+
 def repair_plan(req: RepairRequest) -> RepairResponse:
-    updated = deepcopy(req.current_plan)
     notes: List[str] = []
 
     locked = set(getattr(req, "locked_courses", []) or [])
     completed_courses = getattr(req, "completed_courses", []) or []  # works even if field not present
     max_per = getattr(req, "max_courses_per_term", 5) or 5  # stable default
 
+    # The validator owns a copy of the plan; every edit below goes through it
+    validator = PlanValidator(req.current_plan, completed_courses, max_per, catalog=COURSE_CATALOG)
+    updated = validator.semesters
+
     # Apply swap if requested
     if req.swap_out and req.swap_in:
         if req.swap_out in locked:
@@ -238,29 +287,134 @@ def repair_plan(req: RepairRequest) -> RepairResponse:
                 notes=["Swap blocked: the course you tried to remove is locked."],
             )
 
-        did_swap = False
-        for sem in updated:
-            if req.swap_out in sem.courses:
-                sem.courses = [req.swap_in if c == req.swap_out else c for c in sem.courses]
-                did_swap = True
-                notes.append(f"Swapped {req.swap_out} -> {req.swap_in}.")
-                break
-
-        if not did_swap:
+        t = validator.find(req.swap_out)
+        if t is not None:
+            validator.replace(req.swap_out, req.swap_in, t)
+            notes.append(f"Swapped {req.swap_out} -> {req.swap_in}.")
+        else:
             notes.append("swap_out not found in the current plan.")
     else:
         notes.append("No swap requested; plan returned unchanged.")
 
     # Validate + auto-repair after swap
-    valid, issues = _validate_plan(updated, completed_courses=completed_courses, max_per_term=max_per)
-    if not valid:
-        notes.extend(issues)
-        updated, repair_notes = _auto_repair(updated, completed_courses=completed_courses, max_per_term=max_per)
+    if not validator.is_valid():
+        notes.extend(validator.issues())
+        updated, repair_notes = _auto_repair(
+            updated, completed_courses=completed_courses, max_per_term=max_per, validator=validator
+        )
         notes.extend(repair_notes)
 
-        valid2, issues2 = _validate_plan(updated, completed_courses=completed_courses, max_per_term=max_per)
-        if not valid2:
-            notes.extend(issues2)
+        if not validator.is_valid():
+            notes.extend(validator.issues())
             notes.append("Warning: repair may still be invalid; review validator notes.")
 
     return RepairResponse(updated_plan=updated, notes=notes)
+
+# -------------------------------------------------------------------
+# Interactive (drag-and-drop) sessions
+# The frontend opens a session with the whole plan once, then sends only
+# deltas; each delta is applied through the session's PlanValidator.
+# -------------------------------------------------------------------
+MAX_PLAN_SESSIONS = int(os.getenv("PLAN_SESSION_LIMIT", "512"))
+
+class _PlanSession:
+    def __init__(self, req: PlanSessionRequest):
+        self.req = req
+        self.locked = set(req.locked_courses)
+        self.version = 0
+        self.lock = threading.Lock()
+        self._build(req.current_plan)
+
+    def _build(self, plan: List[Semester]) -> None:
+        self.catalog_version = CATALOG_VERSION
+        self.validator = PlanValidator(
+            plan, self.req.completed_courses, max(1, self.req.max_courses_per_term), catalog=COURSE_CATALOG
+        )
+
+    def ensure_current(self) -> None:
+        # Catalog reloads change prereq edges; rebuild once from the current plan
+        if self.catalog_version != CATALOG_VERSION:
+            self._build(self.validator.semesters)
+
+_sessions: "OrderedDict[str, _PlanSession]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+def _session_response(session_id: str, session: _PlanSession, notes: List[str]) -> PlanSessionResponse:
+    v = session.validator
+    return PlanSessionResponse(
+        session_id=session_id,
+        version=session.version,
+        valid=v.is_valid(),
+        issues=v.issues(),
+        term_counts=v.term_counts(),
+        notes=notes,
+    )
+
+def _apply_delta(session: _PlanSession, d: PlanDelta) -> Optional[str]:
+    """Apply one delta; returns a note when the delta is rejected."""
+    v = session.validator
+    n_terms = len(v.semesters)
+
+    def _valid_term(t: Optional[int]) -> bool:
+        return t is not None and 0 <= t < n_terms
+
+    if d.op in ("move", "remove", "swap") and d.course in session.locked:
+        return f"{d.op.capitalize()} blocked: {d.course} is locked."
+
+    if d.op == "add":
+        if not _valid_term(d.to_term):
+            return f"Add {d.course}: invalid to_term {d.to_term}."
+        v.add(d.course, d.to_term, d.position)
+        return None
+
+    src = d.from_term if d.from_term is not None else v.find(d.course)
+    if not _valid_term(src) or d.course not in v.semesters[src].courses:
+        return f"{d.course} not found in the plan."
+
+    if d.op == "remove":
+        v.remove(d.course, src)
+    elif d.op == "swap":
+        if not d.swap_in:
+            return f"Swap {d.course}: swap_in is required."
+        v.replace(d.course, d.swap_in, src)
+    else:
+        if not _valid_term(d.to_term):
+            return f"Move {d.course}: invalid to_term {d.to_term}."
+        v.move(d.course, src, d.to_term, d.position)
+    return None
+
+def open_plan_session(req: PlanSessionRequest) -> PlanSessionResponse:
+    session_id = str(uuid.uuid4())
+    session = _PlanSession(req)
+    with _sessions_lock:
+        _sessions[session_id] = session
+        while len(_sessions) > MAX_PLAN_SESSIONS:
+            _sessions.popitem(last=False)
+    return _session_response(session_id, session, [])
+
+def apply_plan_deltas(session_id: str, req: PlanDeltaRequest) -> Optional[PlanSessionResponse]:
+    """Returns None if the session does not exist (expired or never opened)."""
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is None:
+            return None
+        _sessions.move_to_end(session_id)
+
+    with session.lock:
+        session.ensure_current()
+        notes = [note for note in (_apply_delta(session, d) for d in req.deltas) if note]
+        session.version += 1
+        return _session_response(session_id, session, notes)
+
+def get_plan_session(session_id: str) -> Optional[List[Semester]]:
+    """Current plan of a session (for resyncing a client)."""
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+    if session is None:
+        return None
+    with session.lock:
+        return [Semester(term=s.term, courses=list(s.courses)) for s in session.validator.semesters]
+
+def close_plan_session(session_id: str) -> bool:
+    with _sessions_lock:
+        return _sessions.pop(session_id, None) is not None
@@ -0,0 +1,281 @@
+"""
+Bulk transcript ingestion (/transcripts/parse/batch).
+
+Accepts any mix of PDF files and ZIP archives of PDFs. Archives are unpacked
+member by member, streaming each one to disk while hashing it, so neither an
+archive nor its PDFs are ever held in memory. Every PDF is then:
+
+  - answered from the stored result when its content was already parsed by the
+    current parser (cache_hit), or shares the parse of an identical PDF earlier
+    in the same batch (duplicate_of)
+  - otherwise parsed on the transcript parse pool, with at most
+    TRANSCRIPT_BATCH_CONCURRENCY parses of the batch in flight, so single
+    uploads keep getting pool slots while a batch runs
+
+Unpacking continues while earlier files parse. Results are streamed back as
+NDJSON lines in completion order, indexed by position in the batch:
+
+  {"type": "result", "index": 0, "filename": "a.zip/x.pdf", "transcript_id": "...", "cache_hit": false, "timings": {...}, "result": {...}}
+  {"type": "error",  "index": 3, "filename": "a.zip/notes.txt", "error": "..."}
+  {"type": "summary", "files": 250, "parsed": 240, "cache_hits": 5, "duplicates": 3, "errors": 2, ...}
+"""
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import time
+import uuid
+import zipfile
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+
+from app.models.transcript_schemas import TranscriptParseResponse
+from app.services.transcript_parse_pool import PARSE_WORKERS, ParsePoolSaturated, get_parse_pool
+from app.services.transcript_result_service import UPLOAD_DIR, upload_path
+
+BATCH_CONCURRENCY = int(os.getenv("TRANSCRIPT_BATCH_CONCURRENCY", str(max(1, PARSE_WORKERS))))
+MAX_BATCH_FILES = int(os.getenv("TRANSCRIPT_BATCH_MAX_FILES", "1000"))
+COPY_CHUNK_SIZE = 1024 * 1024
+# Archive members that are not transcripts (folders, macOS resource forks)
+_SKIPPED_MEMBER_PREFIXES = ("__MACOSX/",)
+
+
+class BatchFileError(ValueError):
+    pass
+
+
+def _line(obj: dict) -> str:
+    return json.dumps(obj, ensure_ascii=False) + "\n"
+
+
+def _too_large(max_bytes: int) -> str:
+    return f"exceeds the {max_bytes / (1024 * 1024):g} MB per-transcript limit"
+
+
+def _copy_limited(src, part_path: str, max_bytes: int) -> Tuple[str, int]:
+    """Copy a file object to part_path chunk by chunk; returns (sha256, size)."""
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(part_path, "wb") as dst:
+            while chunk := src.read(COPY_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise BatchFileError(_too_large(max_bytes))
+                hasher.update(chunk)
+                dst.write(chunk)
+    except BaseException:
+        os.remove(part_path)
+        raise
+    return hasher.hexdigest(), size
+
+
+def _is_pdf_member(info: zipfile.ZipInfo) -> bool:
+    return not info.is_dir() and not info.filename.startswith(_SKIPPED_MEMBER_PREFIXES)
+
+
+class _Batch:
+    def __init__(
+        self,
+        files: List[UploadFile],
+        max_file_bytes: int,
+        find_duplicate: Callable[[str], Optional[Dict[str, Any]]],
+        save_result: Callable[[str, str, TranscriptParseResponse], Dict[str, Any]],
+    ):
+        self.files = files
+        self.max_file_bytes = max_file_bytes
+        self.find_duplicate = find_duplicate
+        self.save_result = save_result
+        self.out: asyncio.Queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+        # sha256 -> future of (index, result_dict) of the first file in this batch with that content
+        self.first_by_sha: Dict[str, asyncio.Future] = {}
+        self.tasks: List[asyncio.Task] = []
+        self.count = 0
+        self.counts = {"parsed": 0, "cache_hits": 0, "duplicates": 0, "errors": 0}
+        self.bytes = 0
+        self.truncated = False
+
+    def _error(self, index: int, filename: str, error: str) -> None:
+        self.counts["errors"] += 1
+        self.out.put_nowait(_line({"type": "error", "index": index, "filename": filename, "error": error}))
+
+    def _result(self, index: int, filename: str, result_dict: Dict[str, Any], **extra: Any) -> None:
+        self.out.put_nowait(_line({
+            "type": "result", "index": index, "filename": filename,
+            "transcript_id": result_dict["transcript_id"], **extra, "result": result_dict,
+        }))
+
+    def _next_index(self) -> Optional[int]:
+        """Position of the next file in the batch, or None once MAX_BATCH_FILES is reached."""
+        if self.count >= MAX_BATCH_FILES:
+            self.truncated = True
+            return None
+        self.count += 1
+        return self.count - 1
+
+    async def _spool(self, src, filename: str) -> None:
+        """Write one PDF to a part file in UPLOAD_DIR and hand it to _dispatch."""
+        index = self._next_index()
+        if index is None:
+            return
+        if not filename.lower().endswith(".pdf"):
+            self._error(index, filename, "not a PDF")
+            return
+        transcript_id = str(uuid.uuid4())
+        part_path = os.path.join(UPLOAD_DIR, f".{transcript_id}.part")
+        try:
+            sha256, size = await asyncio.to_thread(_copy_limited, src, part_path, self.max_file_bytes)
+        except (BatchFileError, OSError, zipfile.BadZipFile, zlib.error) as e:
+            self._error(index, filename, str(e))
+            return
+        self.bytes += size
+        await self._dispatch(index, filename, transcript_id, part_path, sha256)
+
+    async def _dispatch(self, index: int, filename: str, transcript_id: str, part_path: str, sha256: str) -> None:
+        first = self.first_by_sha.get(sha256)
+        if first is not None:
+            os.remove(part_path)
+            self.tasks.append(asyncio.ensure_future(self._follow(index, filename, first)))
+            return
+        duplicate = await asyncio.to_thread(self.find_duplicate, sha256)
+        if duplicate is not None:
+            os.remove(part_path)
+            self.counts["cache_hits"] += 1
+            self._result(index, filename, duplicate, cache_hit=True)
+            self.first_by_sha[sha256] = asyncio.get_running_loop().create_future()
+            self.first_by_sha[sha256].set_result((index, duplicate))
+            return
+        self.first_by_sha[sha256] = asyncio.get_running_loop().create_future()
+        # wait for a parse slot here, so unpacking runs at most this far ahead of parsing
+        await self.slots.acquire()
+        os.replace(part_path, upload_path(transcript_id))
+        self.tasks.append(asyncio.ensure_future(self._parse(index, filename, transcript_id, sha256)))
+
+    async def _parse(self, index: int, filename: str, transcript_id: str, sha256: str) -> None:
+        first = self.first_by_sha[sha256]
+        save_path = upload_path(transcript_id)
+        try:
+            while True:
+                try:
+                    result = await get_parse_pool().parse(save_path, os.path.basename(filename))
+                    break
+                except ParsePoolSaturated:
+                    await asyncio.sleep(0.5)
+            result_dict = await asyncio.to_thread(self.save_result, transcript_id, sha256, result)
+        except asyncio.CancelledError:
+            # batch abandoned: nothing will ever point at this upload
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(save_path)
+            raise
+        except Exception as e:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(save_path)
+            self._error(index, filename, f"{type(e).__name__}: {e}")
+            first.set_result((index, None))
+            return
+        finally:
+            self.slots.release()
+        self.counts["parsed"] += 1
+        self._result(index, filename, result_dict, cache_hit=False, timings=result.timings)
+        first.set_result((index, result_dict))
+
+    async def _follow(self, index: int, filename: str, first: asyncio.Future) -> None:
+        first_index, result_dict = await first
+        if result_dict is None:
+            self._error(index, filename, f"identical to file {first_index}, which failed")
+            return
+        self.counts["duplicates"] += 1
+        self._result(index, filename, result_dict, cache_hit=True, duplicate_of=first_index)
+
+    async def _unpack(self, upload: UploadFile) -> None:
+        name = upload.filename or "upload"
+        if not name.lower().endswith(".zip"):
+            await self._spool(upload.file, name)
+            return
+        try:
+            archive = zipfile.ZipFile(upload.file)
+        except zipfile.BadZipFile:
+            index = self._next_index()
+            if index is not None:
+                self._error(index, name, "not a valid ZIP archive")
+            return
+        with archive:
+            for info in archive.infolist():
+                if not _is_pdf_member(info):
+                    continue
+                filename = f"{name}/{info.filename}"
+                # declared size (cheap early rejection); _copy_limited enforces the real one
+                declared_error = _too_large(self.max_file_bytes) if info.file_size > self.max_file_bytes else None
+                try:
+                    member = None if declared_error else archive.open(info)
+                except (zipfile.BadZipFile, NotImplementedError, RuntimeError) as e:
+                    # e.g. encrypted members or unsupported compression
+                    declared_error = str(e)
+                if declared_error:
+                    index = self._next_index()
+                    if index is None:
+                        return
+                    self._error(index, filename, declared_error)
+                    continue
+                with member:
+                    await self._spool(member, filename)
+                if self.truncated:
+                    return
+
+    async def run(self) -> None:
+        try:
+            for upload in self.files:
+                await self._unpack(upload)
+                if self.truncated:
+                    break
+            await asyncio.gather(*self.tasks)
+        finally:
+            self.out.put_nowait(None)
+
+
+async def parse_transcripts_ndjson(
+    files: List[UploadFile],
+    max_file_bytes: int,
+    find_duplicate: Callable[[str], Optional[Dict[str, Any]]],
+    save_result: Callable[[str, str, TranscriptParseResponse], Dict[str, Any]],
+) -> AsyncIterator[str]:
+    """
+    NDJSON stream for a batch upload. find_duplicate(sha256) returns the stored
+    result for content parsed before (and records the re-upload); save_result(transcript_id, sha256, result)
+    stores a new one (the controller's dedup-aware helpers).
+    """
+    started = time.perf_counter()
+    batch = _Batch(files, max_file_bytes, find_duplicate, save_result)
+    runner = asyncio.ensure_future(batch.run())
+    try:
+        while (line := await batch.out.get()) is not None:
+            yield line
+        await runner
+    finally:
+        if not runner.done():
+            # client went away: stop unpacking and dispatching parses
+            runner.cancel()
+        # and stop the parses already dispatched instead of leaving them to finish unobserved
+        pending = [task for task in batch.tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(runner, *pending, return_exceptions=True)
+        for upload in files:
+            await upload.close()
+
+    elapsed = time.perf_counter() - started
+    yield _line({
+        "type": "summary",
+        "files": batch.count,
+        **batch.counts,
+        "truncated": batch.truncated,
+        "max_files": MAX_BATCH_FILES,
+        "bytes": batch.bytes,
+        "concurrency": max(1, BATCH_CONCURRENCY),
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "files_per_second": round(batch.count / elapsed, 2) if elapsed > 0 else None,
+    })
@@ -0,0 +1,140 @@
+"""
+Encoding of stored transcript results.
+
+Besides plain JSON files, results can be stored in a small binary container
+(<id>.trs) with a version header:
+
+    b"PPTR" | format version (1 byte) | codec (1 byte) | compression (1 byte)
+    uint32 length + head    metadata: everything except courses and warnings
+    uint32 length + body    {"courses": [...], "warnings": [...]}
+
+Codecs: "orjson" writes compact UTF-8 JSON (with orjson when installed, else the
+stdlib; any JSON decoder reads it back), "msgpack" writes MessagePack (needs
+`pip install msgpack`). Each segment is compressed separately, so decode_head()
+reads just the metadata - all that listing backfill, re-parse selection and
+retention need - without decompressing or decoding the course list.
+"""
+import gzip
+import json
+import struct
+from typing import Any, Dict, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+MAGIC = b"PPTR"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sBBB")
+_LENGTH = struct.Struct("<I")
+CODEC_IDS = {"orjson": 1, "msgpack": 2}
+COMPRESSION_IDS = {"none": 0, "gzip": 1, "zstd": 2}
+BODY_FIELDS = ("courses", "warnings")
+# header + head segment length: all a reader needs to find the metadata
+PREFIX_SIZE = _HEADER.size + _LENGTH.size
+
+
+def compress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return data
+
+
+def decompress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.decompress(data)
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Result is zstd-compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def _dumps(value: Any, codec: str) -> bytes:
+    if codec == "msgpack":
+        return msgpack.packb(value, use_bin_type=True)
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: bytes, codec: str) -> Any:
+    if codec == "msgpack":
+        if not MSGPACK_AVAILABLE:
+            raise RuntimeError("Result is msgpack-encoded; install msgpack to read it")
+        return msgpack.unpackb(data, raw=False)
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+def encode(result: Dict[str, Any], codec: str, compression: str = "none") -> bytes:
+    head = {k: v for k, v in result.items() if k not in BODY_FIELDS}
+    body = {k: result[k] for k in BODY_FIELDS if k in result}
+    out = [_HEADER.pack(MAGIC, FORMAT_VERSION, CODEC_IDS[codec], COMPRESSION_IDS[compression])]
+    for segment in (head, body):
+        data = compress(_dumps(segment, codec), compression)
+        out.append(_LENGTH.pack(len(data)))
+        out.append(data)
+    return b"".join(out)
+
+
+def read_header(data: bytes) -> Tuple[str, str]:
+    """(codec, compression) of an encoded result; ValueError if it isn't one this version reads."""
+    if len(data) < _HEADER.size:
+        raise ValueError("Truncated transcript result")
+    magic, version, codec_id, compression_id = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a transcript result file")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Transcript result format {version} is newer than this reader ({FORMAT_VERSION})")
+    codecs = {v: k for k, v in CODEC_IDS.items()}
+    compressions = {v: k for k, v in COMPRESSION_IDS.items()}
+    if codec_id not in codecs or compression_id not in compressions:
+        raise ValueError("Unknown transcript result codec or compression")
+    return codecs[codec_id], compressions[compression_id]
+
+
+def head_length(prefix: bytes) -> int:
+    """Length of the head segment, from the first PREFIX_SIZE bytes of an encoded result."""
+    read_header(prefix)
+    if len(prefix) < PREFIX_SIZE:
+        raise ValueError("Truncated transcript result")
+    return _LENGTH.unpack_from(prefix, _HEADER.size)[0]
+
+
+def _segment(data: bytes, offset: int) -> Tuple[bytes, int]:
+    (length,) = _LENGTH.unpack_from(data, offset)
+    start = offset + _LENGTH.size
+    if start + length > len(data):
+        raise ValueError("Truncated transcript result")
+    return data[start:start + length], start + length
+
+
+def decode_head(data: bytes) -> Dict[str, Any]:
+    codec, compression = read_header(data)
+    head, _ = _segment(data, _HEADER.size)
+    return _loads(decompress(head, compression), codec)
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    codec, compression = read_header(data)
+    head, offset = _segment(data, _HEADER.size)
+    body, _ = _segment(data, offset)
+    result = _loads(decompress(head, compression), codec)
+    result.update(_loads(decompress(body, compression), codec))
+    return result
@@ -0,0 +1,104 @@
+"""
+Content-addressed index of parsed transcripts.
+
+Students re-upload the same PDF many times. Uploads are hashed (SHA-256) as they
+are received; the index maps hash + PARSER_VERSION to the transcript_id whose
+result is already stored, so the controller can answer from that result instead
+of keeping another copy of the PDF and parsing it again. Bumping PARSER_VERSION
+makes every entry miss, so stale parses are never handed out.
+
+One small JSON file per hash under transcript_index/, sharded by the first two
+hex digits like uploads and results (written atomically), so several API
+workers can share the index without locking. Entries for other parser versions
+or deleted transcripts are removed by the retention sweep.
+"""
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from app.services.transcript_service import PARSER_VERSION
+
+DEFAULT_INDEX_DIR = Path(__file__).resolve().parents[2] / "transcript_index"
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+_ENTRY_RE = re.compile(r"^([0-9a-f]{64})-v(.+)\.json$")
+
+
+class TranscriptHashIndex:
+    def __init__(self, index_dir: Path = DEFAULT_INDEX_DIR, parser_version: str = PARSER_VERSION):
+        self.index_dir = Path(index_dir)
+        self.parser_version = parser_version
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _name(self, sha256: str) -> str:
+        if not _SHA256_RE.match(sha256):
+            raise ValueError(f"Not a SHA-256 hex digest: {sha256!r}")
+        return f"{sha256}-v{self.parser_version}.json"
+
+    def _path(self, sha256: str) -> Path:
+        return self.index_dir / sha256[:2] / self._name(sha256)
+
+    def _paths(self, sha256: str) -> Tuple[Path, Path]:
+        """Shard location first, then the flat pre-sharding one."""
+        return self._path(sha256), self.index_dir / self._name(sha256)
+
+    def lookup(self, sha256: str) -> Optional[str]:
+        """transcript_id previously parsed from this content, or None."""
+        transcript_id = None
+        for path in self._paths(sha256):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    transcript_id = json.load(f).get("transcript_id")
+                break
+            except (OSError, ValueError):
+                continue
+        if transcript_id:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return transcript_id
+
+    def put(self, sha256: str, transcript_id: str, filename: Optional[str] = None) -> None:
+        path = self._path(sha256)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        entry = {
+            "transcript_id": transcript_id,
+            "sha256": sha256,
+            "parser_version": self.parser_version,
+            "filename": filename,
+            "indexed_at": time.time(),
+        }
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def discard(self, sha256: str) -> None:
+        """Drop an entry whose result has gone missing."""
+        for path in self._paths(sha256):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def entries(self) -> Iterator[Tuple[Path, str, str]]:
+        """(path, sha256, parser_version) of every entry, sharded or flat."""
+        for path in [*self.index_dir.glob("*.json"), *self.index_dir.glob("*/*.json")]:
+            match = _ENTRY_RE.match(path.name)
+            if match:
+                yield path, match.group(1), match.group(2)
+
+
+# Singleton
+_index: Optional[TranscriptHashIndex] = None
+
+def get_transcript_index() -> TranscriptHashIndex:
+    global _index
+    if _index is None:
+        _index = TranscriptHashIndex()
+    return _index
@@ -0,0 +1,165 @@
+"""
+Background runner for asynchronous transcript parsing (/transcripts/parse?async=true).
+
+enqueue() returns a job immediately; a fixed set of runner tasks on the event
+loop pull jobs off a bounded queue and hand them to the parse worker pool.
+Workers report each stage they enter through a progress queue, which a drain
+thread copies into the job store so pollers and SSE clients can follow along:
+
+  queued -> started -> text_extraction -> row_parsing -> enrichment -> save -> done | failed
+"""
+import asyncio
+import os
+import queue
+import threading
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from app.models.transcript_schemas import TranscriptParseResponse
+from app.services.transcript_job_store import TranscriptJob, get_job_store
+from app.services.transcript_parse_pool import ParsePoolSaturated, get_parse_pool
+
+JOB_QUEUE_MAX = int(os.getenv("TRANSCRIPT_JOB_QUEUE_MAX", "200"))
+# How long a runner waits for a worker's trailing progress events before moving on
+PROGRESS_FLUSH_TIMEOUT = 2.0
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+class TranscriptJobQueue:
+    def __init__(self, max_queued: int = JOB_QUEUE_MAX):
+        self.max_queued = max_queued
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runners = []
+        self._manager = None
+        self._progress_queue: Any = None
+        self._flushed: Dict[str, asyncio.Event] = {}
+
+    # ---------------------------------------------------------------
+    # Progress plumbing (worker processes -> job store)
+    # ---------------------------------------------------------------
+    def _start_progress_drain(self) -> None:
+        if get_parse_pool().workers > 0:
+            import multiprocessing
+            self._manager = multiprocessing.Manager()
+            self._progress_queue = self._manager.Queue()
+        else:
+            self._progress_queue = queue.Queue()
+        threading.Thread(target=self._drain_progress, daemon=True).start()
+
+    def _drain_progress(self) -> None:
+        store = get_job_store()
+        q = self._progress_queue
+        while True:
+            try:
+                job_id, stage = q.get()
+            except (EOFError, OSError):
+                return  # manager shut down
+            if job_id is None:
+                return
+            if stage is None:
+                # trailing sentinel from the worker: every stage for this job is recorded
+                event = self._flushed.get(job_id)
+                if event is not None and self._loop is not None:
+                    self._loop.call_soon_threadsafe(event.set)
+                continue
+            store.record(job_id, stage)
+
+    # ---------------------------------------------------------------
+    # Queue + runners
+    # ---------------------------------------------------------------
+    def _ensure_started(self) -> None:
+        if self._queue is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._start_progress_drain()
+        # one runner per pool slot keeps the pool busy without tripping its limit
+        for _ in range(max(1, get_parse_pool().max_pending)):
+            self._runners.append(asyncio.ensure_future(self._runner()))
+
+    def enqueue(
+        self,
+        saved_path: str,
+        original_filename: str,
+        transcript_id: str,
+        on_result: Callable[[TranscriptParseResponse], Any],
+    ) -> TranscriptJob:
+        """Queue a parse; on_result(result) runs on a thread once parsing succeeds (e.g. to save it)."""
+        self._ensure_started()
+        if self._queue.full():
+            raise JobQueueFull("Too many transcript jobs queued")
+        job = TranscriptJob(job_id=str(uuid.uuid4()), transcript_id=transcript_id, filename=original_filename)
+        job.events.append({"stage": "queued", "at": job.created_at})
+        get_job_store().create(job)
+        self._queue.put_nowait((job.job_id, saved_path, original_filename, on_result))
+        return job
+
+    async def _runner(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._run(*item)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, saved_path: str, original_filename: str, on_result) -> None:
+        store = get_job_store()
+        # job store calls may hit SQLite: keep them off the event loop
+        await asyncio.to_thread(store.record, job_id, "started", status="running")
+        flushed = self._flushed[job_id] = asyncio.Event()
+        try:
+            while True:
+                try:
+                    result = await get_parse_pool().parse(
+                        saved_path, original_filename, progress_queue=self._progress_queue, job_id=job_id
+                    )
+                    break
+                except ParsePoolSaturated:
+                    # synchronous uploads are using the pool; wait for a slot
+                    await asyncio.sleep(0.5)
+            try:
+                await asyncio.wait_for(flushed.wait(), PROGRESS_FLUSH_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.to_thread(store.record, job_id, "save")
+            await asyncio.get_running_loop().run_in_executor(None, on_result, result)
+            await asyncio.to_thread(store.record, job_id, "done", status="done")
+        except Exception as e:
+            await asyncio.to_thread(store.record, job_id, "failed", status="failed", error=f"{type(e).__name__}: {e}")
+        finally:
+            self._flushed.pop(job_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queued": self.max_queued,
+            "runners": len(self._runners),
+        }
+
+    def shutdown(self) -> None:
+        for task in self._runners:
+            task.cancel()
+        self._runners = []
+        if self._progress_queue is not None:
+            try:
+                self._progress_queue.put((None, None))
+            except Exception:
+                pass
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+        self._queue = None
+
+
+# Singleton (one job queue per API process)
+_job_queue: Optional[TranscriptJobQueue] = None
+
+def get_job_queue() -> TranscriptJobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = TranscriptJobQueue()
+    return _job_queue
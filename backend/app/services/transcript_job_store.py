@@ -0,0 +1,184 @@
+"""
+Storage for asynchronous transcript-parse jobs.
+
+A job moves queued -> running -> done | failed and records a timestamped event
+for every pipeline stage it enters, which is what status polling and the SSE
+stream report. Two interchangeable stores (TRANSCRIPT_JOB_STORE):
+
+  - "memory" (default): per-process dict, bounded to the most recent jobs
+  - "sqlite": file at TRANSCRIPT_JOB_DB, survives restarts and can be shared by
+    several API workers on one host; finished jobs are pruned after
+    TRANSCRIPT_JOB_RETENTION_HOURS
+
+Both are blocking (the SQLite one does file I/O): async callers go through
+asyncio.to_thread.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_JOB_DB = Path(__file__).resolve().parents[2] / "transcript_jobs.db"
+MAX_MEMORY_JOBS = 1000
+JOB_RETENTION_SECONDS = float(os.getenv("TRANSCRIPT_JOB_RETENTION_HOURS", "24")) * 3600
+
+FINAL_STATUSES = {"done", "failed"}
+
+
+@dataclass
+class TranscriptJob:
+    job_id: str
+    transcript_id: str
+    filename: str
+    status: str = "queued"
+    stage: str = "queued"
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def is_final(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+
+class InMemoryJobStore:
+    def __init__(self, max_jobs: int = MAX_MEMORY_JOBS):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, TranscriptJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, job: TranscriptJob) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[TranscriptJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # hand out a snapshot so readers never see a half-applied update
+            return TranscriptJob(**{**asdict(job), "events": list(job.events)}) if job else None
+
+    def record(self, job_id: str, stage: str, status: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            now = time.time()
+            job.stage = stage
+            job.events.append({"stage": stage, "at": now})
+            if status:
+                job.status = status
+            if error:
+                job.error = error
+            job.updated_at = now
+
+
+class SQLiteJobStore:
+    """Finished jobs older than `retention` seconds are pruned every PRUNE_EVERY creates."""
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: Path = DEFAULT_JOB_DB, retention: float = JOB_RETENTION_SECONDS):
+        self.path = Path(path)
+        self.retention = retention
+        self._creates = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS transcript_jobs (
+                job_id TEXT PRIMARY KEY,
+                transcript_id TEXT NOT NULL,
+                filename TEXT,
+                status TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                events TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def create(self, job: TranscriptJob) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO transcript_jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, job.transcript_id, job.filename, job.status, job.stage,
+                 json.dumps(job.events), job.error, job.created_at, job.updated_at),
+            )
+            self._creates += 1
+            if self.retention > 0 and self._creates % self.PRUNE_EVERY == 0:
+                self._prune_locked(time.time() - self.retention)
+            self._conn.commit()
+
+    def prune(self, before: float) -> int:
+        """Delete finished jobs last updated before `before`; returns how many."""
+        with self._lock:
+            removed = self._prune_locked(before)
+            self._conn.commit()
+        return removed
+
+    def _prune_locked(self, before: float) -> int:
+        placeholders = ", ".join("?" for _ in FINAL_STATUSES)
+        return self._conn.execute(
+            f"DELETE FROM transcript_jobs WHERE status IN ({placeholders}) AND updated_at < ?",
+            (*sorted(FINAL_STATUSES), before),
+        ).rowcount
+
+    def get(self, job_id: str) -> Optional[TranscriptJob]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, transcript_id, filename, status, stage, events, error, created_at, updated_at "
+                "FROM transcript_jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return TranscriptJob(
+            job_id=row[0], transcript_id=row[1], filename=row[2], status=row[3], stage=row[4],
+            events=json.loads(row[5]), error=row[6], created_at=row[7], updated_at=row[8],
+        )
+
+    def record(self, job_id: str, stage: str, status: Optional[str] = None, error: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT events FROM transcript_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            events = json.loads(row[0])
+            events.append({"stage": stage, "at": now})
+            self._conn.execute(
+                "UPDATE transcript_jobs SET stage = ?, events = ?, status = COALESCE(?, status), "
+                "error = COALESCE(?, error), updated_at = ? WHERE job_id = ?",
+                (stage, json.dumps(events), status, error, now, job_id),
+            )
+            self._conn.commit()
+
+
+# Singleton (selected from env on first use)
+_job_store = None
+_job_store_lock = threading.Lock()
+
+def get_job_store():
+    global _job_store
+    if _job_store is None:
+        with _job_store_lock:
+            if _job_store is None:
+                kind = os.getenv("TRANSCRIPT_JOB_STORE", "memory").strip().lower()
+                if kind == "sqlite":
+                    _job_store = SQLiteJobStore(Path(os.getenv("TRANSCRIPT_JOB_DB") or DEFAULT_JOB_DB))
+                else:
+                    _job_store = InMemoryJobStore()
+    return _job_store
@@ -0,0 +1,288 @@
+"""
+Bounded process pool for transcript parsing.
+
+parse_transcript_pdf is synchronous and CPU-heavy (pdfplumber layout extraction
+plus regexes). Running it inside an async endpoint blocks the event loop for
+every other request, so uploads are dispatched here instead:
+
+  - workers are started ahead of time with pdfplumber, the parser and the
+    catalog already imported/loaded (warm())
+  - at most TRANSCRIPT_PARSE_MAX_PENDING jobs may be queued or running; beyond
+    that submit raises ParsePoolSaturated (the controller answers 503 + Retry-After)
+  - each job is limited to TRANSCRIPT_PARSE_TIMEOUT seconds of run time; the
+    worker aborts itself via an interval timer where the platform supports it,
+    and the caller stops waiting after the same deadline plus a small grace
+    period, counted from when the pool hands the job to a worker (time spent
+    queued behind other uploads doesn't count)
+
+A worker that dies (OOM, segfault) breaks a ProcessPoolExecutor for good; the
+pool is then replaced and the affected job retried once on the new one.
+
+TRANSCRIPT_PARSE_WORKERS=0 keeps parsing in-process on a thread (still off the
+event loop) for environments where subprocesses are unavailable.
+"""
+import asyncio
+import os
+import signal
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from app.models.transcript_schemas import TranscriptParseResponse
+from app.utils.tracing import get_histograms
+
+PARSE_WORKERS = int(os.getenv("TRANSCRIPT_PARSE_WORKERS", str(min(2, os.cpu_count() or 1))))
+PARSE_MAX_PENDING = int(os.getenv("TRANSCRIPT_PARSE_MAX_PENDING", str(max(1, PARSE_WORKERS) * 4)))
+PARSE_TIMEOUT = float(os.getenv("TRANSCRIPT_PARSE_TIMEOUT", "60"))
+# Extra time the caller waits beyond the worker's own deadline before giving up
+TIMEOUT_GRACE = 2.0
+# How often a caller checks whether its queued job has reached a worker
+START_POLL_SECONDS = 0.05
+
+
+class ParsePoolSaturated(RuntimeError):
+    def __init__(self, retry_after: int):
+        super().__init__("Transcript parser is busy; retry later")
+        self.retry_after = retry_after
+
+
+class ParseTimeout(RuntimeError):
+    pass
+
+
+def _warm_worker() -> None:
+    """Process initializer: pay import and catalog load costs once per worker."""
+    import pdfplumber  # noqa: F401
+    from app.services import transcript_service  # noqa: F401
+    from app.services.catalog_service import get_catalog_service
+    from app.services.institution_parsers import list_parsers
+    from app.services.pdf_text_service import disable_page_pool
+
+    # the pool already bounds parse processes; no per-worker page pools on top
+    disable_page_pool()
+    get_catalog_service()
+    # enrichment uses the detected school's catalog
+    for parser in list_parsers():
+        if parser.catalog_school:
+            get_catalog_service(parser.catalog_school)
+
+
+def _noop() -> None:
+    return None
+
+
+def _on_alarm(signum, frame):
+    raise ParseTimeout("Transcript parse exceeded its time limit")
+
+
+def _parse_job(
+    saved_path: str,
+    original_filename: str,
+    enrich_with_catalog: bool,
+    timeout: float,
+    progress_queue: Any = None,
+    job_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Runs in a worker process; returns plain data so the result pickles cheaply.
+    Stage names are pushed to progress_queue as (job_id, stage) when given,
+    followed by (job_id, None) once the job ends either way.
+    """
+    from app.services.transcript_service import parse_transcript_pdf
+
+    progress = None
+    if progress_queue is not None:
+        progress = lambda stage: progress_queue.put((job_id, stage))
+
+    use_timer = timeout > 0 and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if use_timer:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result = parse_transcript_pdf(saved_path, original_filename, enrich_with_catalog=enrich_with_catalog, progress=progress)
+        return result.model_dump(mode="json")
+    finally:
+        if use_timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+        if progress_queue is not None:
+            progress_queue.put((job_id, None))
+
+
+class TranscriptParsePool:
+    def __init__(self, workers: int = PARSE_WORKERS, max_pending: int = PARSE_MAX_PENDING, timeout: float = PARSE_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.finished = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.restarts = 0
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+            return self._executor
+
+    def warm(self) -> None:
+        """Start every worker now so the first uploads don't pay process start-up."""
+        executor = self._get_executor()
+        if executor is not None:
+            for f in [executor.submit(_noop) for _ in range(self.workers)]:
+                f.result()
+
+    def _discard_executor(self, broken: ProcessPoolExecutor) -> None:
+        """Drop a broken executor so the next _get_executor() starts fresh workers."""
+        with self._lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.restarts += 1
+
+    def _submit_to_workers(self, fn: Callable[..., Any], args: tuple, retry: bool = True) -> Future:
+        """executor.submit, retried once on a new executor if a dead worker broke the pool."""
+        outer: Future = Future()
+
+        def attempt(retry: bool) -> None:
+            executor = self._get_executor()
+            try:
+                inner = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                if not retry:
+                    raise
+                return attempt(False)
+            # the attempt in progress, so callers can tell queued from started
+            outer.worker_future = inner
+
+            def done(f: Future) -> None:
+                if f.cancelled():
+                    outer.cancel()
+                    return
+                exc = f.exception()
+                if isinstance(exc, BrokenProcessPool) and retry:
+                    # the worker died mid-job (this one or another's)
+                    self._discard_executor(executor)
+                    try:
+                        attempt(False)
+                    except BaseException as e:
+                        outer.set_exception(e)
+                elif exc is not None:
+                    outer.set_exception(exc)
+                else:
+                    outer.set_result(f.result())
+
+            inner.add_done_callback(done)
+
+        attempt(retry)
+        return outer
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def pending(self) -> int:
+        return self._pending
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                # rough estimate: one timeout's worth of work per worker ahead of us
+                retry_after = max(1, int(self.timeout / max(1, self.workers)) or 1)
+                raise ParsePoolSaturated(retry_after)
+            self._pending += 1
+
+    def _release(self, _: Any = None) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.finished += 1
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        Run fn(*args) on a worker, counting it against the pending limit until it
+        finishes (not until the caller stops waiting). Raises ParsePoolSaturated.
+        """
+        self._acquire()
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                fut: Future = Future()
+                def _run():
+                    try:
+                        fut.set_result(fn(*args))
+                    except BaseException as e:
+                        fut.set_exception(e)
+                threading.Thread(target=_run, daemon=True).start()
+            else:
+                fut = self._submit_to_workers(fn, args)
+        except BaseException:
+            self._release()
+            raise
+        fut.add_done_callback(self._release)
+        return fut
+
+    async def parse(
+        self,
+        saved_path: str,
+        original_filename: str,
+        enrich_with_catalog: bool = True,
+        progress_queue: Any = None,
+        job_id: Optional[str] = None,
+    ) -> TranscriptParseResponse:
+        fut = self.submit(_parse_job, saved_path, original_filename, enrich_with_catalog, self.timeout, progress_queue, job_id)
+        waiter = asyncio.shield(asyncio.wrap_future(fut))
+        # the time limit is on parsing, not on waiting behind other uploads
+        while not self._started(fut):
+            await asyncio.wait({waiter}, timeout=START_POLL_SECONDS)
+        # ProcessPoolExecutor marks a job running once it enters the call queue,
+        # which holds one job beyond the busy workers: allow that one job's time too
+        deadline = 2 * self.timeout + TIMEOUT_GRACE if self.timeout > 0 else None
+        try:
+            data = await asyncio.wait_for(waiter, deadline)
+        except (asyncio.TimeoutError, ParseTimeout):
+            self.timed_out += 1
+            raise ParseTimeout(f"Transcript parse exceeded {self.timeout:.0f}s")
+        result = TranscriptParseResponse.model_validate(data)
+        # stage timings were measured in the worker; aggregate them in this process
+        get_histograms().observe_timings(result.timings)
+        return result
+
+    @staticmethod
+    def _started(fut: Future) -> bool:
+        """Done, or handed to a worker (thread jobs start right away)."""
+        if fut.done():
+            return True
+        inner = getattr(fut, "worker_future", None)
+        return inner is None or inner.running() or inner.done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "timeout_seconds": self.timeout,
+            "finished": self.finished,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "restarts": self.restarts,
+        }
+
+
+# Singleton (one pool per API process)
+_parse_pool: Optional[TranscriptParsePool] = None
+
+def get_parse_pool() -> TranscriptParsePool:
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = TranscriptParsePool()
+    return _parse_pool
@@ -0,0 +1,153 @@
+"""
+Indexed store of transcript result metadata (see app/models/transcript_records.py).
+
+Backs GET /transcripts/ (paginated, filterable by university/program) and
+GET /transcripts/latest with indexed queries instead of scanning and parsing
+every file in transcript_results/. Uses TRANSCRIPT_DATABASE_URL (local SQLite by
+default). Results saved before the table existed are imported by backfill().
+"""
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, TRANSCRIPT_DATABASE_URL, create_app_engine
+from app.models.transcript_records import TranscriptRecord
+from app.services.transcript_storage import iter_result_files, read_result_file
+
+
+class TranscriptRecordStore:
+    def __init__(self, url: str = TRANSCRIPT_DATABASE_URL):
+        self.engine = create_app_engine(url)
+        Base.metadata.create_all(self.engine, tables=[TranscriptRecord.__table__])
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    def upsert(self, result: Dict[str, Any], created_at: Optional[float] = None, touch_upload: bool = True) -> None:
+        """
+        Insert or refresh the record for a saved result dict. touch_upload=False
+        (re-parse of an existing result) keeps its upload time.
+        """
+        now = time.time()
+        with self.Session() as session:
+            record = session.get(TranscriptRecord, result["transcript_id"])
+            if record is None:
+                record = TranscriptRecord(
+                    transcript_id=result["transcript_id"], created_at=created_at or now, uploaded_at=created_at or now
+                )
+                session.add(record)
+            elif touch_upload:
+                record.uploaded_at = created_at or now
+            record.filename = result.get("filename")
+            record.university_name = result.get("university_name")
+            record.program_name = result.get("program_name")
+            record.study_year = result.get("study_year")
+            record.total_credits_attempted = result.get("total_credits_attempted")
+            record.total_credits_earned = result.get("total_credits_earned")
+            record.course_count = len(result.get("courses") or [])
+            record.parser_version = result.get("parser_version")
+            record.source_sha256 = result.get("source_sha256")
+            session.commit()
+
+    def touch(self, transcript_id: str) -> None:
+        """Mark a stored result as just uploaded again (deduplicated re-upload)."""
+        with self.Session() as session:
+            record = session.get(TranscriptRecord, transcript_id)
+            if record is not None:
+                record.uploaded_at = time.time()
+                session.commit()
+
+    def delete(self, transcript_id: str) -> None:
+        with self.Session() as session:
+            record = session.get(TranscriptRecord, transcript_id)
+            if record is not None:
+                session.delete(record)
+                session.commit()
+
+    def list(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        university: Optional[str] = None,
+        program: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of records, newest first, and the total matching count."""
+        query = select(TranscriptRecord)
+        if university:
+            query = query.where(TranscriptRecord.university_name == university)
+        if program:
+            query = query.where(TranscriptRecord.program_name == program)
+        with self.Session() as session:
+            total = session.scalar(select(func.count()).select_from(query.subquery()))
+            rows = session.scalars(
+                query.order_by(TranscriptRecord.created_at.desc()).limit(limit).offset(offset)
+            ).all()
+        return [row.to_listing() for row in rows], total
+
+    def latest_id(self) -> Optional[str]:
+        with self.Session() as session:
+            return session.scalar(
+                select(TranscriptRecord.transcript_id).order_by(TranscriptRecord.uploaded_at.desc()).limit(1)
+            )
+
+    def ids(self) -> set:
+        with self.Session() as session:
+            return set(session.scalars(select(TranscriptRecord.transcript_id)))
+
+    def outdated_ids(self, parser_version: str) -> List[str]:
+        with self.Session() as session:
+            return list(session.scalars(
+                select(TranscriptRecord.transcript_id).where(
+                    (TranscriptRecord.parser_version != parser_version) | TranscriptRecord.parser_version.is_(None)
+                )
+            ))
+
+    def filenames(self, transcript_ids: List[str]) -> Dict[str, Optional[str]]:
+        with self.Session() as session:
+            rows = session.execute(
+                select(TranscriptRecord.transcript_id, TranscriptRecord.filename)
+                .where(TranscriptRecord.transcript_id.in_(transcript_ids))
+            )
+            return dict(rows.all())
+
+    def uploaded_before(self, cutoff: float, limit: int = 1000) -> List[str]:
+        """IDs last uploaded before `cutoff` (epoch seconds), oldest first."""
+        with self.Session() as session:
+            return list(session.scalars(
+                select(TranscriptRecord.transcript_id)
+                .where(TranscriptRecord.uploaded_at < cutoff)
+                .order_by(TranscriptRecord.uploaded_at)
+                .limit(limit)
+            ))
+
+    def backfill(self, results_dir: Path) -> int:
+        """Import result files that have no record yet; returns how many were added."""
+        known = self.ids()
+        added = 0
+        for transcript_id, path in iter_result_files(results_dir):
+            if transcript_id in known:
+                continue
+            try:
+                result = read_result_file(path)
+            except (OSError, ValueError, RuntimeError):
+                continue
+            result["transcript_id"] = transcript_id
+            known.add(transcript_id)
+            self.upsert(result, created_at=path.stat().st_mtime)
+            added += 1
+        return added
+
+
+# Singleton
+_record_store: Optional[TranscriptRecordStore] = None
+_record_store_lock = threading.Lock()
+
+def get_record_store() -> TranscriptRecordStore:
+    global _record_store
+    if _record_store is None:
+        with _record_store_lock:
+            if _record_store is None:
+                _record_store = TranscriptRecordStore()
+    return _record_store
@@ -0,0 +1,119 @@
+"""
+Persistence of parsed transcript results.
+
+Each result is written to transcript_results/ (sharded and optionally
+compressed, see transcript_storage.py) and indexed in the transcript record
+table. Results are stamped with the PARSER_VERSION that produced them and the
+SHA-256 of the source PDF (kept in uploads/), so results from an older parser
+can be recognised and re-parsed from the original upload.
+
+New results are written with TRANSCRIPT_RESULT_CODEC (orjson by default: the
+compact binary container of transcript_codec.py; "json" for indented JSON files;
+"msgpack") and TRANSCRIPT_RESULT_COMPRESSION (none, gzip or zstd). Existing files
+are converted by the retention sweep and every format is read transparently.
+"""
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.models.transcript_schemas import TranscriptParseResponse
+from app.services.transcript_record_store import TranscriptRecordStore, get_record_store
+from app.services.transcript_service import PARSER_VERSION
+from app.services.transcript_storage import (
+    find_result_file, read_result_file, resolve_codec, resolve_compression, upload_file, write_result_file,
+)
+from app.utils.tracing import get_histograms
+
+_BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..", "..")
+UPLOAD_DIR = os.path.join(_BACKEND_DIR, "uploads")
+RESULTS_DIR = os.path.join(_BACKEND_DIR, "transcript_results")
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(RESULTS_DIR, exist_ok=True)
+RESULT_CODEC = resolve_codec(os.getenv("TRANSCRIPT_RESULT_CODEC", "orjson"))
+RESULT_COMPRESSION = resolve_compression(os.getenv("TRANSCRIPT_RESULT_COMPRESSION", "none"))
+# Response fields kept in stored results (timings and the legacy credit aliases are not)
+STORED_FIELDS = {
+    "filename", "extracted_text_chars", "university_name", "program_name",
+    "total_credits_attempted", "total_credits_earned", "study_year", "courses", "warnings",
+}
+
+
+def upload_path(transcript_id: str) -> str:
+    """The transcript's source PDF (in its shard directory, created if needed)."""
+    path = upload_file(UPLOAD_DIR, transcript_id)
+    path.parent.mkdir(exist_ok=True)
+    return str(path)
+
+
+def load_result(transcript_id: str) -> Optional[Dict[str, Any]]:
+    """Stored result dict, or None if there is none."""
+    # a second look covers a file moved (sweep) or re-saved in another format meanwhile
+    for _ in range(2):
+        path = find_result_file(RESULTS_DIR, transcript_id)
+        if path is None:
+            return None
+        try:
+            return read_result_file(path)
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def is_outdated(result_dict: Dict[str, Any]) -> bool:
+    """True for results produced by an older parser (or saved before stamping)."""
+    return result_dict.get("parser_version") != PARSER_VERSION
+
+
+_backfilled = False
+_backfill_lock = threading.Lock()
+
+def get_records() -> TranscriptRecordStore:
+    """Result index; results saved before it existed are imported on first use."""
+    global _backfilled
+    store = get_record_store()
+    if not _backfilled:
+        # once per process, even when the first requests arrive together
+        with _backfill_lock:
+            if not _backfilled:
+                store.backfill(Path(RESULTS_DIR))
+                _backfilled = True
+    return store
+
+
+def save_result(
+    transcript_id: str,
+    result: TranscriptParseResponse,
+    source_sha256: Optional[str] = None,
+    is_upload: bool = True,
+) -> Dict[str, Any]:
+    """
+    Save parse result and index it. is_upload=False (re-parses)
+    keeps the record's upload time so /transcripts/latest is unaffected.
+    The time taken is added to result.timings as the "save" stage.
+    """
+    started = time.perf_counter_ns()
+    result_dict = {
+        "transcript_id": transcript_id,
+        **result.model_dump(include=STORED_FIELDS),
+        "parser_version": PARSER_VERSION,
+        "source_sha256": source_sha256,
+    }
+    write_result_file(RESULTS_DIR, transcript_id, result_dict, RESULT_COMPRESSION, RESULT_CODEC)
+    get_records().upsert(result_dict, touch_upload=is_upload)
+
+    save_ms = round((time.perf_counter_ns() - started) / 1_000_000, 3)
+    get_histograms().observe("save", save_ms)
+    if result.timings is not None:
+        result.timings.setdefault("stages", {})["save"] = save_ms
+    return result_dict
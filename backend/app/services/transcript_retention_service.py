@@ -0,0 +1,265 @@
+"""
+Retention and compaction of stored transcripts (uploads/, transcript_results/
+and the transcript_index/ dedup entries).
+
+A sweep applies, in order:
+  age       transcripts last uploaded more than TRANSCRIPT_RETENTION_DAYS ago are
+            deleted entirely (record, result, source PDF); 0 keeps them forever
+  compact   results and uploads still in the flat pre-sharding layout move into
+            their shard; results not in TRANSCRIPT_RESULT_CODEC and
+            TRANSCRIPT_RESULT_COMPRESSION are rewritten in them; abandoned
+            .part/.tmp files are removed
+  size      while uploads/ holds more than TRANSCRIPT_UPLOADS_MAX_MB, the oldest
+            PDFs are deleted (results stay readable; they just can't be re-parsed)
+  index     dedup entries for another parser version (they can never hit again)
+            or for a transcript that no longer exists are deleted; flat entries
+            move into their shard
+
+Only files the service owns are touched: PDFs named by a transcript ID (a UUID
+or a stored record). Sample PDFs placed in uploads/ by hand stay where they are.
+Files touched within the last GRACE_SECONDS are left alone so a sweep never races
+an upload or save in flight. The API runs sweep() every
+TRANSCRIPT_RETENTION_SWEEP_MINUTES on a worker thread (run_periodic_sweeps), so
+request handling is never blocked; the first sweep starts shortly after startup.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.transcript_dedup_service import TranscriptHashIndex, get_transcript_index
+from app.services.transcript_record_store import TranscriptRecordStore
+from app.services.transcript_result_service import (
+    RESULT_CODEC, RESULT_COMPRESSION, RESULTS_DIR, UPLOAD_DIR, get_records,
+)
+from app.services.transcript_storage import (
+    iter_result_files, read_result_file, remove_result_files, result_format, shard_dir,
+    upload_file, write_result_file,
+)
+
+RETENTION_DAYS = float(os.getenv("TRANSCRIPT_RETENTION_DAYS", "0"))
+UPLOADS_MAX_BYTES = int(float(os.getenv("TRANSCRIPT_UPLOADS_MAX_MB", "0")) * 1024 * 1024)
+SWEEP_INTERVAL_SECONDS = float(os.getenv("TRANSCRIPT_RETENTION_SWEEP_MINUTES", "60")) * 60
+GRACE_SECONDS = 300
+# Abandoned upload parts / temp files (crashed mid-write) older than this are removed
+STALE_TEMP_SECONDS = 3600
+STARTUP_DELAY_SECONDS = 30
+
+
+class RetentionManager:
+    def __init__(
+        self,
+        upload_dir: str,
+        results_dir: str,
+        records: TranscriptRecordStore,
+        retention_days: float = 0,
+        uploads_max_bytes: int = 0,
+        compression: str = "none",
+        codec: str = "json",
+        index: Optional[TranscriptHashIndex] = None,
+    ):
+        self.upload_dir = upload_dir
+        self.results_dir = results_dir
+        self.records = records
+        self.retention_days = retention_days
+        self.uploads_max_bytes = uploads_max_bytes
+        self.compression = compression
+        self.codec = codec
+        self.index = index
+        self.last_sweep: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def sweep(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Apply every policy once; returns (and keeps as last_sweep) what was done."""
+        now = now or time.time()
+        started = time.perf_counter()
+        summary = {
+            "expired": 0, "results_compacted": 0, "uploads_moved": 0,
+            "temp_removed": 0, "uploads_trimmed": 0, "index_removed": 0, "index_moved": 0, "bytes_freed": 0,
+        }
+        # one sweep at a time (e.g. a manual sweep while the periodic one runs)
+        with self._lock:
+            if self.retention_days > 0:
+                self._expire(now - self.retention_days * 86400, summary)
+            known = self.records.ids()
+            self._compact_results(now, summary)
+            self._compact_uploads(now, known, summary)
+            if self.uploads_max_bytes > 0:
+                self._trim_uploads(now, known, summary)
+            if self.index is not None:
+                self._sweep_index(now, known, summary)
+        summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        summary["finished_at"] = time.time()
+        self.last_sweep = summary
+        return summary
+
+    def _unlink(self, path: Path, summary: Dict[str, Any]) -> bool:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        summary["bytes_freed"] += size
+        return True
+
+    def _expire(self, cutoff: float, summary: Dict[str, Any]) -> None:
+        while True:
+            expired = self.records.uploaded_before(cutoff)
+            if not expired:
+                return
+            for transcript_id in expired:
+                # record first: from here on the transcript is gone for readers
+                self.records.delete(transcript_id)
+                remove_result_files(self.results_dir, transcript_id)
+                self._unlink(upload_file(self.upload_dir, transcript_id), summary)
+                summary["expired"] += 1
+
+    def _compact_results(self, now: float, summary: Dict[str, Any]) -> None:
+        base = Path(self.results_dir)
+        for transcript_id, path in list(iter_result_files(self.results_dir)):
+            try:
+                in_shard = path.parent == shard_dir(self.results_dir, transcript_id)
+                if in_shard and result_format(path) == (self.codec, self.compression):
+                    continue
+                if now - path.stat().st_mtime < GRACE_SECONDS:
+                    continue
+                read_stat = path.stat()
+                result = read_result_file(path)
+            except (OSError, ValueError, RuntimeError):
+                continue
+            # skipped if a save (re-parse) replaced or removed the file since it was read
+            written = write_result_file(
+                self.results_dir, transcript_id, result, self.compression, self.codec,
+                replaces=(path, read_stat.st_mtime_ns),
+            )
+            if written is None:
+                continue
+            summary["bytes_freed"] += read_stat.st_size - written.stat().st_size
+            summary["results_compacted"] += 1
+        for tmp in [*base.glob("*.tmp"), *base.glob("*/*.tmp")]:
+            if self._is_stale(tmp, now) and self._unlink(tmp, summary):
+                summary["temp_removed"] += 1
+
+    @staticmethod
+    def _owned(stem: str, known: Set[str]) -> bool:
+        """An upload this service stored: named by a transcript ID, not placed by hand."""
+        if stem in known:
+            return True
+        try:
+            uuid.UUID(stem)
+        except ValueError:
+            return False
+        return True
+
+    def _compact_uploads(self, now: float, known: Set[str], summary: Dict[str, Any]) -> None:
+        base = Path(self.upload_dir)
+        for entry in os.scandir(base):
+            if not entry.is_file():
+                continue
+            path = Path(entry.path)
+            if entry.name.endswith(".part"):
+                if self._is_stale(path, now) and self._unlink(path, summary):
+                    summary["temp_removed"] += 1
+            elif entry.name.endswith(".pdf") and self._owned(path.stem, known) and not self._is_recent(path, now):
+                target = shard_dir(self.upload_dir, path.stem) / entry.name
+                target.parent.mkdir(exist_ok=True)
+                os.replace(path, target)
+                summary["uploads_moved"] += 1
+
+    def _uploads_by_age(self, known: Set[str]) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every stored transcript PDF, oldest first."""
+        files = []
+        for path in [*Path(self.upload_dir).glob("*.pdf"), *Path(self.upload_dir).glob("*/*.pdf")]:
+            if not self._owned(path.stem, known):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return sorted(files)
+
+    def _trim_uploads(self, now: float, known: Set[str], summary: Dict[str, Any]) -> None:
+        files = self._uploads_by_age(known)
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            if total <= self.uploads_max_bytes:
+                break
+            if now - mtime < GRACE_SECONDS:
+                # everything left is newer: it may still be parsing
+                break
+            if self._unlink(path, summary):
+                summary["uploads_trimmed"] += 1
+            total -= size
+
+    def _sweep_index(self, now: float, known: Set[str], summary: Dict[str, Any]) -> None:
+        base = self.index.index_dir
+        for path, sha256, version in list(self.index.entries()):
+            if self._is_recent(path, now):
+                continue  # may belong to a save in flight
+            stale = version != self.index.parser_version
+            if not stale:
+                try:
+                    stale = json.loads(path.read_text(encoding="utf-8")).get("transcript_id") not in known
+                except (OSError, ValueError):
+                    stale = True
+            if stale:
+                if self._unlink(path, summary):
+                    summary["index_removed"] += 1
+            elif path.parent == base:
+                target = base / sha256[:2] / path.name
+                target.parent.mkdir(exist_ok=True)
+                os.replace(path, target)
+                summary["index_moved"] += 1
+        for tmp in [*base.glob("*.tmp"), *base.glob("*/*.tmp")]:
+            if self._is_stale(tmp, now) and self._unlink(tmp, summary):
+                summary["temp_removed"] += 1
+
+    @staticmethod
+    def _is_recent(path: Path, now: float) -> bool:
+        try:
+            return now - path.stat().st_mtime < GRACE_SECONDS
+        except FileNotFoundError:
+            return True
+
+    @staticmethod
+    def _is_stale(path: Path, now: float) -> bool:
+        try:
+            return now - path.stat().st_mtime > STALE_TEMP_SECONDS
+        except FileNotFoundError:
+            return False
+
+
+# Singleton
+_retention_manager: Optional[RetentionManager] = None
+
+def get_retention_manager() -> RetentionManager:
+    global _retention_manager
+    if _retention_manager is None:
+        _retention_manager = RetentionManager(
+            UPLOAD_DIR, RESULTS_DIR, get_records(),
+            retention_days=RETENTION_DAYS,
+            uploads_max_bytes=UPLOADS_MAX_BYTES,
+            compression=RESULT_COMPRESSION,
+            codec=RESULT_CODEC,
+            index=get_transcript_index(),
+        )
+    return _retention_manager
+
+
+async def run_periodic_sweeps(interval: float = SWEEP_INTERVAL_SECONDS, delay: float = STARTUP_DELAY_SECONDS):
+    """Sweep every `interval` seconds on a worker thread until cancelled."""
+    await asyncio.sleep(delay)
+    # building the manager opens (and may backfill) the record store: also off the loop
+    manager = await asyncio.to_thread(get_retention_manager)
+    while True:
+        try:
+            await asyncio.to_thread(manager.sweep)
+        except Exception as e:
+            # keep sweeping; the failure is visible in last_sweep
+            manager.last_sweep = {"error": str(e), "finished_at": time.time()}
+        await asyncio.sleep(interval)
@@ -1,17 +1,29 @@
 from app.services.pdf_text_service import extract_text_from_pdf
 from app.services.course_extract_service import extract_courses_from_text
-from app.services.catalog_service import get_catalog_service
+from app.services.catalog_service import CatalogService, get_catalog_service
+from app.services.institution_parsers import InstitutionParser, detect_institution
 from app.models.transcript_schemas import TranscriptParseResponse, ExtractedCourse
-from typing import List, Optional, Tuple
+from app.utils.tracing import Trace, annotate, span
+from typing import Callable, List, Optional, Tuple
 import re
 
+# Bump whenever parsing output can change for the same PDF; cached/deduplicated
+# results from an older parser version are not reused, and stored results stamped
+# with an older version are re-parsed (lazily on read, or scripts/reparse_transcripts.py).
+PARSER_VERSION = "2"
+
 # Passing non-letter grades that count as earned credits
 PASSING_NONLETTER = {"PAS", "CR", "P"}  # PAS=Pass, CR=Credit, P=Pass
 # Grades that do NOT count as earned credits
 NON_EARNED = {"F", "WD", "W", "NC", "IP", "CO"}  # CO=Currently in progress (not completed)
 
-def _infer_university_name(text: str, original_filename: str) -> Tuple[Optional[str], List[str]]:
+def _infer_university_name(
+    text: str, original_filename: str, institution: Optional[InstitutionParser] = None
+) -> Tuple[Optional[str], List[str]]:
     warnings = []
+    # Already fingerprinted from the first page
+    if institution is not None:
+        return institution.name, warnings
     # Try explicit text match first (some PDFs include it in text layer)
     uni_patterns = [
         (r'Ontario\s+Tech\s+University|University\s+of\s+Ontario\s+Institute\s+of\s+Technology', "Ontario Tech University"),
@@ -107,7 +119,49 @@ def _calc_credit_totals(courses: List[ExtractedCourse]) -> Tuple[float, float]:
 
     return attempted, earned
 
-def parse_transcript_pdf(saved_path: str, original_filename: str, enrich_with_catalog: bool = True) -> TranscriptParseResponse:
+def _extract_rows(text: str) -> Tuple[Optional[InstitutionParser], List[ExtractedCourse], List[str]]:
+    """
+    Detect the institution and parse rows with its pattern families only. A
+    fingerprint can match a transcript laid out another way (e.g. one that just
+    mentions the school), so when those families find nothing every family is tried.
+    """
+    institution = detect_institution(text)
+    if institution is not None:
+        courses, warnings = extract_courses_from_text(text, row_families=institution.row_families)
+        if courses:
+            return institution, courses, warnings
+    courses, warnings = extract_courses_from_text(text)
+    return institution, courses, warnings
+
+def _enrich_courses(courses: List[ExtractedCourse], catalog: CatalogService) -> None:
+    """
+    Match courses against the catalog in place: backfill missing titles, add the
+    catalog URL flag and nudge confidence. All codes are resolved in one batched
+    lookup; each catalog course's flag is built once however often it appears.
+    """
+    matches = catalog.get_many_by_code(c.course_code for c in courses if c.course_code)
+    if not matches:
+        return
+    url_flags = {norm: f"catalog_url:{course['url']}" for norm, course in matches.items() if course.get("url")}
+    for course in courses:
+        if not course.course_code:
+            continue
+        norm = catalog.catalog_key(course.course_code)
+        catalog_course = matches.get(norm)
+        if catalog_course is None:
+            continue
+        if not course.course_title and catalog_course.get("title"):
+            course.course_title = catalog_course["title"]
+        if norm in url_flags:
+            course.flags.append(url_flags[norm])
+        course.confidence = min(1.0, course.confidence + 0.05)
+
+def parse_transcript_pdf(
+    saved_path: str,
+    original_filename: str,
+    enrich_with_catalog: bool = True,
+    progress: Optional[Callable[[str], None]] = None,
+) -> TranscriptParseResponse:
     """
     Parse transcript PDF and optionally enrich with catalog data.
     
@@ -115,43 +169,56 @@ def parse_transcript_pdf(saved_path: str, original_filename: str, enrich_with_ca
         saved_path: Path to the saved PDF file
         original_filename: Original filename of the uploaded PDF
         enrich_with_catalog: If True, match courses with catalog and enrich data
+        progress: Optional callback, called with the stage name as each stage starts
+            ("text_extraction", "row_parsing", "enrichment")
         
     Returns:
-        TranscriptParseResponse with parsed courses and metadata
+        TranscriptParseResponse with parsed courses and metadata, plus per-stage
+        and per-page `timings` in milliseconds
     """
+    trace = Trace()
+    with trace.activate():
+        result = _parse_transcript(saved_path, original_filename, enrich_with_catalog, progress or (lambda stage: None))
+    result.timings = trace.to_dict()
+    return result
+
+def _parse_transcript(
+    saved_path: str,
+    original_filename: str,
+    enrich_with_catalog: bool,
+    report: Callable[[str], None],
+) -> TranscriptParseResponse:
     # Step 1: Extract text from PDF
-    text, pdf_warnings = extract_text_from_pdf(saved_path)
+    report("text_extraction")
+    with span("text_extraction"):
+        text, pdf_warnings = extract_text_from_pdf(saved_path)
 
-    # Step 2: Extract courses from text
-    courses, parse_warnings = extract_courses_from_text(text)
+    # Step 2: Detect the institution from the first page, then run only its row patterns
+    report("row_parsing")
+    with span("row_parsing"):
+        institution, courses, parse_warnings = _extract_rows(text)
+    annotate("institution", institution.key if institution else None)
 
     # Step 2.5: Extract metadata
-    program_name, program_warnings = _extract_program_name(text)
-    university_name, uni_warnings = _infer_university_name(text, original_filename)
+    with span("metadata"):
+        program_name, program_warnings = _extract_program_name(text)
+        university_name, uni_warnings = _infer_university_name(text, original_filename, institution)
 
     # Step 2.6: Totals + study year
-    attempted, earned = _calc_credit_totals(courses)
-    study_year = _calc_study_year([c.term for c in courses if c.term])
+    with span("totals"):
+        attempted, earned = _calc_credit_totals(courses)
+        study_year = _calc_study_year([c.term for c in courses if c.term])
 
-    # Step 3: Optionally enrich with catalog data
+    # Step 3: Optionally enrich with the detected school's catalog
     catalog_warnings = []
     if enrich_with_catalog:
-        catalog = get_catalog_service()
-        if catalog.is_loaded():
-            enriched_courses = []
-            for course in courses:
-                if course.course_code:
-                    catalog_course = catalog.get_by_code(course.course_code)
-                    if catalog_course:
-                        if not course.course_title and catalog_course.get("title"):
-                            course.course_title = catalog_course["title"]
-                        if catalog_course.get("url"):
-                            course.flags.append(f"catalog_url:{catalog_course['url']}")
-                        course.confidence = min(1.0, course.confidence + 0.05)
-                enriched_courses.append(course)
-            courses = enriched_courses
-        else:
-            catalog_warnings.append("Catalog not loaded - skipping enrichment")
+        report("enrichment")
+        with span("enrichment"):
+            catalog = get_catalog_service(institution.catalog_school if institution else None)
+            if catalog.is_loaded():
+                _enrich_courses(courses, catalog)
+            else:
+                catalog_warnings.append(f"Catalog not loaded ({catalog.school}) - skipping enrichment")
 
     # Calculate degree credits (excluding co-op)
     degree_credits = sum(
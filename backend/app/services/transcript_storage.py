@@ -0,0 +1,188 @@
+"""
+On-disk layout of stored transcripts.
+
+Uploads and results are sharded by the first SHARD_CHARS characters of the
+transcript ID (uploads/ab/abcd....pdf, transcript_results/ab/abcd....json) so
+no directory grows past a few thousand entries. Files written before sharding
+sit directly in the base directory and are still found; the retention sweep
+moves them into their shard.
+
+A result is stored in one of two codecs:
+  json            <id>.json, <id>.json.gz or <id>.json.zst (zstd needs
+                  `pip install zstandard`), the whole document compressed
+  orjson/msgpack  <id>.trs, the versioned binary container of transcript_codec.py
+                  (codec and compression recorded in its header)
+Readers detect the format from the file, so codec and compression settings can
+change at any time; the retention sweep rewrites older files in the current one.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.services import transcript_codec
+from app.services.transcript_codec import BODY_FIELDS, MSGPACK_AVAILABLE, ZSTD_AVAILABLE, compress, decompress
+
+SHARD_CHARS = 2
+CONTAINER_SUFFIX = ".trs"
+# suffix -> compression of plain JSON files
+JSON_SUFFIXES = {".json": "none", ".json.gz": "gzip", ".json.zst": "zstd"}
+_JSON_SUFFIX_FOR = {name: suffix for suffix, name in JSON_SUFFIXES.items()}
+# every result file suffix, in lookup order
+RESULT_SUFFIXES = (CONTAINER_SUFFIX, *JSON_SUFFIXES)
+CODECS = ("json", "orjson", "msgpack")
+
+# Serialises result writes in this process: a save and a retention rewrite of the
+# same transcript must not interleave (see write_result_file's replaces=)
+_write_lock = threading.Lock()
+
+
+def resolve_compression(name: Optional[str]) -> str:
+    """Normalise a configured compression; zstd falls back to gzip when zstandard is missing."""
+    name = (name or "none").strip().lower()
+    if name == "zstd" and not ZSTD_AVAILABLE:
+        return "gzip"
+    return name if name in _JSON_SUFFIX_FOR else "none"
+
+
+def resolve_codec(name: Optional[str]) -> str:
+    """Normalise a configured codec; msgpack falls back to orjson when msgpack is missing."""
+    name = (name or "orjson").strip().lower()
+    if name == "msgpack" and not MSGPACK_AVAILABLE:
+        return "orjson"
+    return name if name in CODECS else "orjson"
+
+
+def shard_dir(base_dir: str, transcript_id: str) -> Path:
+    return Path(base_dir) / transcript_id[:SHARD_CHARS].lower()
+
+
+def upload_file(upload_dir: str, transcript_id: str) -> Path:
+    """Where the transcript's PDF is (legacy flat location if it's still there), else where it goes."""
+    legacy = Path(upload_dir) / f"{transcript_id}.pdf"
+    if legacy.exists():
+        return legacy
+    return shard_dir(upload_dir, transcript_id) / f"{transcript_id}.pdf"
+
+
+def find_result_file(results_dir: str, transcript_id: str) -> Optional[Path]:
+    for directory in (shard_dir(results_dir, transcript_id), Path(results_dir)):
+        for suffix in RESULT_SUFFIXES:
+            path = directory / f"{transcript_id}{suffix}"
+            if path.exists():
+                return path
+    return None
+
+
+def _split_name(path: Path) -> Optional[str]:
+    """Transcript ID of a result file name (None if it isn't one)."""
+    for suffix in sorted(RESULT_SUFFIXES, key=len, reverse=True):
+        if path.name.endswith(suffix):
+            return path.name[: -len(suffix)]
+    return None
+
+
+def read_result_file(path: Path) -> Dict[str, Any]:
+    path = Path(path)
+    data = path.read_bytes()
+    if path.name.endswith(CONTAINER_SUFFIX):
+        return transcript_codec.decode(data)
+    return json.loads(decompress(data, JSON_SUFFIXES[path.name[path.name.index(".json"):]]))
+
+
+def read_result_head(path: Path) -> Dict[str, Any]:
+    """
+    The result without courses and warnings. For .trs files only the header and
+    metadata segment are read from disk; JSON files are parsed whole.
+    """
+    path = Path(path)
+    if not path.name.endswith(CONTAINER_SUFFIX):
+        return {k: v for k, v in read_result_file(path).items() if k not in BODY_FIELDS}
+    with open(path, "rb") as f:
+        prefix = f.read(transcript_codec.PREFIX_SIZE)
+        data = prefix + f.read(transcript_codec.head_length(prefix))
+    return transcript_codec.decode_head(data)
+
+
+def result_format(path: Path) -> Tuple[str, str]:
+    """(codec, compression) a result file is stored in."""
+    path = Path(path)
+    if path.name.endswith(CONTAINER_SUFFIX):
+        with open(path, "rb") as f:
+            return transcript_codec.read_header(f.read(transcript_codec.PREFIX_SIZE))
+    return "json", JSON_SUFFIXES[path.name[path.name.index(".json"):]]
+
+
+def write_result_file(
+    results_dir: str,
+    transcript_id: str,
+    result: Dict[str, Any],
+    compression: str = "none",
+    codec: str = "json",
+    replaces: Optional[Tuple[Path, int]] = None,
+) -> Optional[Path]:
+    """
+    Atomically write the result into its shard in the given codec and compression,
+    and remove any other copy of it (another format, or the legacy flat location).
+    replaces=(path, st_mtime_ns) makes the write conditional on that file being
+    unchanged since it was read; otherwise nothing is written and None is returned.
+    """
+    with _write_lock:
+        if replaces is not None:
+            try:
+                if replaces[0].stat().st_mtime_ns != replaces[1]:
+                    return None
+            except FileNotFoundError:
+                return None
+        return _write_result_file(results_dir, transcript_id, result, compression, codec)
+
+
+def _write_result_file(results_dir: str, transcript_id: str, result: Dict[str, Any], compression: str, codec: str) -> Path:
+    compression = resolve_compression(compression)
+    codec = resolve_codec(codec)
+    directory = shard_dir(results_dir, transcript_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    if codec != "json":
+        path = directory / f"{transcript_id}{CONTAINER_SUFFIX}"
+        payload = transcript_codec.encode(result, codec, compression)
+    elif compression == "none":
+        path = directory / f"{transcript_id}.json"
+        payload = json.dumps(result, indent=2, ensure_ascii=False).encode("utf-8")
+    else:
+        path = directory / f"{transcript_id}{_JSON_SUFFIX_FOR[compression]}"
+        payload = compress(json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), compression)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(payload)
+    # readers never see a half-written result (re-parses replace files in place)
+    os.replace(tmp, path)
+    remove_result_files(results_dir, transcript_id, keep=path)
+    return path
+
+
+def remove_result_files(results_dir: str, transcript_id: str, keep: Optional[Path] = None) -> int:
+    removed = 0
+    for directory in (shard_dir(results_dir, transcript_id), Path(results_dir)):
+        for suffix in RESULT_SUFFIXES:
+            path = directory / f"{transcript_id}{suffix}"
+            if path != keep and path.exists():
+                path.unlink()
+                removed += 1
+    return removed
+
+
+def iter_result_files(results_dir: str) -> Iterator[Tuple[str, Path]]:
+    """(transcript_id, path) for every stored result, legacy flat files included."""
+    base = Path(results_dir)
+    if not base.exists():
+        return
+    for entry in os.scandir(base):
+        if entry.is_dir():
+            for sub in os.scandir(entry.path):
+                transcript_id = _split_name(Path(sub.name))
+                if transcript_id and sub.is_file():
+                    yield transcript_id, Path(sub.path)
+        elif entry.is_file():
+            transcript_id = _split_name(Path(entry.name))
+            if transcript_id:
+                yield transcript_id, Path(entry.path)
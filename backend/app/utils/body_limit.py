@@ -0,0 +1,54 @@
+"""
+ASGI middleware that caps request bodies per path.
+
+Starlette parses (and spools) a whole multipart body before the endpoint runs,
+so a size check in the endpoint comes too late for bodies sent without a
+Content-Length (chunked). BodySizeLimit answers 413 up front when the declared
+Content-Length is too large, and otherwise counts the body bytes as they are
+received and aborts with 413 as soon as the limit is passed.
+
+    app.add_middleware(BodySizeLimit, limits={"/upload": (10_000_000, "Too large")})
+"""
+from typing import Dict, Tuple
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class BodySizeLimit:
+    def __init__(self, app: ASGIApp, limits: Dict[str, Tuple[int, str]], methods: Tuple[str, ...] = ("POST",)):
+        # path -> (largest accepted body in bytes, 413 detail)
+        self.app = app
+        self.limits = limits
+        self.methods = methods
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = None
+        if scope["type"] == "http" and scope["method"] in self.methods:
+            limit = self.limits.get(scope["path"].rstrip("/"))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        max_bytes, detail = limit
+
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > max_bytes:
+            await JSONResponse(status_code=413, content={"detail": detail})(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # raised inside body parsing: FastAPI re-raises HTTPException, the
+                    # app's exception handler turns it into the 413 response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,158 @@
+"""
+Lightweight timing spans and histograms for the transcript pipeline.
+
+    trace = Trace()
+    with trace.activate():
+        with span("row_parsing"):
+            ...
+
+span() times its block with perf_counter_ns and adds it to the trace active in
+the current context (a no-op when there is none, so instrumented code also runs
+untraced). Repeated span names add up; per-page spans are kept as a list.
+Trace.to_dict() gives the millisecond breakdown returned as `timings`.
+
+Parses run in worker processes, so histograms are fed in the API process from
+the returned timings (Histograms.observe_timings) rather than by span() itself.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Histogram bucket upper bounds in milliseconds (plus an implicit +Inf bucket)
+BUCKETS_MS: Tuple[float, ...] = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("transcript_trace", default=None)
+
+
+def _ms(ns: int) -> float:
+    return round(ns / 1_000_000, 3)
+
+
+class Trace:
+    def __init__(self):
+        self.started_ns = time.perf_counter_ns()
+        self.spans: Dict[str, int] = {}
+        self.pages: List[Dict[str, Any]] = []
+        self.attributes: Dict[str, Any] = {}
+
+    @contextmanager
+    def activate(self) -> Iterator["Trace"]:
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def add(self, name: str, ns: int) -> None:
+        self.spans[name] = self.spans.get(name, 0) + ns
+
+    def add_page(self, ms: float, strategy: str) -> None:
+        self.pages.append({"ms": round(ms, 3), "strategy": strategy})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_ms": _ms(time.perf_counter_ns() - self.started_ns),
+            "stages": {name: _ms(ns) for name, ns in self.spans.items()},
+            "pages": self.pages,
+            **self.attributes,
+        }
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter_ns() - started)
+
+
+def record_page(ms: float, strategy: str) -> None:
+    """Add one page's extraction time (measured wherever the page was extracted, maybe another process)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_page(ms, strategy)
+
+
+def annotate(key: str, value: Any) -> None:
+    """Attach a value (e.g. the PDF template key) to the active trace's timings."""
+    trace = _current.get()
+    if trace is not None:
+        trace.attributes[key] = value
+
+
+class Histograms:
+    """Cumulative per-name latency histograms (milliseconds), safe across threads."""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS_MS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # name -> [per-bucket counts (last is +Inf), count, sum_ms, max_ms]
+        self._series: Dict[str, list] = {}
+
+    def observe(self, name: str, ms: float) -> None:
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = [[0] * (len(self.buckets) + 1), 0, 0.0, 0.0]
+            series[0][bisect_left(self.buckets, ms)] += 1
+            series[1] += 1
+            series[2] += ms
+            series[3] = max(series[3], ms)
+
+    def observe_timings(self, timings: Optional[Dict[str, Any]]) -> None:
+        """Record a Trace.to_dict(): total, every stage, and pages by strategy."""
+        if not timings:
+            return
+        if "total_ms" in timings:
+            self.observe("total", timings["total_ms"])
+        for name, ms in (timings.get("stages") or {}).items():
+            self.observe(name, ms)
+        for page in timings.get("pages") or ():
+            self.observe(f"page.{page.get('strategy', 'none')}", page["ms"])
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON form: cumulative bucket counts keyed by upper bound ("+Inf" last)."""
+        bounds = [f"{b:g}" for b in self.buckets] + ["+Inf"]
+        out = {}
+        with self._lock:
+            for name, (counts, count, total, peak) in sorted(self._series.items()):
+                cumulative, running = {}, 0
+                for bound, n in zip(bounds, counts):
+                    running += n
+                    cumulative[bound] = running
+                out[name] = {
+                    "count": count,
+                    "sum_ms": round(total, 3),
+                    "mean_ms": round(total / count, 3) if count else 0.0,
+                    "max_ms": round(peak, 3),
+                    "buckets": cumulative,
+                }
+        return {"unit": "ms", "histograms": out}
+
+    def prometheus(self, metric: str = "transcript_parse_stage_ms") -> str:
+        """Prometheus text exposition format, one series per span name."""
+        lines = [f"# TYPE {metric} histogram"]
+        for name, series in self.snapshot()["histograms"].items():
+            for bound, n in series["buckets"].items():
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {n}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {series["sum_ms"]}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {series["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+# Singleton (one per API process)
+_histograms: Optional[Histograms] = None
+
+def get_histograms() -> Histograms:
+    global _histograms
+    if _histograms is None:
+        _histograms = Histograms()
+    return _histograms
@@ -3,7 +3,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+import asyncio
 import os
 
 # Load environment variables from .env file
@@ -11,19 +13,54 @@ load_dotenv()
 
 from app.db import get_db, check_connection
 from app.controllers.plan_controller import router as plan_router
-from app.controllers.transcript_controller import router as transcript_router
+from app.controllers.transcript_controller import (
+    router as transcript_router,
+    BATCH_TOO_LARGE_DETAIL,
+    MAX_BATCH_UPLOAD_BYTES,
+    MAX_UPLOAD_BYTES,
+    MULTIPART_OVERHEAD_BYTES,
+    UPLOAD_TOO_LARGE_DETAIL,
+)
 from app.controllers.catalog_controller import router as catalog_router
 from app.controllers.enrich_controller import router as enrich_router
 from app.controllers.recommend_controller import router as recommend_router
 from app.controllers.professor_controller import router as professor_router
 from app.controllers.project_controller import router as project_router
+from app.services.transcript_parse_pool import get_parse_pool
+from app.services.transcript_job_service import get_job_queue
+from app.services.transcript_retention_service import run_periodic_sweeps
+from app.services.local_recommender_service import get_local_recommender
+from app.utils.body_limit import BodySizeLimit
 try:
     from app.controllers.linkedin_controller import router as linkedin_router
     HAS_LINKEDIN = True
 except Exception:
     HAS_LINKEDIN = False
 
-app = FastAPI(title="PathPilot API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start transcript parse workers in the background so startup isn't blocked
+    parse_pool = get_parse_pool()
+    warm = asyncio.get_running_loop().run_in_executor(None, parse_pool.warm)
+    # Offline career recommender (catalog IDF + profile matrix) ready before the first request
+    warm_recommender = asyncio.get_running_loop().run_in_executor(None, get_local_recommender)
+    # Retention/compaction of stored transcripts runs on a worker thread between requests
+    sweeps = asyncio.create_task(run_periodic_sweeps())
+    yield
+    sweeps.cancel()
+    await asyncio.gather(warm, warm_recommender, sweeps, return_exceptions=True)
+    get_job_queue().shutdown()
+    parse_pool.shutdown()
+
+app = FastAPI(title="PathPilot API", version="0.1.0", lifespan=lifespan)
+
+# path -> (largest accepted body, 413 detail). Declared-oversized uploads are refused
+# before the multipart body is read; chunked ones are cut off once they pass the limit.
+UPLOAD_LIMITS = {
+    "/transcripts/parse": (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES, UPLOAD_TOO_LARGE_DETAIL),
+    "/transcripts/parse/batch": (MAX_BATCH_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES, BATCH_TOO_LARGE_DETAIL),
+}
+app.add_middleware(BodySizeLimit, limits=UPLOAD_LIMITS)
 
 # CORS middleware MUST be added before routes
 app.add_middleware(
@@ -39,8 +76,8 @@ app.add_middleware(
 @app.get("/")
 def root():
     endpoints = {
-        "plan": "/plan/generate, /plan/repair",
-        "transcripts": "/transcripts/parse, /transcripts/{id}, /transcripts/",
+        "plan": "/plan/generate, /plan/generate/batch, /plan/repair, /plan/session",
+        "transcripts": "/transcripts/parse, /transcripts/parse/batch, /transcripts/jobs/{job_id}, /transcripts/{id}, /transcripts/",
         "catalog": "/catalog/status, /catalog/search, /catalog/all",
         "enrich": "/enrich/courses",
         "recommend": "/recommend/careers",
@@ -0,0 +1,143 @@
+"""
+Benchmark course-row line classification in course_extract_service.
+Compares classify_line (prefix pre-screen, at most one pattern family per line)
+against the plain pattern ladder it replaced, checks both classify every line
+identically, and reports lines/second for each plus full extract_courses_from_text.
+
+Corpus: synthetic Ontario Tech / TMU transcript text (default), or every .txt
+file under --corpus (e.g. text dumped from real transcripts). --institution
+benchmarks one registered institution parser in isolation: only documents it
+fingerprints, with only its row pattern families.
+
+Usage (from backend/):
+    python scripts/bench_course_extract.py
+    python scripts/bench_course_extract.py --docs 2000 --corpus path/to/texts
+    python scripts/bench_course_extract.py --institution tmu
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.course_extract_service import (
+    COURSE_ROW_INPROGRESS_PATTERN,
+    COURSE_ROW_PATTERN,
+    TMU_ROW_MINIMAL_PATTERN,
+    TMU_ROW_PATTERN,
+    classify_line,
+    extract_courses_from_text,
+)
+from app.services.institution_parsers import detect_institution, get_parser, list_parsers
+
+TITLES = ["Intro to Computer Science", "Calculus I", "Discrete Mathematics for Computer Science",
+          "Programming Workshop II", "Data Structures", "Linear Algebra", "Operating Systems",
+          "Software Quality Engineering and Testing Methods", "Computer Organization"]
+GRADES = ["A+", "A", "A-", "B+", "B", "C", "D", "F", "PAS", "CR", "WD"]
+NOISE = ["Unofficial Transcript", "Student Number: 100123456", "Page 1 of 3", "Term Totals Attempted 15.000 Earned 15.000",
+         "Cumulative GPA 3.42", "Academic Standing: Good Standing", "Course Description Grade Credits",
+         "Degree: Bachelor of Science (Honours)", "Transcript Totals Overall Quality Points 180.30 GPA 3.61"]
+
+
+def _synthetic_doc(rng: random.Random) -> str:
+    lines = ["Ontario Tech University" if rng.random() < 0.5 else "Toronto Metropolitan University"]
+    for year in range(2019, 2019 + rng.randint(2, 5)):
+        for season in ("Fall", "Winter"):
+            lines.append(f"Term: {season} {year}")
+            for _ in range(rng.randint(4, 6)):
+                title = rng.choice(TITLES)
+                shape = rng.random()
+                if shape < 0.4:
+                    lines.append(f"CSCI {rng.randint(1000, 4999)}U UG {title} {rng.choice(GRADES)} 3.000 {rng.uniform(0, 13):.2f}")
+                elif shape < 0.5:
+                    lines.append(f"MATH {rng.randint(1000, 4999)}U UG {title} 3.000")
+                elif shape < 0.85:
+                    lines.append(f"CPS {rng.randint(100, 999)} - {title} 1.00 {rng.choice(GRADES)}")
+                else:
+                    lines.append(f"MTH {rng.randint(100, 999)} - {title}")
+            lines.extend(rng.sample(NOISE, 3))
+    return "\n".join(lines)
+
+
+def _reference_classify(line: str):
+    """The original ladder: every pattern in order, no pre-screen."""
+    for kind, pattern in (("row", COURSE_ROW_PATTERN), ("inprogress", COURSE_ROW_INPROGRESS_PATTERN), ("tmu", TMU_ROW_PATTERN)):
+        m = pattern.match(line)
+        if m:
+            return kind, m
+    m = TMU_ROW_MINIMAL_PATTERN.match(line)
+    if m and len(line) < 120:
+        return "tmu_minimal", m
+    return None, None
+
+
+def _rate(fn, items, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            fn(item)
+    return len(items) * repeat / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=500, help="Synthetic documents to generate (default: 500)")
+    parser.add_argument("--corpus", help="Directory of .txt transcripts to use instead")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--institution", choices=[p.key for p in list_parsers()],
+                        help="Benchmark only this institution's parser on the documents it fingerprints")
+    args = parser.parse_args()
+
+    if args.corpus:
+        docs = [p.read_text(encoding="utf-8", errors="replace") for p in sorted(Path(args.corpus).rglob("*.txt"))]
+    else:
+        rng = random.Random(args.seed)
+        docs = [_synthetic_doc(rng) for _ in range(args.docs)]
+    families = None
+    if args.institution:
+        institution = get_parser(args.institution)
+        docs = [doc for doc in docs if detect_institution(doc) is institution]
+        families = institution.row_families
+    lines = [line.strip() for doc in docs for line in doc.split("\n") if line.strip()]
+    if not lines:
+        sys.exit("Corpus is empty")
+
+    if families is not None:
+        classified = _rate(lambda line: classify_line(line, families), lines, args.repeat)
+        started = time.perf_counter()
+        for doc in docs:
+            extract_courses_from_text(doc, families)
+        full = len(lines) / (time.perf_counter() - started)
+        print(f"{args.institution}: {len(docs)} documents, {len(lines)} lines, row families {', '.join(families)}")
+        print(f"  classify_line:         {classified:>12,.0f} lines/s")
+        print(f"  extract_courses (full):{full:>12,.0f} lines/s")
+        return
+
+    mismatches = 0
+    for line in lines:
+        (kind_a, m_a), (kind_b, m_b) = classify_line(line), _reference_classify(line)
+        if kind_a != kind_b or (m_a and m_a.groupdict() != m_b.groupdict()):
+            mismatches += 1
+    if mismatches:
+        sys.exit(f"classify_line disagrees with the reference ladder on {mismatches} lines")
+
+    ladder = _rate(_reference_classify, lines, args.repeat)
+    classified = _rate(classify_line, lines, args.repeat)
+    started = time.perf_counter()
+    for doc in docs:
+        extract_courses_from_text(doc)
+    full = len(lines) / (time.perf_counter() - started)
+
+    print(f"{len(docs)} documents, {len(lines)} lines; classifications identical")
+    print(f"  pattern ladder:        {ladder:>12,.0f} lines/s")
+    print(f"  classify_line:         {classified:>12,.0f} lines/s  ({classified / ladder:.2f}x)")
+    print(f"  extract_courses (full):{full:>12,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
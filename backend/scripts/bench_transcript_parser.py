@@ -0,0 +1,183 @@
+"""
+Benchmark the transcript parser on a synthetic corpus and check for regressions.
+
+Builds a deterministic corpus with transcript_corpus.py (Ontario Tech and TMU
+styles, PDF + text), verifies every transcript parses to exactly its expected
+courses, then measures:
+  extract_text_from_pdf       pages/s and peak traced memory
+  extract_courses_from_text   lines/s and peak traced memory
+
+Throughput is compared to the saved baseline (bench_transcript_baseline.json).
+A fixed pure-Python calibration loop is timed too: on a machine slower than the
+baseline's, the throughput floors are lowered in proportion (never raised, as
+calibration is noisy on shared hosts). The run fails (exit 1) when a parse is
+wrong, throughput drops, or peak memory grows by more than --tolerance.
+
+Usage (from backend/):
+    python scripts/bench_transcript_parser.py
+    python scripts/bench_transcript_parser.py --docs 40 --terms 12 --courses 6
+    python scripts/bench_transcript_parser.py --save-baseline
+"""
+import argparse
+import atexit
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+# learned strategy preferences would make runs depend on earlier runs
+_STATS_DIR = tempfile.mkdtemp(prefix="bench-strategy-")
+atexit.register(shutil.rmtree, _STATS_DIR, True)
+os.environ["PDF_STRATEGY_STATS"] = os.path.join(_STATS_DIR, "stats.json")
+
+from app.services.course_extract_service import extract_courses_from_text
+from app.services.institution_parsers import detect_institution
+from app.services.pdf_text_service import extract_text_from_pdf
+from scripts.transcript_corpus import generate_corpus, render_pdf
+
+BASELINE_PATH = Path(__file__).resolve().parent / "bench_transcript_baseline.json"
+# Throughput metrics: higher is better; memory metrics: lower is better
+RATE_METRICS = ("pdf_pages_per_s", "course_lines_per_s")
+MEMORY_METRICS = ("pdf_peak_kb", "course_peak_kb")
+_CALIBRATION_RE = re.compile(r"([A-Z]{2,5})\s?(\d{3,4}[A-Z]?)")
+
+
+def _calibrate(rounds: int = 7) -> float:
+    """Operations/s of a fixed regex + dict workload (best of `rounds`), for scaling."""
+    lines = [f"CSCI {1000 + i}U UG Title {i} A 3.000 12.00" for i in range(2000)] * 50
+    best = 0.0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        seen = {}
+        for line in lines:
+            m = _CALIBRATION_RE.match(line)
+            seen[m.group(1) + m.group(2)] = len(line)
+        best = max(best, len(lines) / (time.perf_counter() - started))
+    return best
+
+
+def _course_key(course):
+    return (course.course_code, course.course_title, course.credits, course.grade, course.term)
+
+
+def _check(corpus, texts) -> int:
+    """Number of transcripts (from PDF text and from generated text) that parse wrong."""
+    wrong = 0
+    for transcript, pdf_text in zip(corpus, texts):
+        expected = [_course_key(c) for c in transcript.courses]
+        for source, text in (("pdf", pdf_text), ("text", transcript.text)):
+            institution = detect_institution(text)
+            courses, _ = extract_courses_from_text(text, institution.row_families if institution else None)
+            if [_course_key(c) for c in courses] != expected:
+                wrong += 1
+                print(f"  wrong parse: {transcript.name} ({source})", file=sys.stderr)
+    return wrong
+
+
+def _measure(fn, items, repeat: int):
+    """(best items/s over `repeat` runs, peak traced KB of one run)."""
+    best = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = max(best, len(items) / (time.perf_counter() - started))
+    tracemalloc.start()
+    for item in items:
+        fn(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024
+
+
+def run(docs: int, terms: int, courses: int, repeat: int, seed: int) -> dict:
+    corpus = generate_corpus(docs, terms=terms, courses_per_term=courses, seed=seed)
+    with tempfile.TemporaryDirectory(prefix="bench-corpus-") as tmp:
+        paths = []
+        for transcript in corpus:
+            path = Path(tmp) / f"{transcript.name}.pdf"
+            path.write_bytes(render_pdf(transcript.pages))
+            paths.append(str(path))
+
+        texts = [extract_text_from_pdf(p, parallel=False)[0] for p in paths]
+        wrong = _check(corpus, texts)
+
+        page_count = sum(len(t.pages) for t in corpus)
+        docs_per_s, pdf_peak = _measure(lambda p: extract_text_from_pdf(p, parallel=False), paths, repeat)
+
+    line_counts = [len(text.splitlines()) for text in texts]
+    lines_per_doc = sum(line_counts) / len(line_counts)
+    course_docs_per_s, course_peak = _measure(extract_courses_from_text, texts, repeat * 3)
+    return {
+        "corpus": {"docs": docs, "terms": terms, "courses_per_term": courses, "seed": seed, "pages": page_count},
+        "wrong_parses": wrong,
+        "calibration_ops_per_s": round(_calibrate()),
+        "pdf_pages_per_s": round(docs_per_s * page_count / docs, 1),
+        "pdf_peak_kb": round(pdf_peak, 1),
+        "course_lines_per_s": round(course_docs_per_s * lines_per_doc),
+        "course_peak_kb": round(course_peak, 1),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Regression messages (empty when within tolerance of the baseline)."""
+    if baseline.get("corpus") != result["corpus"]:
+        return [f"baseline was recorded for corpus {baseline.get('corpus')}; rerun with those options or --save-baseline"]
+    # only ever relax the floor: a calibration spike must not raise it
+    scale = min(1.0, result["calibration_ops_per_s"] / baseline["calibration_ops_per_s"])
+    problems = []
+    for metric in RATE_METRICS:
+        floor = baseline[metric] * scale * (1 - tolerance)
+        if result[metric] < floor:
+            problems.append(f"{metric} {result[metric]:,.0f} < {floor:,.0f} (baseline {baseline[metric]:,.0f} x machine {scale:.2f})")
+    for metric in MEMORY_METRICS:
+        ceiling = baseline[metric] * (1 + tolerance)
+        if result[metric] > ceiling:
+            problems.append(f"{metric} {result[metric]:,.1f} > {ceiling:,.1f} (baseline {baseline[metric]:,.1f})")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--terms", type=int, default=8)
+    parser.add_argument("--courses", type=int, default=5, help="Courses per term")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed fractional regression (default: 0.3)")
+    parser.add_argument("--save-baseline", action="store_true", help="Record this run as the new baseline")
+    args = parser.parse_args()
+
+    result = run(args.docs, args.terms, args.courses, args.repeat, args.seed)
+    print(json.dumps(result, indent=2))
+    if result["wrong_parses"]:
+        sys.exit(f"{result['wrong_parses']} transcripts parsed incorrectly")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+        print(f"Saved baseline to {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}; run with --save-baseline to record one")
+        return
+    problems = compare(result, json.loads(baseline_path.read_text(encoding="utf-8")), args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION: {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+    print("Within tolerance of baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Build the career x course affinity matrix used by planner ranking.
+Reads career profiles from backend/app/data/career_profiles.json and course text from
+the school catalog (run the catalog scraper first), then writes
+backend/app/data/career_affinity.npz.
+
+Usage (from backend/):
+    python scripts/build_career_affinity.py            # TMU catalog + planner courses
+    python scripts/build_career_affinity.py --school ontariotech
+"""
+import argparse
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.catalog_service import get_catalog_service
+from app.services.career_affinity_service import (
+    AFFINITY_PATH,
+    CareerAffinity,
+    build_affinity_matrix,
+    course_texts_from_catalog,
+    load_career_profiles,
+)
+from app.services.planner_service import COURSE_CATALOG
+from app.utils.course_codes import normalize_course_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--school", default="tmu", help="Catalog school key (default: tmu)")
+    parser.add_argument("--out", default=str(AFFINITY_PATH), help="Output .npz path")
+    args = parser.parse_args()
+
+    catalog = get_catalog_service(args.school)
+    codes = {normalize_course_id(c.get("code") or "") for c in catalog.get_all_courses()}
+    codes.discard("")
+    codes.update(COURSE_CATALOG.keys())
+    if not catalog.is_loaded():
+        print(f"Warning: {args.school} catalog not loaded; only seed courses will carry affinity.")
+
+    profiles = load_career_profiles()
+    matrix, careers, built_codes = build_affinity_matrix(profiles, course_texts_from_catalog(sorted(codes), args.school))
+    CareerAffinity(matrix, careers, built_codes, profiles).save(Path(args.out))
+
+    nonzero = int((matrix > 0).sum())
+    print(f"Saved {args.out}: {len(careers)} careers x {len(built_codes)} courses ({nonzero} non-zero affinities)")
+
+
+if __name__ == "__main__":
+    main()
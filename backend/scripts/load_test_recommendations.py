@@ -0,0 +1,169 @@
+"""
+Load test for /recommend/careers and /projects/recommend against the local LLM stub.
+
+Runs a closed-loop scenario: --concurrency clients each send requests back to
+back until --requests have been made, a --mix fraction of them career
+recommendations and the rest project recommendations. A --unique fraction of
+payloads are new; the rest repeat a small pool, as the frontend does on
+navigation, so the response cache and single-flight coalescing are exercised.
+The Gemini client's in-flight and waiting-for-slot counts are sampled throughout
+to show queueing. --mode picks the /recommend/careers mode (llm by default;
+auto falls back to the offline recommender, local skips Gemini).
+
+By default the app runs in process (httpx ASGI transport) with LLM_BACKEND=stub,
+so nothing needs to be started and no API key is needed. With --url it targets
+a running server instead (start it with LLM_BACKEND=stub or stub-http).
+
+Usage (from backend/):
+    python scripts/load_test_recommendations.py
+    python scripts/load_test_recommendations.py --concurrency 64 --requests 2000 --latency lognormal:1.2,0.6
+    python scripts/load_test_recommendations.py --error-rate 0.2 --unique 1
+    python scripts/load_test_recommendations.py --mode auto --latency lognormal:6,0.8
+    LLM_BACKEND=stub uvicorn main:app &  python scripts/load_test_recommendations.py --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+ENDPOINTS = {"careers": "/recommend/careers", "projects": "/projects/recommend"}
+SUBJECTS = ("Data Structures", "Operating Systems", "Linear Algebra", "Databases", "Networks", "Machine Learning",
+            "Software Design", "Statistics", "Computer Security", "Algorithms", "Discrete Math", "Graphics")
+CAREER_TITLES = ("Software Developer", "Data Analyst", "Machine Learning Engineer", "Cybersecurity Analyst")
+
+
+def _careers_payload(rng: random.Random) -> dict:
+    courses = []
+    for subject in rng.sample(SUBJECTS, 8):
+        strength, uniqueness = round(rng.random(), 2), round(rng.random(), 2)
+        courses.append({
+            "title": f"{subject} {rng.choice(('I', 'II'))}", "grade": rng.choice(("A", "B+", "A-")),
+            "strength": strength, "uniqueness": uniqueness, "importance": round(0.7 * strength + 0.3 * uniqueness, 3),
+        })
+    return {"courses": courses}
+
+
+def _projects_payload(rng: random.Random) -> dict:
+    return {"career_title": rng.choice(CAREER_TITLES), "career_description": f"Track {rng.randint(0, 10**6)}"}
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run(client: httpx.AsyncClient, args) -> dict:
+    rng = random.Random(args.seed)
+    pools = {
+        "careers": [_careers_payload(rng) for _ in range(args.pool)],
+        "projects": [_projects_payload(rng) for _ in range(args.pool)],
+    }
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    samples = []
+    remaining = [args.requests]
+
+    async def worker(worker_rng: random.Random):
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            kind = "careers" if worker_rng.random() < args.mix else "projects"
+            if worker_rng.random() < args.unique:
+                payload = _careers_payload(worker_rng) if kind == "careers" else _projects_payload(worker_rng)
+            else:
+                payload = worker_rng.choice(pools[kind])
+            started = time.perf_counter()
+            try:
+                params = {"mode": args.mode} if kind == "careers" else None
+                resp = await client.post(ENDPOINTS[kind], json=payload, params=params)
+                status = resp.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies[kind].append((time.perf_counter() - started) * 1000)
+            statuses[kind][str(status)] += 1
+
+    async def sampler():
+        while True:
+            stats = (await client.get("/recommend/llm/stats")).json()
+            samples.append((stats.get("in_flight", 0), stats.get("waiting_for_slot", 0)))
+            await asyncio.sleep(args.sample_interval)
+
+    sampling = asyncio.create_task(sampler())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(args.seed * 1000 + i)) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    sampling.cancel()
+
+    report = {
+        "scenario": {k: getattr(args, k) for k in ("requests", "concurrency", "mode", "mix", "unique", "pool", "latency", "error_rate")},
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(args.requests / elapsed, 1),
+        "endpoints": {},
+    }
+    for kind, values in latencies.items():
+        values.sort()
+        report["endpoints"][ENDPOINTS[kind]] = {
+            "requests": len(values),
+            "statuses": dict(statuses[kind]),
+            "p50_ms": round(_percentile(values, 0.50), 1),
+            "p90_ms": round(_percentile(values, 0.90), 1),
+            "p99_ms": round(_percentile(values, 0.99), 1),
+            "max_ms": round(values[-1], 1),
+        }
+    if samples:
+        report["queueing"] = {
+            "peak_in_flight": max(s[0] for s in samples),
+            "peak_waiting_for_slot": max(s[1] for s in samples),
+            "mean_waiting_for_slot": round(sum(s[1] for s in samples) / len(samples), 2),
+        }
+    report["llm"] = (await client.get("/recommend/llm/stats")).json()
+    report["cache"] = (await client.get("/recommend/cache/stats")).json()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mode", default="llm", choices=("llm", "auto", "local"), help="/recommend/careers mode")
+    parser.add_argument("--mix", type=float, default=0.7, help="Fraction of career (vs project) requests")
+    parser.add_argument("--unique", type=float, default=0.5, help="Fraction of requests with a new payload")
+    parser.add_argument("--pool", type=int, default=10, help="Repeated payloads per endpoint")
+    parser.add_argument("--latency", default="lognormal:0.8,0.4", help="Stub latency spec (in-process only)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub error rate (in-process only)")
+    parser.add_argument("--sample-interval", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=120)
+    else:
+        # must be set before the app builds its Gemini client
+        os.environ.setdefault("LLM_BACKEND", "stub")
+        os.environ["LLM_STUB_LATENCY"] = args.latency
+        os.environ["LLM_STUB_ERROR_RATE"] = str(args.error_rate)
+        import main as api
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://loadtest", timeout=120)
+
+    async def go():
+        async with client:
+            return await run(client, args)
+
+    print(json.dumps(asyncio.run(go()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Re-parse stored transcripts with the current parser (PARSER_VERSION).
+
+Stored results remember the parser version that produced them. This re-runs
+parse_transcript_pdf on the original upload (kept in uploads/) of
+every result stamped with an older version (or every result with --all),
+fanned out over a process pool, and saves the new results in place. Upload
+times are kept, so /transcripts/latest is unaffected. Results whose PDF is gone
+are reported and left as they are.
+
+The API does the same lazily, one transcript at a time, when an outdated result
+is read; this is for re-parsing everything up front after a parser change.
+
+Usage (from backend/):
+    python scripts/reparse_transcripts.py
+    python scripts/reparse_transcripts.py --all --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.pdf_text_service import disable_page_pool
+from app.services.transcript_dedup_service import get_transcript_index
+from app.services.transcript_result_service import get_records, save_result, sha256_file, upload_path
+from app.services.transcript_service import PARSER_VERSION, parse_transcript_pdf
+
+
+def _reparse(transcript_id: str, filename: str):
+    """Worker: parse the stored upload and hash it (hashing is cheap next to parsing)."""
+    pdf_path = upload_path(transcript_id)
+    return parse_transcript_pdf(pdf_path, filename), sha256_file(pdf_path)
+
+
+def _targets(reparse_all: bool):
+    """(transcript_id, filename) for stored results to re-parse, and IDs whose PDF is missing."""
+    records = get_records()
+    ids = sorted(records.ids() if reparse_all else records.outdated_ids(PARSER_VERSION))
+    filenames = records.filenames(ids)
+    targets, missing = [], []
+    for transcript_id in ids:
+        if os.path.exists(upload_path(transcript_id)):
+            targets.append((transcript_id, filenames.get(transcript_id) or f"{transcript_id}.pdf"))
+        else:
+            missing.append(transcript_id)
+    return targets, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--all", action="store_true", help="Re-parse every stored result, not only outdated ones")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parse processes (default: CPU count)")
+    args = parser.parse_args()
+
+    targets, missing = _targets(args.all)
+    for transcript_id in missing:
+        print(f"skip {transcript_id}: source PDF not found", file=sys.stderr)
+    if not targets:
+        print(f"Nothing to re-parse (parser version {PARSER_VERSION})", file=sys.stderr)
+        return
+
+    index = get_transcript_index()
+    started = time.perf_counter()
+    failed = 0
+    # --workers bounds the processes: workers extract their pages sequentially
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=disable_page_pool) as executor:
+        futures = {executor.submit(_reparse, tid, filename): tid for tid, filename in targets}
+        for done, future in enumerate(as_completed(futures), 1):
+            transcript_id = futures[future]
+            try:
+                result, sha256 = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(targets)}] {transcript_id} failed: {e}", file=sys.stderr)
+                continue
+            # results are written here, in one process, rather than by the workers
+            save_result(transcript_id, result, source_sha256=sha256, is_upload=False)
+            index.put(sha256, transcript_id, result.filename)
+            print(f"[{done}/{len(targets)}] {transcript_id}: {len(result.courses)} courses", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Re-parsed {len(targets) - failed}/{len(targets)} transcripts with parser version {PARSER_VERSION} "
+        f"in {elapsed:.1f}s ({failed} failed, {len(missing)} without source PDF)",
+        file=sys.stderr,
+    )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Synthetic transcript corpus: Ontario Tech and TMU style transcripts rendered as
+text and as PDF, with the courses each one should parse to.
+
+The PDF writer is pure Python (one Courier text object per page, no
+dependencies), so a corpus can be built anywhere the parser runs. Output is
+deterministic for a given seed, which makes it usable for benchmarks
+(bench_transcript_parser.py) and parser regression tests instead of a real
+transcript in uploads/.
+
+Usage (from backend/):
+    python scripts/transcript_corpus.py corpus/ --count 20
+    python scripts/transcript_corpus.py corpus/ --school tmu --terms 8 --courses 6
+writes <name>.pdf, <name>.txt and <name>.json (expected courses) per transcript.
+"""
+import argparse
+import json
+import random
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+SCHOOLS = ("ontariotech", "tmu")
+SEASONS = ("Fall", "Winter")
+LINES_PER_PAGE = 60
+
+OT_SUBJECTS = ("CSCI", "MATH", "PHY", "BIOL", "ENGR", "SOFE", "STAT", "COMM")
+TMU_SUBJECTS = ("CPS", "MTH", "PCS", "BLG", "CMN", "ECN", "PSY", "ENG")
+# No words course_extract strips as row trailers (Quality, Points, GPA, Earned, ...)
+TITLES = (
+    "Intro to Computer Science", "Calculus", "Discrete Mathematics for Computer Science",
+    "Programming Workshop", "Data Structures", "Linear Algebra", "Operating Systems",
+    "Software Engineering and Testing Methods", "Computer Organization",
+    "Probability and Statistics", "Physics for Engineers", "Technical Communication",
+    "Database Systems", "Computer Networks", "Algorithms and Complexity",
+)
+GRADES = ("A+", "A", "A-", "B+", "B", "B-", "C+", "C", "D", "F", "PAS", "CR", "WD")
+GRADE_POINTS = {"A+": 4.3, "A": 4.0, "A-": 3.7, "B+": 3.3, "B": 3.0, "B-": 2.7, "C+": 2.3, "C": 2.0, "D": 1.0}
+PROGRAMS = ("Computer Science", "Software Engineering", "Mathematics", "Biology", "Business Technology Management")
+
+
+@dataclass
+class SyntheticCourse:
+    course_code: str
+    course_title: str
+    credits: Optional[float]
+    grade: Optional[str]
+    term: str
+
+
+@dataclass
+class SyntheticTranscript:
+    name: str
+    school: str
+    program: str
+    pages: List[List[str]]
+    courses: List[SyntheticCourse] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(line for page in self.pages for line in page)
+
+    def expected(self) -> dict:
+        return {"school": self.school, "program": self.program, "courses": [asdict(c) for c in self.courses]}
+
+
+def _terms(start_year: int, count: int) -> List[str]:
+    return [f"{SEASONS[i % 2]} {start_year + (i + 1) // 2}" for i in range(count)]
+
+
+def _header(school: str, program: str, rng: random.Random) -> List[str]:
+    if school == "ontariotech":
+        return [
+            "Ontario Tech University",
+            "Unofficial Transcript",
+            f"Student Number: 100{rng.randint(100000, 999999)}",
+            f"Major: {program}",
+            "Course Description Grade Credits Quality Points",
+        ]
+    return [
+        "Toronto Metropolitan University",
+        "Academic Record - Unofficial",
+        f"Student ID: 50{rng.randint(1000000, 9999999)}",
+        f"Program: {program}",
+        "Course Title Units Grade",
+    ]
+
+
+def generate_transcript(
+    school: str = "ontariotech",
+    terms: int = 8,
+    courses_per_term: int = 5,
+    seed: int = 0,
+    name: Optional[str] = None,
+) -> SyntheticTranscript:
+    """
+    One transcript of `terms` Fall/Winter terms with `courses_per_term` courses
+    each. The last term is in progress (no grades; TMU rows also lack units).
+    """
+    if school not in SCHOOLS:
+        raise ValueError(f"Unknown school {school!r}; expected one of {SCHOOLS}")
+    rng = random.Random(f"{school}:{terms}:{courses_per_term}:{seed}")
+    program = rng.choice(PROGRAMS)
+    lines = _header(school, program, rng)
+    courses: List[SyntheticCourse] = []
+    used_codes = set()
+
+    for t, term in enumerate(_terms(rng.randint(2015, 2022), terms)):
+        in_progress = t == terms - 1
+        lines.append(f"Term: {term}")
+        attempted = 0.0
+        for _ in range(courses_per_term):
+            while True:
+                if school == "ontariotech":
+                    subj, num = rng.choice(OT_SUBJECTS), f"{rng.randint(1000, 4999)}U"
+                else:
+                    subj, num = rng.choice(TMU_SUBJECTS), f"{rng.randint(100, 999)}"
+                if (subj, num) not in used_codes:
+                    used_codes.add((subj, num))
+                    break
+            title = f"{rng.choice(TITLES)} {rng.choice(('I', 'II', 'III'))}"
+            grade = None if in_progress else rng.choice(GRADES)
+            if school == "ontariotech":
+                credits = 3.0
+                if grade is None:
+                    lines.append(f"{subj} {num} UG {title} {credits:.3f}")
+                else:
+                    points = GRADE_POINTS.get(grade, 0.0) * credits
+                    lines.append(f"{subj} {num} UG {title} {grade} {credits:.3f} {points:.2f}")
+            else:
+                credits = None if grade is None else 1.0
+                if grade is None:
+                    lines.append(f"{subj} {num} - {title}")
+                else:
+                    lines.append(f"{subj} {num} - {title} {credits:.2f} {grade}")
+            attempted += credits or 0.0
+            courses.append(SyntheticCourse(f"{subj}{num}", title, credits, grade, term))
+        lines.append(f"Term Totals Attempted {attempted:.3f} Earned {attempted:.3f}")
+
+    lines.append(f"Cumulative GPA {rng.uniform(2.0, 4.0):.2f}")
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+    return SyntheticTranscript(name or f"{school}-{terms}x{courses_per_term}-{seed}", school, program, pages, courses)
+
+
+def generate_corpus(
+    count: int, schools=SCHOOLS, terms: int = 8, courses_per_term: int = 5, seed: int = 0
+) -> List[SyntheticTranscript]:
+    """`count` transcripts alternating between the given schools."""
+    return [
+        generate_transcript(schools[i % len(schools)], terms, courses_per_term, seed=seed + i)
+        for i in range(count)
+    ]
+
+
+def _pdf_string(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return f"({escaped.encode('latin-1', 'replace').decode('latin-1')})"
+
+
+def render_pdf(pages: List[List[str]]) -> bytes:
+    """A minimal valid PDF: one US Letter page per list of lines, 9pt Courier."""
+    objects = {1: "<< /Type /Catalog /Pages 2 0 R >>", 3: "<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>"}
+    kids = []
+    n = 4
+    for lines in pages:
+        content = "BT /F1 9 Tf 11 TL 40 770 Td " + " ".join(f"{_pdf_string(line)} Tj T*" for line in lines) + " ET"
+        objects[n] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {n + 1} 0 R "
+            "/Resources << /Font << /F1 3 0 R >> >> >>"
+        )
+        objects[n + 1] = f"<< /Length {len(content.encode('latin-1'))} >>\nstream\n{content}\nendstream"
+        kids.append(f"{n} 0 R")
+        n += 2
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += f"{number} 0 obj\n{objects[number]}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {n}\n0000000000 65535 f \n".encode()
+    for number in range(1, n):
+        out += f"{offsets[number]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {n} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def write_transcript(transcript: SyntheticTranscript, out_dir: Path) -> Path:
+    """Write <name>.pdf, .txt and .json (expected parse); returns the PDF path."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pdf_path = out_dir / f"{transcript.name}.pdf"
+    pdf_path.write_bytes(render_pdf(transcript.pages))
+    (out_dir / f"{transcript.name}.txt").write_text(transcript.text, encoding="utf-8")
+    (out_dir / f"{transcript.name}.json").write_text(json.dumps(transcript.expected(), indent=2), encoding="utf-8")
+    return pdf_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("out_dir")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--school", choices=(*SCHOOLS, "both"), default="both")
+    parser.add_argument("--terms", type=int, default=8)
+    parser.add_argument("--courses", type=int, default=5, help="Courses per term")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    schools = SCHOOLS if args.school == "both" else (args.school,)
+    for transcript in generate_corpus(args.count, schools, args.terms, args.courses, args.seed):
+        write_transcript(transcript, Path(args.out_dir))
+    print(f"Wrote {args.count} transcripts to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
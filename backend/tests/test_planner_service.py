@@ -0,0 +1,306 @@
+"""
+Tests for planner_service (plan generation, caching, repair).
+Run from backend/: python -m pytest tests/test_planner_service.py -v
+Or: python -m unittest tests.test_planner_service -v
+"""
+import sys
+from pathlib import Path
+from unittest import TestCase, main as unittest_main, mock
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import asyncio
+import json
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.models.plan_schemas import PlanRequest, Semester, PlanSessionRequest, PlanDeltaRequest, PlanDelta
+from app.services import planner_service
+from app.services.plan_cache_service import PlanCache, plan_cache_key
+from app.services.plan_validator import PlanValidator
+from app.services import plan_batch_service
+from app.services.plan_batch_service import generate_plans_ndjson
+from app.services.career_affinity_service import CareerAffinity, affinity_version, build_affinity_matrix, load_career_profiles
+
+
+# ---------- Plan result cache ----------
+class TestPlanCache(TestCase):
+    def setUp(self):
+        self.cache = planner_service.get_plan_cache()
+        self.cache.invalidate()
+
+    def test_key_is_canonical(self):
+        a = PlanRequest(completed_courses=["CPS209", "CPS109", "CPS109"], target_career="", max_courses_per_term=0)
+        b = PlanRequest(completed_courses=["CPS109", "CPS209"], target_career=None, max_courses_per_term=1)
+        self.assertEqual(plan_cache_key(a, "v1"), plan_cache_key(b, "v1"))
+        self.assertNotEqual(plan_cache_key(a, "v1"), plan_cache_key(a, "v2"))
+        c = PlanRequest(completed_courses=["CPS109"], target_career="ai")
+        d = PlanRequest(completed_courses=["CPS109"], target_career="data")
+        self.assertNotEqual(plan_cache_key(c, "v1"), plan_cache_key(d, "v1"))
+
+    def test_hit_returns_identical_fresh_plan(self):
+        req = PlanRequest(completed_courses=["CPS109"], target_career="ai", max_courses_per_term=2)
+        first = planner_service.generate_plan(req)
+        misses = self.cache.misses
+        first.semesters[0].courses.append("MUTATED")
+
+        second = planner_service.generate_plan(req)
+        self.assertEqual(self.cache.misses, misses)
+        self.assertNotIn("MUTATED", second.semesters[0].courses)
+        self.assertEqual(second, planner_service._solve_plan(req))
+
+    def test_reload_invalidates(self):
+        req = PlanRequest(completed_courses=[], max_courses_per_term=3)
+        planner_service.generate_plan(req)
+        original = dict(planner_service.COURSE_CATALOG)
+        old_version = planner_service.get_catalog_version()
+        try:
+            catalog = dict(original)
+            catalog["CPS999"] = {"prereqs": [], "offered": {"Fall"}}
+            new_version = planner_service.reload_course_catalog(catalog)
+            self.assertNotEqual(new_version, old_version)
+            self.assertEqual(self.cache.stats()["size"], 0)
+            self.assertIn("CPS999", planner_service.generate_plan(req).semesters[0].courses)
+        finally:
+            planner_service.reload_course_catalog(original)
+        self.assertEqual(planner_service.get_catalog_version(), old_version)
+
+    def test_lru_eviction(self):
+        cache = PlanCache(max_entries=2)
+        resp = planner_service._solve_plan(PlanRequest())
+        for key in ("a", "b", "c"):
+            cache.put(key, resp)
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual(cache.evictions, 1)
+
+
+# ---------- Career affinity ranking ----------
+class TestCareerAffinity(TestCase):
+    def setUp(self):
+        self.profiles = load_career_profiles()
+        texts = {
+            "CPS109": "Introduction to Computer Science programming in Python",
+            "CPS530": "Web Systems Development client server web applications",
+            "CPS633": "Computer Security cryptography network attacks",
+            "CPS803": "Machine Learning neural networks and probability",
+            "CPS510": "Database Systems",
+        }
+        matrix, careers, codes = build_affinity_matrix(self.profiles, texts)
+        self.affinity = CareerAffinity(matrix, careers, codes, self.profiles)
+
+    def test_matrix_shape(self):
+        self.assertEqual(self.affinity.matrix.shape, (len(self.profiles), 5))
+
+    def test_resolve_free_text(self):
+        resolve = self.affinity.resolve_career
+        self.assertEqual(resolve("AI"), "ai")
+        self.assertEqual(resolve("  Machine Learning Engineer "), "ai")
+        self.assertEqual(resolve("data engineer"), "data")
+        self.assertEqual(resolve("cyber security analyst"), "security")
+        self.assertEqual(resolve("machne lerning"), "ai")
+        self.assertIsNone(resolve("plumber"))
+        self.assertIsNone(resolve(""))
+
+    def test_non_tech_careers_resolve_to_nothing(self):
+        resolve = self.affinity.resolve_career
+        for target in ("painter", "trainer", "retail", "hairdresser", "civil engineer", "mechanical engineer", "dentist", "nurse"):
+            with self.subTest(target=target):
+                self.assertIsNone(resolve(target))
+        # typo fallback still works on whole names
+        self.assertEqual(resolve("cybersecurty"), "security")
+        self.assertEqual(resolve("sofware engineer"), "software")
+        plan = planner_service._solve_plan(PlanRequest(completed_courses=[], target_career="painter"))
+        self.assertTrue(any("No career profile matched" in note for note in plan.notes))
+
+    def test_rank_uses_text_and_seeds(self):
+        courses = ["CPS109", "CPS530", "CPS633", "CPS803", "XYZ999"]
+        self.assertEqual(self.affinity.rank(courses, "security")[0], "CPS633")
+        self.assertEqual(self.affinity.rank(courses, "web")[0], "CPS530")
+        # seed courses (CPS633 for ai) outrank text-only matches; unknown courses go last by code
+        ranked = self.affinity.rank(courses, "ai")
+        self.assertEqual(ranked[:2], ["CPS633", "CPS803"])
+        self.assertEqual(ranked[-1], "XYZ999")
+
+    def test_seeds_keep_profile_order_whatever_their_text(self):
+        # CPS633's text matches ai far better than CPS510's, but CPS510 is listed first
+        texts = {"CPS510": "Database Systems", "CPS633": "Machine learning neural networks deep learning", "CPS803": "Machine Learning"}
+        matrix, careers, codes = build_affinity_matrix(self.profiles, texts)
+        affinity = CareerAffinity(matrix, careers, codes, self.profiles)
+        self.assertEqual(affinity.rank(["CPS803", "CPS633", "CPS510"], "ai"), ["CPS510", "CPS633", "CPS803"])
+
+    def test_resolution_memo_is_bounded(self):
+        with mock.patch("app.services.career_affinity_service.RESOLVE_CACHE_SIZE", 4):
+            affinity = CareerAffinity(self.affinity.matrix, self.affinity.careers, self.affinity.codes, self.profiles)
+        for i in range(20):
+            affinity.resolve_career(f"career {i}")
+        self.assertEqual(affinity.resolve_career("AI"), "ai")
+        self.assertEqual(affinity._resolve.cache_info().currsize, 4)
+
+    def test_plan_version_follows_affinity_data(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            profiles, matrix = Path(tmp) / "profiles.json", Path(tmp) / "affinity.npz"
+            profiles.write_text('{"careers": []}')
+            before = affinity_version((profiles, matrix))
+            self.assertEqual(affinity_version((profiles, matrix)), before)
+            profiles.write_text('{"careers": [{"key": "ai"}]}')
+            after = affinity_version((profiles, matrix))
+            matrix.write_bytes(b"npz")
+            self.assertEqual(len({before, after, affinity_version((profiles, matrix))}), 3)
+        before = planner_service.plan_version()
+        req = PlanRequest(completed_courses=[], target_career="AI")
+        with mock.patch.object(planner_service, "get_plan_cache", return_value=PlanCache(max_entries=8)) as cache:
+            planner_service.generate_plan(req)
+            with mock.patch.object(planner_service, "affinity_version", return_value="other"):
+                # checked per lookup: no catalog reload needed for new affinity data
+                self.assertNotEqual(planner_service.plan_version(), before)
+                self.assertEqual(planner_service.get_catalog_version(), before.split("-")[0])
+                planner_service.generate_plan(req)
+            self.assertEqual(cache.return_value.stats()["misses"], 2)
+
+    def test_planner_ranking_keeps_seed_order(self):
+        ranked = planner_service._rank_courses_for_career(list(planner_service.COURSE_CATALOG), "AI")
+        self.assertEqual(ranked[:2], ["CPS510", "CPS633"])
+        self.assertEqual(planner_service._rank_courses_for_career(["CPS209", "CPS109"], "plumber"), ["CPS109", "CPS209"])
+
+
+# ---------- Incremental validator ----------
+class TestPlanValidator(TestCase):
+    def _fresh(self, v):
+        return PlanValidator(v.semesters, v.completed, v.max_per_term)
+
+    def test_matches_full_pass_after_random_edits(self):
+        rng = random.Random(7)
+        codes = list(planner_service.COURSE_CATALOG) + ["ABC100"]
+        for _ in range(200):
+            plan = [Semester(term=t, courses=rng.sample(codes, rng.randint(0, 4))) for t in ("Fall", "Winter", "Fall")]
+            v = PlanValidator(plan, rng.sample(codes, rng.randint(0, 2)), max_per_term=3)
+            for _ in range(10):
+                op = rng.choice(["move", "add", "pop", "replace"])
+                t = rng.randrange(3)
+                courses = v.semesters[t].courses
+                if op == "add":
+                    v.add(rng.choice(codes), t, rng.choice([None, 0, 1]))
+                elif not courses:
+                    continue
+                elif op == "move":
+                    v.move(rng.choice(courses), t, rng.randrange(3), rng.choice([None, 0]))
+                elif op == "pop":
+                    v.pop(t)
+                else:
+                    v.replace(rng.choice(courses), rng.choice(codes), t)
+                self.assertEqual(v.result(), self._fresh(v).result())
+
+    def test_messages(self):
+        plan = [Semester(term="Fall", courses=["CPS305", "CPS510"]), Semester(term="Winter", courses=["CPS209"])]
+        v = PlanValidator(plan, ["CPS109"], max_per_term=1)
+        self.assertEqual(v.issues(), [
+            "Fall: too many courses (max 1).",
+            "CPS305 missing prereqs when scheduled: ['CPS209']",
+            "CPS510 is not offered in Fall.",
+            "CPS510 missing prereqs when scheduled: ['CPS305']",
+        ])
+        v.move("CPS305", 0, 1)
+        v.move("CPS510", 0, 1)
+        v.move("CPS209", 1, 0)
+        self.assertEqual(v.issues(), [
+            "Winter: too many courses (max 1).",
+            "CPS510 missing prereqs when scheduled: ['CPS305']",
+        ])
+        self.assertEqual(v.term_counts(), [1, 2])
+        # the caller's plan is untouched
+        self.assertEqual(plan[0].courses, ["CPS305", "CPS510"])
+
+
+# ---------- Interactive sessions ----------
+class TestPlanSession(TestCase):
+    def test_deltas(self):
+        opened = planner_service.open_plan_session(PlanSessionRequest(
+            current_plan=[Semester(term="Fall", courses=["CPS209"]), Semester(term="Winter", courses=["CPS109"])],
+            locked_courses=["CPS109"],
+        ))
+        self.assertFalse(opened.valid)
+
+        resp = planner_service.apply_plan_deltas(opened.session_id, PlanDeltaRequest(deltas=[
+            PlanDelta(op="move", course="CPS109", to_term=0),
+            PlanDelta(op="move", course="CPS209", to_term=1),
+        ]))
+        self.assertEqual(resp.notes, ["Move blocked: CPS109 is locked."])
+        self.assertFalse(resp.valid)
+
+        resp = planner_service.apply_plan_deltas(opened.session_id, PlanDeltaRequest(deltas=[
+            PlanDelta(op="remove", course="CPS209"),
+            PlanDelta(op="add", course="ABC100", to_term=0),
+        ]))
+        self.assertEqual(resp.notes, [])
+        self.assertEqual(resp.version, 2)
+        self.assertTrue(resp.valid)
+        self.assertEqual(planner_service.get_plan_session(opened.session_id)[0].courses, ["ABC100"])
+
+        self.assertTrue(planner_service.close_plan_session(opened.session_id))
+        self.assertIsNone(planner_service.apply_plan_deltas(opened.session_id, PlanDeltaRequest()))
+
+
+# ---------- Cohort batch ----------
+class TestPlanBatch(TestCase):
+    def _run(self, requests):
+        async def collect():
+            return [json.loads(line) async for line in generate_plans_ndjson(requests)]
+        return asyncio.run(collect())
+
+    def test_batch_matches_single_plans(self):
+        planner_service.get_plan_cache().invalidate()
+        requests = [
+            PlanRequest(completed_courses=["CPS109"], target_career="ai"),
+            PlanRequest(completed_courses=["CPS109"], target_career="software"),
+            PlanRequest(completed_courses=["CPS109", "CPS109"], target_career="ai"),
+            PlanRequest(completed_courses=[], max_courses_per_term=2),
+        ]
+        lines = self._run(requests)
+        summary = lines[-1]
+        self.assertEqual(summary["type"], "summary")
+        self.assertEqual(summary["groups"], 2)
+        self.assertEqual(summary["distinct_solves"], 3)
+
+        results = {line["index"]: line["plan"] for line in lines if line["type"] == "result"}
+        self.assertEqual(sorted(results), [0, 1, 2, 3])
+        for i, req in enumerate(requests):
+            self.assertEqual(results[i], planner_service._solve_plan(req).model_dump(mode="json"))
+
+        again = self._run(requests)
+        self.assertEqual(again[-1]["cache_hits"], 4)
+
+    def test_worker_catalog_install_keeps_the_shared_cache(self):
+        original = dict(planner_service.COURSE_CATALOG)
+        cache = planner_service.get_plan_cache()
+        before = cache.stats()["invalidations"]
+        try:
+            plan_batch_service._init_worker({**original, "ZZZ999": {"prereqs": [], "offered": ["Fall"]}})
+            self.assertIn("ZZZ999", planner_service.COURSE_CATALOG)
+            self.assertEqual(cache.stats()["invalidations"], before)
+        finally:
+            planner_service.reload_course_catalog(original, invalidate=False)
+
+    def test_broken_pool_is_replaced_and_the_group_retried(self):
+        class _Broken:
+            def submit(self, *args, **kwargs):
+                raise BrokenProcessPool("a worker died")
+
+        planner_service.get_plan_cache().invalidate()
+        broken = _Broken()
+        with ThreadPoolExecutor(1) as fresh, \
+                mock.patch.object(plan_batch_service, "BATCH_POOL_MIN_GROUPS", 1), \
+                mock.patch.object(plan_batch_service, "BATCH_WORKERS", 1), \
+                mock.patch.object(plan_batch_service, "_get_pool", side_effect=[broken, fresh]), \
+                mock.patch.object(plan_batch_service, "_discard_pool") as discard:
+            lines = self._run([PlanRequest(completed_courses=["CPS109"], target_career="ai")])
+        discard.assert_called_once_with(broken)
+        self.assertEqual([line["type"] for line in lines], ["result", "summary"])
+
+
+if __name__ == "__main__":
+    unittest_main(verbosity=2)
@@ -0,0 +1,443 @@
+"""
+Tests for career/project recommendations (Gemini response cache, client, local stub and offline recommender).
+Run from backend/: python -m pytest tests/test_recommendation_service.py -v
+Or: python -m unittest tests.test_recommendation_service -v
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import TestCase, main as unittest_main, mock
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.controllers import recommend_controller
+from app.services import gemini_client, gemini_service
+from app.services.gemini_client import CircuitBreaker, CircuitOpenError, GeminiClientManager, LLMNotConfigured, LLMTimeout
+from app.services.local_recommender_service import LocalCareerRecommender
+from app.services.llm_stub import StubGenAIClient, StubUpstreamError, parse_latency
+from app.services.llm_cache_service import LLMResponseCache, SQLiteLLMCacheBackend, llm_cache_key
+
+
+def _course(title, importance, grade="A"):
+    return {"title": title, "grade": grade, "strength": 0.9, "uniqueness": 0.5, "importance": importance}
+
+
+# ---------- Gemini response cache ----------
+class TestLLMResponseCache(TestCase):
+    def test_key_depends_on_payload_model_and_prompt_version(self):
+        key = llm_cache_key("careers", {"a": 1, "b": [1, 2]}, "m1", "1")
+        self.assertEqual(key, llm_cache_key("careers", {"b": [1, 2], "a": 1}, "m1", "1"))
+        self.assertNotEqual(key, llm_cache_key("careers", {"a": 1, "b": [1, 2]}, "m2", "1"))
+        self.assertNotEqual(key, llm_cache_key("careers", {"a": 1, "b": [1, 2]}, "m1", "2"))
+        self.assertNotEqual(key, llm_cache_key("projects", {"a": 1, "b": [1, 2]}, "m1", "1"))
+        self.assertNotEqual(key, llm_cache_key("careers", {"a": 1, "b": [1, 2]}, "m1", "1", backend="stub"))
+
+    def test_ttl_and_lru_eviction(self):
+        cache = LLMResponseCache(max_entries=2, ttl=60)
+        for k in ("a", "b"):
+            cache.put(k, {"k": k})
+        cache.get("a")
+        cache.put("c", {"k": "c"})  # evicts b, the least recently used
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"k": "a"})
+        with mock.patch("app.services.llm_cache_service.time.time", return_value=time.time() + 61):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual((cache.stats()["evictions"], cache.stats()["expirations"]), (1, 1))
+
+    def test_hits_are_copies(self):
+        cache = LLMResponseCache()
+        cache.put("k", {"careers": [{"title": "x"}]})
+        cache.get("k")["careers"].clear()
+        self.assertEqual(cache.get("k"), {"careers": [{"title": "x"}]})
+
+    def test_concurrent_identical_requests_share_one_upstream_call(self):
+        cache = LLMResponseCache()
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"careers": ["x"]}
+
+        async def run():
+            return await asyncio.gather(*(cache.get_or_compute("k", upstream) for _ in range(8)))
+
+        self.assertEqual(asyncio.run(run()), [{"careers": ["x"]}] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()["coalesced"], 7)
+
+    def test_failures_reach_waiters_and_are_not_cached(self):
+        cache = LLMResponseCache()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        async def run():
+            return await asyncio.gather(*(cache.get_or_compute("k", failing) for _ in range(3)), return_exceptions=True)
+
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in asyncio.run(run())))
+        self.assertEqual(asyncio.run(cache.get_or_compute("k", mock.AsyncMock(return_value={"ok": True}))), {"ok": True})
+
+    def test_a_cancelled_caller_does_not_cancel_the_shared_call(self):
+        cache = LLMResponseCache()
+
+        async def upstream():
+            await asyncio.sleep(0.05)
+            return {"v": 1}
+
+        async def run():
+            first = asyncio.ensure_future(cache.get_or_compute("k", upstream))
+            second = asyncio.ensure_future(cache.get_or_compute("k", upstream))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(run()), {"v": 1})
+        self.assertEqual(cache.get("k"), {"v": 1})
+
+    def test_sqlite_backend_survives_a_new_process(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "cache.db"
+            LLMResponseCache(backend=SQLiteLLMCacheBackend(path)).put("k", {"v": 1})
+            fresh = LLMResponseCache(backend=SQLiteLLMCacheBackend(path))
+            self.assertEqual(fresh.get("k"), {"v": 1})
+            self.assertEqual(fresh.stats()["backend_hits"], 1)
+
+    def test_backend_io_runs_off_the_event_loop(self):
+        threads = []
+
+        class RecordingBackend:
+            def __init__(self):
+                self.rows = {}
+
+            def get(self, key):
+                threads.append(threading.get_ident())
+                return self.rows.get(key)
+
+            def set(self, key, value, expires_at):
+                threads.append(threading.get_ident())
+                self.rows[key] = (expires_at, value)
+
+        backend = RecordingBackend()
+
+        async def run(cache):
+            loop_thread = threading.get_ident()
+            results = await asyncio.gather(*(cache.get_or_compute("k", mock.AsyncMock(return_value={"v": 1})) for _ in range(4)))
+            return loop_thread, results
+
+        loop_thread, results = asyncio.run(run(LLMResponseCache(backend=backend)))
+        self.assertEqual(results, [{"v": 1}] * 4)
+        # one read and one write for the whole flight, neither on the loop thread
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(loop_thread, threads)
+        fresh = LLMResponseCache(backend=backend)
+        self.assertEqual(asyncio.run(fresh.get_or_compute("k", mock.AsyncMock(side_effect=AssertionError))), {"v": 1})
+        self.assertEqual(fresh.stats()["backend_hits"], 1)
+
+    def test_recommend_careers_reuses_response_for_same_ranked_payload(self):
+        courses = [_course(f"Course {i}", importance=i / 20) for i in range(20)]
+        with mock.patch.object(gemini_service, "get_llm_cache", return_value=LLMResponseCache()), \
+                mock.patch.object(gemini_service, "_generate_json", mock.AsyncMock(return_value={"careers": []})) as generate:
+            asyncio.run(gemini_service.recommend_3_careers(courses))
+            # same top 12 in another order, plus a low-importance course that isn't sent
+            asyncio.run(gemini_service.recommend_3_careers(list(reversed(courses)) + [_course("Elective", 0.0)]))
+            self.assertEqual(generate.call_count, 1)
+            asyncio.run(gemini_service.recommend_3_careers(courses[:-1]))
+            self.assertEqual(generate.call_count, 2)
+
+
+# ---------- Gemini client (concurrency, retries, deadline, circuit breaker) ----------
+class _Upstream:
+    """Stands in for genai.Client: answers or raises per scripted outcome."""
+
+    def __init__(self, outcomes=(), delay=0.0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self.aio = self
+        self.models = self
+
+    async def generate_content(self, model, contents):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return mock.Mock(text=f'{{"model": "{model}"}}')
+        finally:
+            self.active -= 1
+
+
+class _StatusError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class TestGeminiClient(TestCase):
+    def _manager(self, upstream, **kwargs):
+        kwargs.setdefault("backoff_base", 0.001)
+        return GeminiClientManager(lambda: upstream, **kwargs)
+
+    def test_transient_errors_are_retried(self):
+        upstream = _Upstream([_StatusError(503), _StatusError(429)])
+        manager = self._manager(upstream, max_retries=2)
+        self.assertEqual(asyncio.run(manager.generate("m", "p")), '{"model": "m"}')
+        self.assertEqual((upstream.calls, manager.stats()["retries"]), (3, 2))
+
+    def test_client_errors_are_not_retried(self):
+        upstream = _Upstream([_StatusError(400)])
+        manager = self._manager(upstream, max_retries=2)
+        with self.assertRaises(_StatusError):
+            asyncio.run(manager.generate("m", "p"))
+        self.assertEqual(upstream.calls, 1)
+        self.assertEqual(manager.breaker.state, "closed")
+
+    def test_deadline_covers_the_whole_call(self):
+        manager = self._manager(_Upstream(delay=1.0), timeout=0.05, max_retries=5)
+        started = time.monotonic()
+        with self.assertRaises(LLMTimeout):
+            asyncio.run(manager.generate("m", "p"))
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_semaphore_caps_in_flight_requests(self):
+        upstream = _Upstream(delay=0.02)
+        manager = self._manager(upstream, max_concurrency=2)
+
+        async def run():
+            await asyncio.gather(*(manager.generate("m", str(i)) for i in range(6)))
+
+        asyncio.run(run())
+        self.assertEqual((upstream.calls, upstream.peak), (6, 2))
+
+    def test_circuit_opens_fails_fast_and_recovers_after_probe(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+        upstream = _Upstream([_StatusError(503), _StatusError(503)])
+        manager = self._manager(upstream, max_retries=0, breaker=breaker)
+        for _ in range(2):
+            with self.assertRaises(_StatusError):
+                asyncio.run(manager.generate("m", "p"))
+        with self.assertRaises(CircuitOpenError) as ctx:
+            asyncio.run(manager.generate("m", "p"))
+        self.assertEqual(upstream.calls, 2)
+        self.assertGreater(ctx.exception.retry_after, 0)
+
+        now[0] = 31.0
+        self.assertEqual(breaker.state, "half_open")
+        asyncio.run(manager.generate("m", "p"))
+        self.assertEqual(breaker.state, "closed")
+
+    def test_queueing_timeouts_do_not_trip_the_breaker(self):
+        upstream = _Upstream(delay=0.05)
+        manager = self._manager(upstream, max_concurrency=1, timeout=0.12, breaker=CircuitBreaker(failure_threshold=1))
+
+        async def run():
+            return await asyncio.gather(*(manager.generate("m", str(i)) for i in range(8)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertTrue(any(isinstance(r, LLMTimeout) for r in results))
+        self.assertEqual(manager.stats()["slot_timeouts"], sum(isinstance(r, LLMTimeout) for r in results))
+        self.assertEqual((manager.breaker.state, manager.breaker.failures), ("closed", 0))
+
+    def test_retries_of_one_call_count_as_one_failure(self):
+        upstream = _Upstream([_StatusError(503)] * 3)
+        manager = self._manager(upstream, max_retries=2, breaker=CircuitBreaker(failure_threshold=2))
+        with self.assertRaises(_StatusError):
+            asyncio.run(manager.generate("m", "p"))
+        self.assertEqual((upstream.calls, manager.breaker.failures, manager.breaker.state), (3, 1, "closed"))
+
+
+# ---------- Local LLM stub (load tests) ----------
+class TestLLMStub(TestCase):
+    def _recommend(self, coro_fn, *args):
+        manager = GeminiClientManager(lambda: StubGenAIClient(seed=1), backend="stub")
+        with mock.patch.object(gemini_service, "get_gemini_client", return_value=manager), \
+                mock.patch.object(gemini_service, "get_llm_cache", return_value=LLMResponseCache()):
+            return asyncio.run(coro_fn(*args))
+
+    def test_careers_answer_is_schema_valid_and_cites_courses(self):
+        courses = [_course("Databases", 0.9), _course("Statistics", 0.8)]
+        careers = self._recommend(gemini_service.recommend_3_careers, courses)["careers"]
+        self.assertEqual(len(careers), 3)
+        for career in careers:
+            self.assertEqual(set(career), {"title", "description", "why_recommended", "confidence"})
+            self.assertTrue(any("Databases" in why for why in career["why_recommended"]))
+        self.assertEqual(careers, self._recommend(gemini_service.recommend_3_careers, courses)["careers"])
+
+    def test_stub_answers_are_not_served_to_gemini(self):
+        cache = LLMResponseCache()
+        stub = GeminiClientManager(lambda: StubGenAIClient(seed=1), backend="stub")
+        upstream = _Upstream()
+        real = GeminiClientManager(lambda: upstream)
+        for manager in (stub, real):
+            with mock.patch.object(gemini_service, "get_gemini_client", return_value=manager), \
+                    mock.patch.object(gemini_service, "get_llm_cache", return_value=cache):
+                answer = asyncio.run(gemini_service.recommend_3_projects("Data Analyst", "x"))
+        # the stub's cached projects don't answer the real backend's request
+        self.assertEqual((answer, upstream.calls), ({"model": gemini_service._model()}, 1))
+
+    def test_projects_answer_names_the_career(self):
+        projects = self._recommend(gemini_service.recommend_3_projects, "Data Analyst", "x")["projects"]
+        self.assertEqual([p["difficulty"] for p in projects], ["Beginner", "Intermediate", "Advanced"])
+        self.assertTrue(all("Data Analyst" in p["name"] for p in projects))
+
+    def test_latency_specs(self):
+        rng = random.Random(0)
+        self.assertEqual(parse_latency("fixed:0.25")(rng), 0.25)
+        self.assertTrue(all(0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2 for _ in range(50)))
+        self.assertGreater(parse_latency("lognormal:0.5,0.3")(rng), 0)
+        with self.assertRaises(ValueError):
+            parse_latency("normal:1")
+
+    def test_injected_errors_go_through_retries(self):
+        stub = StubGenAIClient(error_rate=1.0, error_codes=[503], seed=1)
+        manager = GeminiClientManager(lambda: stub, max_retries=2, backoff_base=0.001)
+        with self.assertRaises(StubUpstreamError):
+            asyncio.run(manager.generate("m", "p"))
+        self.assertEqual((stub.calls, manager.stats()["retries"]), (3, 2))
+
+    def test_llm_backend_env_selects_the_stub(self):
+        with mock.patch.dict(os.environ, {"LLM_BACKEND": "stub", "LLM_STUB_LATENCY": "fixed:0"}), \
+                mock.patch.object(gemini_client, "_gemini_client", None):
+            manager = gemini_client.get_gemini_client()
+            self.assertEqual(manager.stats()["backend"], "stub")
+            self.assertIn('"careers"', asyncio.run(manager.generate("m", "Input:\n{}")))
+
+
+# ---------- Offline career recommender (fast path / fallback) ----------
+PROFILES = [
+    {"key": "data", "title": "Data Scientist", "description": "d", "keywords": ["data", "statistics", "database"],
+     "seed_courses": ["CPS510"]},
+    {"key": "security", "title": "Cybersecurity Analyst", "description": "s", "keywords": ["security", "cryptography", "network"]},
+    {"key": "games", "title": "Game Developer", "description": "g", "keywords": ["graphics", "game", "animation"]},
+    {"key": "web", "title": "Web Developer", "description": "w", "keywords": ["web", "internet", "database"]},
+]
+
+
+class TestLocalRecommender(TestCase):
+    def setUp(self):
+        self.recommender = LocalCareerRecommender(PROFILES)
+        self.courses = [
+            _course("Computer Security", 0.9) | {"catalog_description": "Cryptography and network attacks."},
+            _course("Applied Statistics", 0.6),
+            _course("Computer Graphics", 0.2, grade="C"),
+            _course("English Literature", 0.95),
+        ]
+
+    def test_ranks_careers_by_importance_weighted_affinity(self):
+        careers = self.recommender.recommend(self.courses)["careers"]
+        self.assertEqual([c["title"] for c in careers], ["Cybersecurity Analyst", "Data Scientist", "Game Developer"])
+        self.assertEqual(careers[0]["evidence_courses"], ["Computer Security"])
+        self.assertIn("cryptography", careers[0]["why_recommended"][0])
+        self.assertGreater(careers[0]["confidence"], careers[2]["confidence"])
+        for career in careers:
+            self.assertEqual(set(career), {"title", "description", "why_recommended", "confidence", "evidence_courses"})
+            self.assertTrue(0 < career["confidence"] < 1)
+        self.assertEqual(self.recommender.recommend(list(reversed(self.courses))), {"careers": careers})
+
+    def test_seed_courses_count_by_catalog_code(self):
+        careers = self.recommender.recommend([_course("Database Systems I", 0.8) | {"catalog_code": "CPS 510"}])["careers"]
+        self.assertEqual(careers[0]["title"], "Data Scientist")
+        self.assertIn("core course", careers[0]["why_recommended"][0])
+
+    def test_no_matching_courses_still_answers(self):
+        careers = self.recommender.recommend([_course("English Literature", 0.9)])["careers"]
+        self.assertEqual([c["confidence"] for c in careers], [0.0, 0.0, 0.0])
+        self.assertEqual([c["title"] for c in careers], ["Data Scientist", "Cybersecurity Analyst", "Game Developer"])
+
+    def test_recommends_sixty_courses_in_milliseconds(self):
+        started = time.perf_counter()
+        self.recommender.recommend(self.courses * 15)
+        self.assertLess(time.perf_counter() - started, 0.05)
+
+
+class TestRecommendModes(TestCase):
+    def setUp(self):
+        self.req = recommend_controller.RecommendRequest(courses=[_course("Computer Security", 0.9)])
+        patcher = mock.patch.object(recommend_controller, "get_local_recommender", return_value=LocalCareerRecommender(PROFILES))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _recommend(self, llm, mode):
+        with mock.patch.object(recommend_controller, "recommend_3_careers", llm):
+            return asyncio.run(recommend_controller.recommend(self.req, mode=mode))
+
+    def test_auto_falls_back_when_the_circuit_is_open(self):
+        result = self._recommend(mock.AsyncMock(side_effect=CircuitOpenError(30)), "auto")
+        self.assertEqual(result["source"], "local")
+        self.assertIn("circuit open", result["fallback_reason"])
+        self.assertEqual(result["careers"][0]["title"], "Cybersecurity Analyst")
+
+    def test_auto_falls_back_when_the_llm_is_slow(self):
+        async def slow(courses):
+            await asyncio.sleep(1)
+
+        with mock.patch.object(recommend_controller, "LLM_FALLBACK_SECONDS", 0.02):
+            started = time.monotonic()
+            result = self._recommend(slow, "auto")
+        self.assertEqual(result["source"], "local")
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_auto_and_llm_return_the_llm_answer(self):
+        for mode in ("auto", "llm"):
+            result = self._recommend(mock.AsyncMock(return_value={"careers": ["x"]}), mode)
+            self.assertEqual(result, {"careers": ["x"], "source": "llm"})
+
+    def test_missing_api_key_falls_back_quietly(self):
+        manager = GeminiClientManager(gemini_client._build_client)
+        with mock.patch.dict(os.environ, {"GEMINI_API_KEY": ""}), \
+                mock.patch.object(gemini_client, "GEMINI_AVAILABLE", True), \
+                mock.patch.object(gemini_service, "get_gemini_client", return_value=manager), \
+                mock.patch.object(gemini_service, "get_llm_cache", return_value=LLMResponseCache()), \
+                mock.patch.object(recommend_controller.logger, "warning") as warning:
+            with self.assertRaises(LLMNotConfigured):
+                asyncio.run(manager.generate("m", "prompt"))
+            result = asyncio.run(recommend_controller.recommend(self.req, mode="auto"))
+        self.assertEqual(result["source"], "local")
+        self.assertIn("GEMINI_API_KEY", result["fallback_reason"])
+        warning.assert_not_called()
+        self.assertEqual(manager.breaker.failures, 0)
+
+    def test_unexpected_errors_are_logged_once(self):
+        with mock.patch.object(recommend_controller, "_logged_fallback_errors", set()), \
+                mock.patch.object(recommend_controller.logger, "warning") as warning:
+            for _ in range(3):
+                result = self._recommend(mock.AsyncMock(side_effect=KeyError("careers")), "auto")
+                self.assertEqual(result["source"], "local")
+        self.assertEqual(warning.call_count, 1)
+
+    def test_llm_mode_does_not_fall_back(self):
+        with self.assertRaises(recommend_controller.HTTPException) as ctx:
+            self._recommend(mock.AsyncMock(side_effect=CircuitOpenError(30)), "llm")
+        self.assertEqual(ctx.exception.status_code, 503)
+
+    def test_stream_sends_local_then_llm_answer(self):
+        async def collect(llm):
+            with mock.patch.object(recommend_controller, "recommend_3_careers", llm):
+                response = await recommend_controller.recommend(self.req, mode="stream")
+                return [json.loads(line) async for line in response.body_iterator]
+
+        lines = asyncio.run(collect(mock.AsyncMock(return_value={"careers": ["x"]})))
+        self.assertEqual([line["source"] for line in lines], ["local", "llm"])
+        self.assertEqual(lines[1]["careers"], ["x"])
+        lines = asyncio.run(collect(mock.AsyncMock(side_effect=LLMTimeout("slow"))))
+        self.assertEqual((lines[1]["status"], lines[1]["error"]), (504, "slow"))
+
+
+if __name__ == "__main__":
+    unittest_main()
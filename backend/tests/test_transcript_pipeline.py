@@ -0,0 +1,824 @@
+"""
+Tests for the transcript upload/parse pipeline (worker pool, storage, extraction).
+Run from backend/: python -m pytest tests/test_transcript_pipeline.py -v
+Or: python -m unittest tests.test_transcript_pipeline -v
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import zipfile
+import tempfile
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from unittest import TestCase, main as unittest_main, mock
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services import transcript_parse_pool
+from app.services.transcript_parse_pool import TranscriptParsePool, ParsePoolSaturated
+from app.services import pdf_text_service
+from app.services.pdf_text_service import _extract_page, _page_ranges, _table_rows_from_words
+from app.services.course_extract_service import (
+    COURSE_ROW_INPROGRESS_PATTERN,
+    COURSE_ROW_PATTERN,
+    TMU_ROW_MINIMAL_PATTERN,
+    TMU_ROW_PATTERN,
+    classify_line,
+    extract_courses_from_text,
+)
+from app.services.institution_parsers import detect_institution
+from app.services import catalog_service
+from app.services.transcript_service import _enrich_courses, _extract_rows
+from app.models.transcript_schemas import ExtractedCourse
+from app.services.pdf_strategy_service import StrategyStats, detect_school
+from app.services.transcript_batch_service import parse_transcripts_ndjson
+from app.services.transcript_dedup_service import TranscriptHashIndex
+from app.services.transcript_record_store import TranscriptRecordStore
+from app.services.transcript_retention_service import GRACE_SECONDS, RetentionManager
+from app.services import transcript_storage as storage
+from app.services import transcript_codec
+from app.utils.body_limit import BodySizeLimit
+from app.utils.tracing import Histograms, Trace, annotate, record_page, span
+from scripts.transcript_corpus import generate_transcript, render_pdf
+from app.services.transcript_job_store import InMemoryJobStore, SQLiteJobStore, TranscriptJob
+
+
+# ---------- Parse worker pool ----------
+def _die_once(marker: str) -> int:
+    """Pool job that kills its worker the first time it runs."""
+    if not os.path.exists(marker):
+        Path(marker).touch()
+        os._exit(1)
+    return 42
+
+
+def _slow_parse_job(saved_path, original_filename, enrich_with_catalog, timeout, progress_queue=None, job_id=None):
+    """Stand-in for _parse_job: takes most of its time limit."""
+    time.sleep(timeout * 0.6)
+    return {"filename": original_filename, "extracted_text_chars": 0, "courses": []}
+
+
+class TestTranscriptParsePool(TestCase):
+    def test_rejects_when_saturated_and_releases(self):
+        pool = TranscriptParsePool(workers=0, max_pending=1, timeout=5)
+        gate = threading.Event()
+        first = pool.submit(gate.wait, 5)
+
+        with self.assertRaises(ParsePoolSaturated) as ctx:
+            pool.submit(gate.wait, 5)
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        self.assertEqual(pool.stats()["rejected"], 1)
+
+        gate.set()
+        first.result(timeout=5)
+        self.assertEqual(pool.pending(), 0)
+        self.assertTrue(pool.submit(lambda: 42).result(timeout=5) == 42)
+
+    def test_failed_job_releases_slot(self):
+        pool = TranscriptParsePool(workers=0, max_pending=1, timeout=5)
+        fut = pool.submit(lambda: 1 / 0)
+        with self.assertRaises(ZeroDivisionError):
+            fut.result(timeout=5)
+        self.assertEqual(pool.pending(), 0)
+
+    def test_time_queued_behind_other_jobs_is_not_a_timeout(self):
+        pool = TranscriptParsePool(workers=1, max_pending=4, timeout=1)
+        self.addCleanup(pool.shutdown)
+        pool.warm()
+
+        async def run():
+            return await asyncio.gather(*(pool.parse("x.pdf", f"t{i}.pdf") for i in range(3)))
+
+        # the third job waits ~1.2s for the single worker, longer than its 1s limit
+        with mock.patch.object(transcript_parse_pool, "_parse_job", _slow_parse_job), \
+                mock.patch.object(transcript_parse_pool, "TIMEOUT_GRACE", 0):
+            results = asyncio.run(run())
+        self.assertEqual([r.filename for r in results], ["t0.pdf", "t1.pdf", "t2.pdf"])
+        self.assertEqual(pool.stats()["timed_out"], 0)
+
+    def test_dead_worker_is_replaced_and_job_retried(self):
+        pool = TranscriptParsePool(workers=1, max_pending=2, timeout=30)
+        self.addCleanup(pool.shutdown)
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(pool.submit(_die_once, str(Path(tmp) / "died")).result(timeout=60), 42)
+        self.assertEqual((pool.stats()["restarts"], pool.pending()), (1, 0))
+        self.assertEqual(pool.submit(abs, -3).result(timeout=60), 3)
+
+
+# ---------- Async job store ----------
+class TestTranscriptJobStore(TestCase):
+    def _exercise(self, store):
+        store.create(TranscriptJob(job_id="j1", transcript_id="t1", filename="a.pdf"))
+        store.record("j1", "started", status="running")
+        store.record("j1", "text_extraction")
+        store.record("j1", "failed", status="failed", error="boom")
+        store.record("missing", "started")  # unknown jobs are ignored
+
+        job = store.get("j1")
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.stage, "failed")
+        self.assertEqual(job.error, "boom")
+        self.assertEqual([e["stage"] for e in job.events], ["started", "text_extraction", "failed"])
+        self.assertTrue(job.is_final())
+        self.assertIsNone(store.get("missing"))
+
+    def test_memory_store(self):
+        self._exercise(InMemoryJobStore())
+
+    def test_sqlite_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self._exercise(SQLiteJobStore(Path(tmp) / "jobs.db"))
+
+    def test_sqlite_store_prunes_old_finished_jobs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteJobStore(Path(tmp) / "jobs.db")
+            for job_id in ("old-done", "old-running", "new-done"):
+                store.create(TranscriptJob(job_id=job_id, transcript_id="t", filename="a.pdf"))
+            store.record("old-done", "done", status="done")
+            store.record("old-running", "started", status="running")
+            time.sleep(0.01)
+            cutoff = time.time()
+            time.sleep(0.01)
+            store.record("new-done", "done", status="done")
+
+            self.assertEqual(store.prune(cutoff), 1)
+            self.assertIsNone(store.get("old-done"))
+            self.assertIsNotNone(store.get("old-running"))
+            self.assertIsNotNone(store.get("new-done"))
+
+    def test_memory_store_evicts_oldest(self):
+        store = InMemoryJobStore(max_jobs=2)
+        for i in range(3):
+            store.create(TranscriptJob(job_id=f"j{i}", transcript_id=f"t{i}", filename="a.pdf"))
+        self.assertIsNone(store.get("j0"))
+        self.assertIsNotNone(store.get("j2"))
+
+    def test_reparse_job_map_drops_finished_jobs_when_full(self):
+        from app.controllers import transcript_controller as tc
+        store = InMemoryJobStore()
+        for i in range(3):
+            store.create(TranscriptJob(job_id=f"j{i}", transcript_id=f"t{i}", filename="a.pdf"))
+        store.record("j0", "done", status="done")
+        with mock.patch.object(tc, "get_job_store", return_value=store), mock.patch.object(tc, "MAX_REPARSE_JOBS", 2), \
+                mock.patch.object(tc, "_reparse_jobs", tc.OrderedDict()):
+            for i in range(3):
+                tc._remember_reparse(f"t{i}", f"j{i}")
+            self.assertEqual(list(tc._reparse_jobs), ["t1", "t2"])
+
+    def test_failed_reparse_is_not_requeued_until_backoff_expires(self):
+        from app.controllers import transcript_controller as tc
+        store = InMemoryJobStore()
+        store.create(TranscriptJob(job_id="j0", transcript_id="t0", filename="a.pdf"))
+        store.record("j0", "failed", status="failed", error="boom")
+        run_sync = mock.Mock(return_value=TranscriptJob(job_id="j1", transcript_id="t0", filename="a.pdf"))
+        stale = {"transcript_id": "t0", "parser_version": "0", "source_sha256": "ab"}
+        with tempfile.NamedTemporaryFile() as pdf, \
+                mock.patch.object(tc, "upload_path", return_value=pdf.name), \
+                mock.patch.object(tc, "get_job_store", return_value=store), \
+                mock.patch.object(tc, "_reparse_jobs", tc.OrderedDict(t0="j0")), \
+                mock.patch.object(tc.from_thread, "run_sync", run_sync):
+            self.assertEqual(tc._with_lazy_reparse(stale)["reparse_job_id"], "j0")
+            run_sync.assert_not_called()
+            with mock.patch.object(tc, "REPARSE_RETRY_SECONDS", 0):
+                self.assertEqual(tc._with_lazy_reparse(stale)["reparse_job_id"], "j1")
+            run_sync.assert_called_once()
+
+
+# ---------- Upload dedup index ----------
+class TestTranscriptHashIndex(TestCase):
+    SHA = "ab" * 32
+
+    def test_lookup_put_discard(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = TranscriptHashIndex(Path(tmp), parser_version="1")
+            self.assertIsNone(index.lookup(self.SHA))
+            index.put(self.SHA, "t1", "a.pdf")
+            self.assertEqual(index.lookup(self.SHA), "t1")
+            self.assertEqual((index.hits, index.misses), (1, 1))
+            index.discard(self.SHA)
+            self.assertIsNone(index.lookup(self.SHA))
+
+    def test_parser_version_bump_misses(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            TranscriptHashIndex(Path(tmp), parser_version="1").put(self.SHA, "t1")
+            self.assertIsNone(TranscriptHashIndex(Path(tmp), parser_version="2").lookup(self.SHA))
+
+    def test_rejects_non_digest_keys(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(ValueError):
+                TranscriptHashIndex(Path(tmp)).put("../escape", "t1")
+
+
+# ---------- Page-parallel extraction ----------
+class TestPageRanges(TestCase):
+    def test_ranges_cover_pages_in_order(self):
+        for pages, parts in [(1, 4), (7, 3), (8, 4), (10, 1), (3, 8)]:
+            ranges = _page_ranges(pages, parts)
+            self.assertLessEqual(len(ranges), min(parts, pages))
+            flat = [p for start, stop in ranges for p in range(start, stop)]
+            self.assertEqual(flat, list(range(pages)))
+            sizes = [stop - start for start, stop in ranges]
+            self.assertLessEqual(max(sizes) - min(sizes), 1)
+
+    def test_parse_pool_workers_do_not_start_page_pools(self):
+        # pool workers are not daemonic, so the flag (set by their initializer) is what stops nesting
+        with mock.patch.object(pdf_text_service, "PDF_PARALLEL_WORKERS", 4), \
+                mock.patch.object(pdf_text_service, "_page_pool_disabled", False), \
+                mock.patch.object(pdf_text_service, "ProcessPoolExecutor") as executor, \
+                mock.patch("app.services.catalog_service.get_catalog_service"):
+            transcript_parse_pool._warm_worker()
+            self.assertIsNone(pdf_text_service._get_page_executor())
+            executor.assert_not_called()
+
+    def test_broken_page_pool_is_replaced(self):
+        broken, fresh = mock.Mock(), mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool("page worker died")
+        with mock.patch.object(pdf_text_service, "PDF_PARALLEL_WORKERS", 2), \
+                mock.patch.object(pdf_text_service, "_page_pool_disabled", False), \
+                mock.patch.object(pdf_text_service, "_page_executor", broken), \
+                mock.patch.object(pdf_text_service, "ProcessPoolExecutor", return_value=fresh):
+            warnings = []
+            self.assertIsNone(pdf_text_service._extract_pages_parallel("x.pdf", 4, None, warnings))
+            self.assertEqual(len(warnings), 1)
+            broken.shutdown.assert_called_once()
+            self.assertIs(pdf_text_service._get_page_executor(), fresh)
+
+
+# ---------- Adaptive extraction strategy ----------
+class _FakePage:
+    """Stands in for a pdfplumber page with fixed raw/layout text."""
+    def __init__(self, raw, layout):
+        self.raw, self.layout, self.calls = raw, layout, []
+
+    def extract_text(self, layout=False):
+        self.calls.append("layout" if layout else "raw")
+        return self.layout if layout else self.raw
+
+    def extract_words(self, **kwargs):
+        self.calls.append("extract_words")
+        return []
+
+
+ROWS = "\n".join(f"CSCI 10{i}0U UG Course Title {i} A 3.000 12.00" for i in range(4))
+
+
+class TestAdaptiveExtraction(TestCase):
+    def test_clean_text_layer_uses_raw_only(self):
+        page = _FakePage(raw=ROWS, layout=ROWS)
+        text, strategy, _ = _extract_page(page)
+        self.assertEqual((text, strategy, page.calls), (ROWS, "raw", ["raw"]))
+
+    def test_interleaved_columns_fall_back_to_layout(self):
+        jumbled = "Transcript " + " ".join(f"CSCI 10{i}0U" for i in range(4)) + "\n" + "UG Course Title A 3.000 " * 4
+        page = _FakePage(raw=jumbled, layout=ROWS)
+        text, strategy, _ = _extract_page(page)
+        self.assertEqual((text, strategy, page.calls), (ROWS, "layout", ["raw", "extract_words", "layout"]))
+
+    def test_preferred_strategy_goes_first(self):
+        page = _FakePage(raw=ROWS, layout=ROWS)
+        _, strategy, _ = _extract_page(page, preferred="layout")
+        self.assertEqual((strategy, page.calls), ("layout", ["layout"]))
+
+    def test_stats_learn_preference_and_persist(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "stats.json"
+            stats = StrategyStats(path)
+            self.assertIsNone(stats.preferred("tmu:x"))
+            for _ in range(3):
+                stats.record("tmu:x", "layout", rows=10, ms=5.0)
+            self.assertEqual(stats.preferred("tmu:x"), "layout")
+            stats.flush()
+            stats.flush()  # nothing new: counts must not double
+            self.assertEqual(StrategyStats(path).snapshot()["tmu:x"]["layout"]["pages"], 3)
+
+    def test_detect_school(self):
+        self.assertEqual(detect_school("Ontario Tech University"), "ontariotech")
+        self.assertEqual(detect_school("Toronto Metropolitan University"), "tmu")
+        self.assertEqual(detect_school("Somewhere Else"), "unknown")
+
+
+# ---------- Column table reconstruction ----------
+def _words(top, *cells):
+    """pdfplumber-like word dicts for (x0, text) cells, 6pt per character."""
+    words = []
+    for x0, text in cells:
+        for token in text.split(" "):
+            words.append({"text": token, "x0": x0, "x1": x0 + 6 * len(token), "top": top})
+            x0 += 6 * (len(token) + 1)
+    return words
+
+
+class TestColumnTable(TestCase):
+    def test_cells_follow_columns(self):
+        words = (
+            _words(100, (40, "CSCI 1030U"), (120, "UG"), (150, "Intro to Computer Science"), (330, "A+"), (370, "3.000"), (420, "12.90"))
+            + _words(114, (40, "MATH 4020U"), (120, "UG"), (150, "Computational Science II"), (370, "3.000"))
+        )
+        self.assertEqual(_table_rows_from_words(words), [
+            ["CSCI 1030U", "UG", "Intro to Computer Science", "A+", "3.000", "12.90"],
+            ["MATH 4020U", "UG", "Computational Science II", "3.000"],
+        ])
+
+    def test_tab_rows_parse_as_fields(self):
+        text = "Term: Fall 2022\nCSCI 1030U\tUG\tIntro to Computer Science\tA+\t3.000\t12.90\nCPS 109\tComputer Science I\t1.00\tB+\nMTH 110 UG\tCalculus\t3.000"
+        courses, _ = extract_courses_from_text(text)
+        self.assertEqual(
+            [(c.course_code, c.course_title, c.grade, c.credits, c.term) for c in courses],
+            [
+                ("CSCI1030U", "Intro to Computer Science", "A+", 3.0, "Fall 2022"),
+                ("CPS109", "Computer Science I", "B+", 1.0, "Fall 2022"),
+                ("MTH110", "Calculus", None, 3.0, "Fall 2022"),
+            ],
+        )
+
+
+# ---------- Line classifier ----------
+class TestClassifyLine(TestCase):
+    LINES = [
+        "CSCI 1030U UG Intro to Computer Science A+ 3.000 12.90",
+        "MATH 4020U UG Computational Science II 3.000",
+        "csci 2050u ug lower case title b 3.000",
+        "ABC 123 UG 3.0",  # no title: only the TMU pattern matches
+        "CPS 109 - Computer Science I 1.00 B+",
+        "CPS109 3.0 A",
+        "MTH 110",
+        "MTH 110 – Discrete Mathematics",
+        "MTH 110: " + "x" * 130,
+        "CPS 1090 Title 1.0",
+        "Term: Fall 2022",
+        "Term Totals 15.000 15.000",
+        "Cumulative GPA 3.42",
+        "UG",
+        "",
+    ]
+
+    @staticmethod
+    def _ladder(line):
+        for kind, pattern in (("row", COURSE_ROW_PATTERN), ("inprogress", COURSE_ROW_INPROGRESS_PATTERN), ("tmu", TMU_ROW_PATTERN)):
+            if pattern.match(line):
+                return kind
+        return "tmu_minimal" if TMU_ROW_MINIMAL_PATTERN.match(line) and len(line) < 120 else None
+
+    def test_matches_full_pattern_ladder(self):
+        for line in self.LINES:
+            with self.subTest(line=line):
+                self.assertEqual(classify_line(line)[0], self._ladder(line))
+
+
+# ---------- Institution parser registry ----------
+class TestInstitutionParsers(TestCase):
+    def test_detects_from_first_page(self):
+        self.assertEqual(detect_institution("Ontario Tech University\nUnofficial Transcript").key, "ontariotech")
+        self.assertEqual(detect_institution("Ryerson University\nGrade Report").key, "tmu")
+        self.assertIsNone(detect_institution("Some College"))
+        # only the head of the document is fingerprinted
+        self.assertIsNone(detect_institution("x" * 5000 + "Ontario Tech University"))
+
+    def test_institution_limits_row_patterns(self):
+        text = "Term: Fall 2022\nCSCI 1030U UG Intro to Computer Science A+ 3.000 12.90\nCPS 109 - Computer Science I 1.00 B+"
+        ot = detect_institution("Ontario Tech University").row_families
+        tmu = detect_institution("Toronto Metropolitan University").row_families
+        self.assertEqual([c.course_code for c in extract_courses_from_text(text)[0]], ["CSCI1030U", "CPS109"])
+        self.assertEqual([c.course_code for c in extract_courses_from_text(text, ot)[0]], ["CSCI1030U"])
+        self.assertEqual([c.course_code for c in extract_courses_from_text(text, tmu)[0]], ["CPS109"])
+
+    def test_acronym_must_be_a_capitalised_word(self):
+        self.assertEqual(detect_institution("TMU Grade Report").key, "tmu")
+        self.assertEqual(detect_institution("toronto metropolitan university").key, "tmu")
+        self.assertIsNone(detect_institution("Outmuscle Community College\nattn: tmu office"))
+
+    def test_falls_back_to_every_family_when_detected_one_finds_no_rows(self):
+        text = "Transfer credit: TMU\nTerm: Fall 2022\nCSCI 1030U UG Intro to Computer Science A+ 3.000 12.90"
+        institution, courses, _ = _extract_rows(text)
+        self.assertEqual(institution.key, "tmu")
+        self.assertEqual([c.course_code for c in courses], ["CSCI1030U"])
+
+
+# ---------- Upload size limit ----------
+class TestBodySizeLimit(TestCase):
+    def _post(self, body, headers=None):
+        import httpx
+        from fastapi import FastAPI, UploadFile
+
+        app = FastAPI()
+        app.add_middleware(BodySizeLimit, limits={"/upload": (1000, "too big")})
+        received = []
+
+        @app.post("/upload")
+        async def upload(file: UploadFile):
+            received.append(len(await file.read()))
+            return {"ok": True}
+
+        async def go():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/upload", content=body, headers=headers)
+
+        return asyncio.run(go()), received
+
+    @staticmethod
+    def _multipart(size):
+        return (b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"t.pdf\"\r\n\r\n"
+                + b"x" * size + b"\r\n--b--\r\n")
+
+    def test_chunked_body_is_cut_off_once_over_the_limit(self):
+        sent = []
+
+        async def chunks():
+            body = self._multipart(5000)
+            for i in range(0, len(body), 200):
+                sent.append(i)
+                yield body[i:i + 200]
+
+        resp, received = self._post(chunks(), {"content-type": "multipart/form-data; boundary=b"})
+        self.assertEqual((resp.status_code, resp.json()["detail"], received), (413, "too big", []))
+        self.assertLess(len(sent), 10)
+
+    def test_declared_length_and_small_bodies(self):
+        headers = {"content-type": "multipart/form-data; boundary=b"}
+        self.assertEqual(self._post(self._multipart(5000), headers)[0].status_code, 413)
+        resp, received = self._post(self._multipart(500), headers)
+        self.assertEqual((resp.status_code, received), (200, [500]))
+
+
+# ---------- Stage timings ----------
+class TestTracing(TestCase):
+    def test_spans_add_up_only_inside_active_trace(self):
+        with span("ignored"):
+            pass
+        trace = Trace()
+        with trace.activate():
+            for _ in range(2):
+                with span("row_parsing"):
+                    pass
+            record_page(12.5, "raw")
+            annotate("institution", "tmu")
+        with span("after"):
+            pass
+        timings = trace.to_dict()
+        self.assertEqual(list(timings["stages"]), ["row_parsing"])
+        self.assertEqual(timings["pages"], [{"ms": 12.5, "strategy": "raw"}])
+        self.assertEqual(timings["institution"], "tmu")
+        self.assertGreaterEqual(timings["total_ms"], timings["stages"]["row_parsing"])
+
+    def test_histograms_bucket_stages_and_pages(self):
+        histograms = Histograms(buckets=(10, 100))
+        histograms.observe_timings({"total_ms": 150, "stages": {"row_parsing": 5}, "pages": [{"ms": 50, "strategy": "layout"}]})
+        histograms.observe_timings({"total_ms": 80, "stages": {"row_parsing": 10}, "pages": []})
+        snapshot = histograms.snapshot()["histograms"]
+        self.assertEqual(snapshot["total"]["buckets"], {"10": 0, "100": 1, "+Inf": 2})
+        self.assertEqual(snapshot["row_parsing"]["buckets"], {"10": 2, "100": 2, "+Inf": 2})
+        self.assertEqual((snapshot["page.layout"]["count"], snapshot["total"]["max_ms"]), (1, 150))
+        self.assertIn('transcript_parse_stage_ms_bucket{stage="total",le="+Inf"} 2', histograms.prometheus())
+
+
+# ---------- Synthetic corpus round trip ----------
+class TestSyntheticTranscripts(TestCase):
+    def test_pdf_and_text_parse_to_expected_courses(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            stats = StrategyStats(Path(tmp) / "stats.json")
+            for school in ("ontariotech", "tmu"):
+                transcript = generate_transcript(school, terms=12, courses_per_term=6, seed=7)
+                self.assertGreater(len(transcript.pages), 1)
+                pdf_path = Path(tmp) / f"{transcript.name}.pdf"
+                pdf_path.write_bytes(render_pdf(transcript.pages))
+                with mock.patch.object(pdf_text_service, "get_strategy_stats", return_value=stats):
+                    pdf_text, _ = pdf_text_service.extract_text_from_pdf(str(pdf_path), parallel=False)
+                expected = [(c.course_code, c.course_title, c.credits, c.grade, c.term) for c in transcript.courses]
+                for source, text in (("pdf", pdf_text), ("text", transcript.text)):
+                    with self.subTest(school=school, source=source):
+                        self.assertEqual(detect_institution(text).key, school)
+                        courses, _ = extract_courses_from_text(text)
+                        self.assertEqual([(c.course_code, c.course_title, c.credits, c.grade, c.term) for c in courses], expected)
+
+
+# ---------- Catalog enrichment ----------
+class TestCatalogEnrichment(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        path = Path(self._tmp.name) / "catalog.json"
+        path.write_text(json.dumps({
+            "courses": [
+                {"id": "c1", "code": "CSCI 1030U", "title": "Intro to Computer Science", "url": "https://example.com/c1"},
+                {"id": "c2", "code": "MATH 1010U", "title": "Calculus I"},
+                {"id": "c3", "code": "ENVSC1010U", "title": "Environmental Science I", "url": "https://example.com/c3"},
+            ],
+            "indexes": {"by_code": {"CSCI 1030U": "c1", "MATH 1010U": "c2", "ENVSC1010U": "c3"}},
+        }))
+        with mock.patch.object(catalog_service, "ONTARIOTECH_PATH", path):
+            self.catalog = catalog_service.CatalogService("ontariotech")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_normalized_codes_resolve_in_one_lookup(self):
+        found = self.catalog.get_many_by_code(["CSCI1030U", "csci 1030u", "MATH1010U", "PHY1010U"])
+        self.assertEqual(sorted(found), ["CSCI1030U", "MATH1010U"])
+        self.assertEqual(self.catalog.get_by_code("CSCI1030U")["id"], "c1")
+
+    def test_backfills_titles_and_flags(self):
+        courses = [
+            ExtractedCourse(course_code="CSCI1030U", course_title=None, confidence=0.9),
+            ExtractedCourse(course_code="MATH1010U", course_title="Calc I", confidence=0.9),
+            ExtractedCourse(course_code="PHY1010U", course_title=None, confidence=0.9),
+        ]
+        _enrich_courses(courses, self.catalog)
+        self.assertEqual(courses[0].course_title, "Intro to Computer Science")
+        self.assertEqual(courses[0].flags, ["catalog_url:https://example.com/c1"])
+        self.assertEqual((courses[1].course_title, courses[1].flags), ("Calc I", []))
+        self.assertAlmostEqual(courses[1].confidence, 0.95)
+        self.assertEqual((courses[2].course_title, courses[2].confidence), (None, 0.9))
+
+    def test_codes_the_normalizer_misses_use_exact_lookup(self):
+        courses = [ExtractedCourse(course_code="envsc1010u", course_title=None, confidence=0.9)]
+        self.assertEqual(self.catalog.get_by_code("envsc1010u")["id"], "c3")
+        _enrich_courses(courses, self.catalog)
+        self.assertEqual(courses[0].course_title, "Environmental Science I")
+        self.assertEqual(courses[0].flags, ["catalog_url:https://example.com/c3"])
+
+
+# ---------- Transcript result index ----------
+class TestTranscriptRecordStore(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.store = TranscriptRecordStore(f"sqlite:///{self.tmp / 'records.db'}")
+
+    def tearDown(self):
+        self.store.engine.dispose()
+        self._tmp.cleanup()
+
+    def _result(self, tid, university="Ontario Tech University", courses=2):
+        return {"transcript_id": tid, "filename": f"{tid}.pdf", "university_name": university, "courses": [{}] * courses}
+
+    def test_paginated_listing_newest_first(self):
+        for i in range(5):
+            self.store.upsert(self._result(f"t{i}", courses=i), created_at=1000 + i)
+        page, total = self.store.list(limit=2, offset=1)
+        self.assertEqual(total, 5)
+        self.assertEqual([r["transcript_id"] for r in page], ["t3", "t2"])
+        self.assertEqual(page[0]["course_count"], 3)
+
+    def test_filter_by_university(self):
+        self.store.upsert(self._result("a"), created_at=1)
+        self.store.upsert(self._result("b", university="Toronto Metropolitan University"), created_at=2)
+        page, total = self.store.list(university="Toronto Metropolitan University")
+        self.assertEqual((total, [r["transcript_id"] for r in page]), (1, ["b"]))
+
+    def test_latest_follows_reuploads(self):
+        self.store.upsert(self._result("a"), created_at=1)
+        self.store.upsert(self._result("b"), created_at=2)
+        self.assertEqual(self.store.latest_id(), "b")
+        self.store.touch("a")
+        self.assertEqual(self.store.latest_id(), "a")
+        self.store.delete("a")
+        self.assertEqual(self.store.latest_id(), "b")
+
+    def test_backfill_imports_existing_files_once(self):
+        results = self.tmp / "results"
+        results.mkdir()
+        (results / "x.json").write_text(json.dumps(self._result("ignored-id")))
+        self.assertEqual(self.store.backfill(results), 1)
+        self.assertEqual(self.store.backfill(results), 0)
+        self.assertEqual(self.store.list()[0][0]["transcript_id"], "x")
+
+    def test_reparse_keeps_upload_time_and_stamps_version(self):
+        self.store.upsert(self._result("a"), created_at=1)
+        self.store.upsert(self._result("b"), created_at=2)
+        self.assertEqual(self.store.outdated_ids("2"), ["a", "b"])
+        self.store.upsert({**self._result("a"), "parser_version": "2"}, touch_upload=False)
+        self.assertEqual(self.store.latest_id(), "b")
+        self.assertEqual(self.store.outdated_ids("2"), ["b"])
+
+
+# ---------- Retention / sharded storage ----------
+class TestTranscriptRetention(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.uploads, self.results = self.tmp / "uploads", self.tmp / "results"
+        self.uploads.mkdir()
+        self.results.mkdir()
+        self.store = TranscriptRecordStore(f"sqlite:///{self.tmp / 'records.db'}")
+
+    def tearDown(self):
+        self.store.engine.dispose()
+        self._tmp.cleanup()
+
+    def _age(self, path, seconds):
+        old = time.time() - seconds
+        os.utime(path, (old, old))
+
+    def _manager(self, **policy):
+        return RetentionManager(str(self.uploads), str(self.results), self.store, **policy)
+
+    def test_compressed_results_read_transparently_and_replace_other_formats(self):
+        legacy = self.results / "abcd.json"
+        legacy.write_text(json.dumps({"transcript_id": "abcd", "courses": []}))
+        self.assertEqual(storage.find_result_file(str(self.results), "abcd"), legacy)
+
+        path = storage.write_result_file(str(self.results), "abcd", {"transcript_id": "abcd", "v": 2}, "gzip")
+        self.assertEqual(path, self.results / "ab" / "abcd.json.gz")
+        self.assertFalse(legacy.exists())
+        self.assertEqual(storage.read_result_file(storage.find_result_file(str(self.results), "abcd"))["v"], 2)
+        self.assertEqual(list(storage.iter_result_files(str(self.results))), [("abcd", path)])
+
+    def test_binary_container_round_trip_and_head_only_read(self):
+        result = {
+            "transcript_id": "abcd", "filename": "t.pdf", "parser_version": "2",
+            "courses": [{"course_code": "CSCI1060U", "credits": 3.0, "flags": []}], "warnings": ["w"],
+        }
+        for compression in ("none", "gzip"):
+            with self.subTest(compression=compression):
+                path = storage.write_result_file(str(self.results), "abcd", result, compression, codec="orjson")
+                self.assertEqual(path.name, "abcd.trs")
+                self.assertEqual(storage.result_format(path), ("orjson", compression))
+                self.assertEqual(storage.read_result_file(path), result)
+                # the course segment isn't needed (or even intact) for the metadata
+                path.write_bytes(path.read_bytes()[:-4])
+                self.assertEqual(storage.read_result_head(path), {"transcript_id": "abcd", "filename": "t.pdf", "parser_version": "2"})
+
+    def test_container_header_is_checked(self):
+        data = transcript_codec.encode({"transcript_id": "x", "courses": []}, "orjson")
+        newer = data[:4] + bytes([transcript_codec.FORMAT_VERSION + 1]) + data[5:]
+        for bad in (b"{}", b"XXXX" + data[4:], newer):
+            with self.assertRaises(ValueError):
+                transcript_codec.decode(bad)
+
+    def test_sweep_shards_and_compresses_old_files_only(self):
+        self.store.upsert({"transcript_id": "aa11", "courses": []})
+        (self.results / "aa11.json").write_text(json.dumps({"transcript_id": "aa11", "courses": []}))
+        (self.results / "bb22.json").write_text(json.dumps({"transcript_id": "bb22", "courses": []}))
+        (self.uploads / "aa11.pdf").write_bytes(b"%PDF")
+        (self.uploads / ".cc33.part").write_bytes(b"partial")
+        for path in (self.results / "aa11.json", self.uploads / "aa11.pdf", self.uploads / ".cc33.part"):
+            self._age(path, 2 * 3600)
+
+        summary = self._manager(compression="gzip").sweep()
+        self.assertEqual((summary["results_compacted"], summary["uploads_moved"], summary["temp_removed"]), (1, 1, 1))
+        self.assertTrue((self.results / "aa" / "aa11.json.gz").exists())
+        self.assertTrue((self.uploads / "aa" / "aa11.pdf").exists())
+        self.assertEqual(storage.upload_file(str(self.uploads), "aa11"), self.uploads / "aa" / "aa11.pdf")
+        # written moments ago: may still be in use
+        self.assertTrue((self.results / "bb22.json").exists())
+
+    def test_compaction_does_not_overwrite_a_concurrent_save(self):
+        from app.services import transcript_retention_service as retention
+        legacy = self.results / "aa11.json"
+        legacy.write_text(json.dumps({"transcript_id": "aa11", "v": 1}))
+        self._age(legacy, 2 * 3600)
+
+        def reparse_then_write(*args, **kwargs):
+            # a re-parse saves the new result between the sweep's read and its write
+            storage.write_result_file(str(self.results), "aa11", {"transcript_id": "aa11", "v": 2}, "gzip")
+            return storage.write_result_file(*args, **kwargs)
+
+        with mock.patch.object(retention, "write_result_file", reparse_then_write):
+            summary = self._manager(compression="gzip").sweep()
+        self.assertEqual(summary["results_compacted"], 0)
+        self.assertEqual(storage.read_result_file(storage.find_result_file(str(self.results), "aa11"))["v"], 2)
+
+    def test_age_policy_deletes_record_result_and_upload(self):
+        now = time.time()
+        for tid, uploaded in (("old1", now - 40 * 86400), ("new1", now)):
+            self.store.upsert({"transcript_id": tid, "courses": []}, created_at=uploaded)
+            storage.write_result_file(str(self.results), tid, {"transcript_id": tid})
+            (self.uploads / f"{tid}.pdf").write_bytes(b"%PDF")
+
+        summary = self._manager(retention_days=30).sweep(now=now)
+        self.assertEqual(summary["expired"], 1)
+        self.assertEqual(self.store.ids(), {"new1"})
+        self.assertIsNone(storage.find_result_file(str(self.results), "old1"))
+        self.assertFalse(storage.upload_file(str(self.uploads), "old1").exists())
+        self.assertTrue(storage.upload_file(str(self.uploads), "new1").exists())
+
+    def test_size_policy_trims_oldest_uploads_outside_grace_period(self):
+        for tid in ("aa01", "aa02", "aa03", "aa04"):
+            self.store.upsert({"transcript_id": tid, "courses": []})
+        for i, tid in enumerate(("aa01", "aa02", "aa03")):
+            path = storage.shard_dir(str(self.uploads), tid) / f"{tid}.pdf"
+            path.parent.mkdir(exist_ok=True)
+            path.write_bytes(b"x" * 1000)
+            self._age(path, GRACE_SECONDS * (4 - i))
+        recent = self.uploads / "aa" / "aa04.pdf"
+        recent.write_bytes(b"x" * 1000)
+
+        summary = self._manager(uploads_max_bytes=1500).sweep()
+        self.assertEqual(summary["uploads_trimmed"], 3)
+        self.assertEqual(sorted(p.name for p in self.uploads.glob("*/*.pdf")), ["aa04.pdf"])
+
+    def test_hand_placed_pdfs_are_left_alone(self):
+        sample = self.uploads / "OTUTranscripts.pdf"
+        upload = self.uploads / "0f8fad5b-d9cb-469f-a165-70867728950e.pdf"
+        for path in (sample, upload):
+            path.write_bytes(b"x" * 1000)
+            self._age(path, 2 * GRACE_SECONDS)
+
+        summary = self._manager(uploads_max_bytes=1).sweep()
+        self.assertEqual((summary["uploads_moved"], summary["uploads_trimmed"]), (1, 1))
+        self.assertTrue(sample.exists())
+        self.assertFalse(any(self.uploads.glob("*/*.pdf")))
+
+    def test_index_entries_are_sharded_and_pruned(self):
+        index = TranscriptHashIndex(self.tmp / "index", parser_version="2")
+        self.store.upsert({"transcript_id": "live", "courses": []})
+        live, gone, old = "a" * 64, "b" * 64, "c" * 64
+        index.put(live, "live")
+        index.put(gone, "deleted-transcript")
+        TranscriptHashIndex(self.tmp / "index", parser_version="1").put(old, "live")
+        # an entry from before sharding
+        flat = self.tmp / "index" / f"{live}-v2.json"
+        (self.tmp / "index" / "aa" / flat.name).rename(flat)
+        for path, _, _ in index.entries():
+            self._age(path, 2 * GRACE_SECONDS)
+
+        summary = self._manager(index=index).sweep()
+        self.assertEqual((summary["index_removed"], summary["index_moved"]), (2, 1))
+        self.assertEqual([p.relative_to(self.tmp / "index").as_posix() for p, _, _ in index.entries()], [f"aa/{live}-v2.json"])
+        self.assertEqual(index.lookup(live), "live")
+
+
+# ---------- Batch ingestion ----------
+class TestTranscriptBatch(TestCase):
+    def _run(self, files, stored):
+        from fastapi import UploadFile
+
+        def find_duplicate(sha256):
+            return stored.get(sha256)
+
+        def save_result(transcript_id, sha256, result):
+            raise AssertionError("nothing in these batches needs parsing")
+
+        async def collect():
+            uploads = [UploadFile(io.BytesIO(data), filename=name) for name, data in files]
+            return [json.loads(line) async for line in parse_transcripts_ndjson(uploads, 1024, find_duplicate, save_result)]
+        return asyncio.run(collect())
+
+    def test_unpacks_archives_and_dedupes(self):
+        import hashlib
+        pdf = b"%PDF-1.4 already parsed"
+        stored = {hashlib.sha256(pdf).hexdigest(): {"transcript_id": "t-1", "courses": []}}
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("2024/a.pdf", pdf)
+            zf.writestr("2024/readme.txt", "not a transcript")
+            zf.writestr("__MACOSX/2024/._a.pdf", "resource fork")
+            zf.writestr("big.pdf", b"x" * 2048)
+        lines = self._run([("cohort.zip", archive.getvalue()), ("b.pdf", pdf), ("broken.zip", b"nope")], stored)
+
+        summary = lines.pop()
+        by_index = {line["index"]: line for line in lines}
+        self.assertEqual(sorted(by_index), [0, 1, 2, 3, 4])
+        self.assertEqual((by_index[0]["filename"], by_index[0]["transcript_id"]), ("cohort.zip/2024/a.pdf", "t-1"))
+        self.assertEqual(by_index[1]["error"], "not a PDF")
+        self.assertIn("per-transcript limit", by_index[2]["error"])
+        self.assertEqual((by_index[3]["transcript_id"], by_index[3]["duplicate_of"]), ("t-1", 0))
+        self.assertEqual(by_index[4]["error"], "not a valid ZIP archive")
+        self.assertEqual(
+            {k: summary[k] for k in ("type", "files", "parsed", "cache_hits", "duplicates", "errors")},
+            {"type": "summary", "files": 5, "parsed": 0, "cache_hits": 1, "duplicates": 1, "errors": 3},
+        )
+
+    def test_client_disconnect_cancels_dispatched_parses(self):
+        from fastapi import UploadFile
+        from app.services import transcript_batch_service as batch_service
+
+        class _StuckPool:
+            def __init__(self):
+                self.started, self.cancelled = asyncio.Event(), False
+
+            async def parse(self, path, filename):
+                self.started.set()
+                try:
+                    await asyncio.Event().wait()
+                except asyncio.CancelledError:
+                    self.cancelled = True
+                    raise
+
+        async def disconnect(pool):
+            uploads = [UploadFile(io.BytesIO(b"%PDF-1.4 new"), filename="a.pdf")]
+            stream = parse_transcripts_ndjson(uploads, 1024, lambda sha256: None, mock.Mock())
+            reader = asyncio.ensure_future(stream.__anext__())
+            await pool.started.wait()
+            reader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await reader
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pool = _StuckPool()
+            with mock.patch.object(batch_service, "UPLOAD_DIR", tmp), \
+                    mock.patch.object(batch_service, "upload_path", lambda tid: os.path.join(tmp, f"{tid}.pdf")), \
+                    mock.patch.object(batch_service, "get_parse_pool", return_value=pool):
+                asyncio.run(disconnect(pool))
+            self.assertTrue(pool.cancelled)
+            self.assertEqual(os.listdir(tmp), [])
+
+
+if __name__ == "__main__":
+    unittest_main(verbosity=2)